@@ -2,51 +2,82 @@
 # pip install llama-index-llms-litellm
 # pip install llama-index
 import asyncio
-from llama_index.llms.litellm import LiteLLM
-from llama_index.core.llms import ChatMessage
 from dotenv import load_dotenv
-from llama_index.core.agent.workflow import ReActAgent
-from llama_index.core.tools import FunctionTool
+from agent_utils.fastpath import FastPath, fast_path_enabled
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather import weather_lookup
+
+# LlamaIndex is imported when the agent is built, not when this module is loaded
+
+PROMPT = "What is the weather like in London?"
 
-# set env variable
-load_dotenv()
 
 # Tool definition
+@traced_tool
 def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city."""
-    city_normalized = city.lower().replace(" ", "")
+    return weather_lookup(city)
 
-    mock_weather_db = {
-        "newyork": {"status": "success", "report": "The weather in New York is sunny with a temperature of 25°C."},
-        "london": {"status": "success", "report": "It's cloudy in London with a temperature of 15°C."},
-        "tokyo": {"status": "success", "report": "Tokyo is experiencing light rain and a temperature of 18°C."},
-    }
 
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return {"status": "error", "error_message": f"Sorry, I don't have weather information for '{city}'."}
+def build_agent(model: str = "sap/gpt-5"):
+    from llama_index.llms.litellm import LiteLLM
+    from llama_index.core.agent.workflow import ReActAgent
+    from llama_index.core.tools import FunctionTool
 
+    tool = FunctionTool.from_defaults(
+        get_weather
+    )
 
-tool = FunctionTool.from_defaults(
-    get_weather
-)
+    # llm setup
+    llm = LiteLLM(model,
+                  temperature=1,)
 
-message = ChatMessage(role="user", content="What is the weather like in London?")
+    # agent setup
+    return ReActAgent(llm=llm, tools=[tool])
 
 
-# llm setup
-llm = LiteLLM("sap/gpt-5",
-              temperature=1,)
+def user_message():
+    from llama_index.core.llms import ChatMessage
 
-# agent setup
-agent = ReActAgent(llm=llm, tools=[tool])
+    return ChatMessage(role="user", content=PROMPT)
 
 
-async def main():
-    response = await agent.run(user_msg=message)
+async def run(agent):
+    if fast_path_enabled():
+        # One completion with the weather looked up first (TOOL_FAST_PATH=1, see PERFORMANCE.md);
+        # the ReAct loop only runs if the city can't be read from the prompt
+        answer = await FastPath("sap/gpt-5", get_weather, temperature=1).aanswer(PROMPT)
+        if answer is not None:
+            print(answer)
+            return
+    response = await agent.run(user_msg=user_message())
     print(response)
 
 
+async def stream(agent):
+    """Prints tokens and tool calls as they arrive, followed by TTFT and inter-token latency."""
+    from llama_index.core.agent.workflow import AgentStream, ToolCallResult
+
+    timer = StreamTimer()
+    handler = agent.run(user_msg=user_message())
+    # The ReAct agent streams its reasoning (Thought/Action) as well as the answer
+    async for event in handler.stream_events():
+        if isinstance(event, AgentStream):
+            timer.token(event.delta)
+        elif isinstance(event, ToolCallResult):
+            timer.event(f"tool call: {event.tool_name} -> {event.tool_output}")
+    await handler
+    timer.finish()
+
+
+def main():
+    load_dotenv()
+    setup_from_env("llamaindex")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    agent = build_agent()
+    with agent_span("llamaindex", "sap/gpt-5"):
+        asyncio.run(stream(agent) if streaming_enabled() else run(agent))
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
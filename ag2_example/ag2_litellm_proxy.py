@@ -1,66 +1,125 @@
 # https://docs.ag2.ai/latest/docs/user-guide/models/litellm-proxy-server/installation/
 import os
-import litellm
 from dotenv import load_dotenv
+from agent_utils.history import HistoryCompactor, add_to_ag2, from_env as history_from_env
+from agent_utils.cache import install_from_env as install_cache_from_env
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather import weather_report
 from typing import Any
-from autogen import ConversableAgent, LLMConfig
-from autogen.agentchat.group.patterns import AutoPattern
-from autogen.agentchat import initiate_group_chat
 
-# set env variable
-litellm.use_litellm_proxy = True
-load_dotenv()
+# AG2 is imported when the agents are built, not when this module is loaded.
+# It talks to the proxy through the OpenAI client, so LiteLLM is not imported.
 
-api_base = os.getenv("PROXY_BASE_URL")
-api_key = os.getenv("LITELLM_PROXY_API_KEY")
 
 # tool definition
+@traced_tool
 def get_weather(city: str) -> str:
     """Moke function"""
-    city_normalized = city.lower().replace(" ", "")
+    return weather_report(city)
 
-    mock_weather_db = {
-        "newyork": "The weather in New York is sunny with a temperature of 25°C.",
-        "london": "It's cloudy in London with a temperature of 15°C.",
-        "tokyo": "Tokyo is experiencing light rain and a temperature of 18°C.",
-    }
 
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return f"The weather in {city} is sunny with a temperature of 20°C."
+# The assistant ends its report with this line, which finishes the conversation
+REPORT_MARKER = "==== REPORT GENERATED ===="
 
-# set up model
-llm_config = LLMConfig(config_list={"model": "sap/gpt-4o", "base_url": api_base, "api_key": api_key})
 
 #setup function for finish conversation
 def is_termination_msg(msg: dict[str, Any]) -> bool:
     content = msg.get("content", "")
-    return (content is not None) and "==== REPORT GENERATED ====" in content
-
-# setup agent
-assistant = ConversableAgent(name="assistant",
-                             llm_config=llm_config,
-                             system_message="""
-                                You are a helpful weather assistant.
-                                When the user asks for the weather in a specific city, use the 'get_weather' tool
-                                to find the information.
-                                If the tool returns an error, inform the user politely.
-                                If the tool is successful, write a couple of sentences for a TV weather report
-                                in the given city including a small joke."
-                                Once you've generated the report append this to the summary:
-                                ==== REPORT GENERATED ====
-                                """,
-                             functions=[get_weather])
-# setup pattern
-pattern = AutoPattern(initial_agent=assistant,
-                      agents=[assistant],
-                      group_manager_args={
-                          "llm_config": llm_config,
-                          "is_termination_msg": is_termination_msg
-                      },
-                      )
-# start conversation
-result, _, _ = initiate_group_chat(pattern=pattern,
-                                   messages="What is the weather like in Tbilisi?",
-                                   )
+    return (content is not None) and REPORT_MARKER in content
+
+
+def build_pattern(
+    model: str = "sap/gpt-4o",
+    api_base: str | None = None,
+    api_key: str | None = None,
+    compactor: HistoryCompactor | None = None,
+):
+    from autogen import ConversableAgent, LLMConfig
+    from autogen.agentchat.group.patterns import AutoPattern
+    from agent_utils.http_pool import shared_client
+
+    api_base = api_base or os.getenv("PROXY_BASE_URL")
+    api_key = api_key or os.getenv("LITELLM_PROXY_API_KEY")
+
+    # set up model
+    llm_config = LLMConfig(config_list={"model": model, "base_url": api_base, "api_key": api_key,
+                                         "stream": streaming_enabled(),
+                                         # pooled keep-alive connections to the proxy
+                                         "http_client": shared_client()})
+
+    # setup agent
+    assistant = ConversableAgent(name="assistant",
+                                 llm_config=llm_config,
+                                 system_message=f"""
+                                    You are a helpful weather assistant.
+                                    When the user asks for the weather in a specific city, use the 'get_weather' tool
+                                    to find the information.
+                                    If the tool returns an error, inform the user politely.
+                                    If the tool is successful, write a couple of sentences for a TV weather report
+                                    in the given city including a small joke."
+                                    Once you've generated the report append this to the summary:
+                                    {REPORT_MARKER}
+                                    """,
+                                 functions=[get_weather])
+
+    if compactor is not None:
+        add_to_ag2(compactor, assistant)
+    # setup pattern
+    return AutoPattern(initial_agent=assistant,
+                       agents=[assistant],
+                       group_manager_args={
+                           "llm_config": llm_config,
+                           "is_termination_msg": is_termination_msg
+                       },
+                       )
+
+
+# streaming mode: print tokens and tool calls instead of the group chat transcript
+class StreamTimerIO:
+    def __init__(self, timer: StreamTimer):
+        self.timer = timer
+
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n", flush: bool = False) -> None:
+        pass
+
+    def send(self, message: Any) -> None:
+        from autogen.events.agent_events import ExecutedFunctionEvent
+        from autogen.events.client_events import StreamEvent
+
+        if isinstance(message, StreamEvent):
+            self.timer.token(message.content.content)
+        elif isinstance(message, ExecutedFunctionEvent):
+            self.timer.event(f"tool call: {message.content.func_name} -> {message.content.content}")
+
+    def input(self, prompt: str = "", *, password: bool = False) -> str:
+        return input(prompt)
+
+
+def main():
+    from autogen.agentchat import initiate_group_chat
+    from autogen.io import IOStream
+
+    load_dotenv()
+    setup_from_env("ag2")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    install_cache_from_env()  # COMPLETION_CACHE=memory: repeated requests skip the proxy, see PERFORMANCE.md
+    # Long conversations are compacted before they are sent (HISTORY_MAX_TOKENS)
+    pattern = build_pattern(compactor=history_from_env())
+
+    # start conversation
+    with agent_span("ag2", "sap/gpt-4o"):
+        if streaming_enabled():
+            timer = StreamTimer()
+            with IOStream.set_default(StreamTimerIO(timer)):
+                result, _, _ = initiate_group_chat(pattern=pattern,
+                                                   messages="What is the weather like in Tbilisi?",
+                                                   )
+            timer.finish()
+        else:
+            result, _, _ = initiate_group_chat(pattern=pattern,
+                                               messages="What is the weather like in Tbilisi?",
+                                               )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""Shared helpers for the LiteLLM agentic examples.
+
+The framework examples stay self-contained scripts; anything they have in
+common (the weather tool backend, benchmarking utilities, ...) lives here so it
+is written, tuned and tested once. Install it next to the examples with
+``pip install -e .``.
+
+Submodules are imported on demand to keep the examples' start-up cost low.
+"""
@@ -0,0 +1,176 @@
+"""Long-lived Google ADK agent service with pooled per-user sessions.
+
+One :class:`AgentService` holds a single ADK ``Runner`` for the lifetime of the
+process and serves many concurrent requests:
+
+* each user gets one session, reused across requests and kept in an LRU pool,
+* the pool is capped by number of sessions (``max_sessions``) and by the total
+  number of stored events (``max_events``); least recently used idle sessions
+  are deleted first,
+* requests for the same user are serialised (a session is a conversation),
+  requests for different users run concurrently, at most ``max_concurrency``
+  at a time,
+* with ``max_history_turns`` set, a session that grows beyond that many user
+  turns is compacted: it is replaced by a new session holding only the most
+  recent turns, so the prompt size stays bounded.
+
+Usage::
+
+    service = AgentService(weather_agent, app_name="weather_app", max_history_turns=10)
+    answer = await service.call_agent_async("What is the weather in Paris?", user_id="alice")
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator
+
+
+@dataclass
+class _SessionSlot:
+    session_id: str
+    turns: int = 0
+    events: int = 0
+    active: int = 0  # requests holding or waiting for this session
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+@dataclass
+class ServiceStats:
+    requests: int = 0
+    sessions_created: int = 0
+    sessions_evicted: int = 0
+    compactions: int = 0
+
+
+class AgentService:
+    """Serves an ADK agent from one ``Runner`` with a bounded pool of per-user sessions."""
+
+    def __init__(
+        self,
+        agent: Any,
+        app_name: str = "agent_service",
+        *,
+        session_service: Any = None,
+        max_sessions: int = 1024,
+        max_events: int = 100_000,
+        max_history_turns: int | None = None,
+        max_concurrency: int = 64,
+    ):
+        from google.adk.runners import Runner
+        from google.adk.sessions import InMemorySessionService
+
+        self.app_name = app_name
+        self.session_service = session_service or InMemorySessionService()
+        self.runner = Runner(agent=agent, app_name=app_name, session_service=self.session_service)
+        self.max_sessions = max_sessions
+        self.max_events = max_events
+        self.max_history_turns = max_history_turns
+        self.stats = ServiceStats()
+        self._slots: OrderedDict[str, _SessionSlot] = OrderedDict()
+        self._events = 0
+        self._pool_lock = asyncio.Lock()
+        self._concurrency = asyncio.Semaphore(max_concurrency)
+
+    # Session pool
+
+    async def _slot(self, user_id: str) -> _SessionSlot:
+        async with self._pool_lock:
+            slot = self._slots.get(user_id)
+            if slot is not None:
+                self._slots.move_to_end(user_id)
+            else:
+                session = await self.session_service.create_session(app_name=self.app_name, user_id=user_id)
+                slot = self._slots[user_id] = _SessionSlot(session.id)
+                self.stats.sessions_created += 1
+            slot.active += 1
+            await self._evict()
+            return slot
+
+    async def _evict(self) -> None:
+        """Delete idle sessions, least recently used first, until the pool is within its caps."""
+        for user_id, slot in list(self._slots.items()):
+            if len(self._slots) <= self.max_sessions and self._events <= self.max_events:
+                break
+            if slot.active:
+                continue
+            del self._slots[user_id]
+            self._events -= slot.events
+            self.stats.sessions_evicted += 1
+            await self.session_service.delete_session(
+                app_name=self.app_name, user_id=user_id, session_id=slot.session_id
+            )
+
+    async def _compact(self, user_id: str, slot: _SessionSlot) -> None:
+        """Replace the session by a new one holding only the last ``max_history_turns`` turns."""
+        session = await self.session_service.get_session(
+            app_name=self.app_name, user_id=user_id, session_id=slot.session_id
+        )
+        if session is None:
+            return
+        turn_starts = [
+            i for i, event in enumerate(session.events)
+            if event.author == "user" and event.content and any(part.text for part in event.content.parts or [])
+        ]
+        if len(turn_starts) <= self.max_history_turns:
+            # Failed runs are counted as turns before their user event is stored
+            slot.turns = len(turn_starts)
+            return
+        kept = session.events[turn_starts[-self.max_history_turns]:]
+        compacted = await self.session_service.create_session(
+            app_name=self.app_name, user_id=user_id, state=dict(session.state)
+        )
+        for event in kept:
+            await self.session_service.append_event(compacted, event)
+        await self.session_service.delete_session(app_name=self.app_name, user_id=user_id, session_id=session.id)
+
+        self._events += len(kept) - slot.events
+        slot.session_id, slot.turns, slot.events = compacted.id, self.max_history_turns, len(kept)
+        self.stats.compactions += 1
+
+    # Requests
+
+    async def run_async(self, user_id: str, new_message: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        """``Runner.run_async`` on the user's pooled session; yields the same events."""
+        slot = await self._slot(user_id)
+        try:
+            async with slot.lock, self._concurrency:
+                self.stats.requests += 1
+                new_events = 1  # the user message
+                try:
+                    async for event in self.runner.run_async(
+                        user_id=user_id, session_id=slot.session_id, new_message=new_message, **kwargs
+                    ):
+                        if not event.partial:
+                            new_events += 1
+                        yield event
+                finally:
+                    slot.turns += 1
+                    slot.events += new_events
+                    self._events += new_events
+                    if self.max_history_turns and slot.turns > self.max_history_turns:
+                        await self._compact(user_id, slot)
+        finally:
+            slot.active -= 1
+        if self._events > self.max_events:
+            async with self._pool_lock:
+                await self._evict()
+
+    async def call_agent_async(self, query: str, user_id: str) -> str:
+        """Sends a query to the agent in the user's session and returns the final response text."""
+        from google.genai import types
+
+        content = types.Content(role="user", parts=[types.Part(text=query)])
+        final_response_text = ""
+        async for event in self.run_async(user_id, content):
+            if event.is_final_response() and event.content and event.content.parts:
+                final_response_text = event.content.parts[0].text or ""
+        return final_response_text
+
+    def pool_stats(self) -> dict:
+        return {**asdict(self.stats), "sessions": len(self._slots), "events": self._events}
+
+    async def close(self) -> None:
+        await self.runner.close()
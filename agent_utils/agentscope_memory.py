@@ -0,0 +1,331 @@
+"""Token-bounded AgentScope memory that spills old turns to a memory-mapped log.
+
+``InMemoryMemory`` keeps a deep copy of every ``Msg`` for the life of the
+agent, and ``ReActAgent`` formats all of them into every prompt: RSS, prompt
+size and the time per turn grow with the conversation. :class:`BoundedMemory`
+keeps only the newest turns that fit ``max_tokens`` in memory, as their JSON
+records in ``__slots__`` entries (parsed again on every read), and appends
+older turns to an on-disk log:
+
+* a spilled message is one JSON record in an append-only file; the memory
+  holds just its offset and length in two ``array`` columns (12 bytes a
+  message) plus the marks of the few messages that have any,
+* the log is read back through ``mmap`` only on demand: by
+  ``get_memory(include_spilled=True)``, :meth:`BoundedMemory.spilled` or a
+  ``delete``/``update_messages_mark`` of a message that is no longer in the
+  window,
+* turns are spilled whole (a turn starts at a user message), so a tool result
+  never loses the tool call it answers, and the current turn always stays.
+
+The agent only ever sees the window, so its prompts stay under the budget::
+
+    memory = BoundedMemory(max_tokens=4000, path="memory.log")
+    agent = ReActAgent(..., memory=memory)
+    older = memory.spilled()   # the spilled messages, oldest first
+
+Without ``path`` the log is an anonymous temporary file. An existing log at
+``path`` is appended to, so a memory restored with ``load_state_dict`` (which
+saves the log's index with the window) reads its spilled messages back from
+the same file. ``HISTORY_MAX_TOKENS``
+(and ``AGENT_MEMORY_LOG`` for the path) turn it on in the AgentScope example
+(:func:`memory_from_env`). This module imports AgentScope; import it where the
+agent is built.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import tempfile
+from array import array
+from typing import Any, Iterator
+
+from agentscope.memory import MemoryBase
+from agentscope.message import Msg
+
+
+def memory_from_env() -> BoundedMemory | None:
+    """A :class:`BoundedMemory` with the budget from ``HISTORY_MAX_TOKENS``, if it is set."""
+    max_tokens = os.getenv("HISTORY_MAX_TOKENS")
+    return BoundedMemory(int(max_tokens), path=os.getenv("AGENT_MEMORY_LOG")) if max_tokens else None
+
+
+def _marks(marks: str | list[str] | None) -> list[str]:
+    if marks is None:
+        return []
+    if isinstance(marks, str):
+        return [marks]
+    if not isinstance(marks, list) or not all(isinstance(m, str) for m in marks):
+        raise TypeError(f"The mark should be a string, a list of strings, or None, but got {type(marks)}.")
+    return list(marks)
+
+
+class _Entry:
+    """A message in the window: its JSON record, marks and token count, plus the ID and role the memory checks."""
+
+    __slots__ = ("data", "marks", "tokens", "id", "role")
+
+    def __init__(self, msg_dict: dict, marks: list[str]):
+        self.data = json.dumps(msg_dict, ensure_ascii=False).encode()
+        self.marks = marks
+        self.tokens = math.ceil(len(self.data) / 4)  # about four characters per token, like estimate_tokens
+        self.id = msg_dict["id"]
+        self.role = msg_dict["role"]
+
+    @property
+    def msg(self) -> Msg:
+        """A new ``Msg`` parsed from the record."""
+        return Msg.from_dict(json.loads(self.data))
+
+
+class SpillLog:
+    """Append-only file of JSON records, read back through ``mmap``."""
+
+    def __init__(self, path: str | None = None):
+        # An existing log is kept: a restored memory still points into it
+        self._file = open(path, "a+b") if path else tempfile.TemporaryFile()
+        self.offsets = array("Q")
+        self.lengths = array("I")
+        self.marks: dict[int, list[str]] = {}  # index -> marks, only for messages that have any
+        self.deleted: set[int] = set()
+        self._size = self._file.seek(0, os.SEEK_END)
+        self._map: mmap.mmap | None = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - len(self.deleted)
+
+    def append(self, entry: _Entry) -> None:
+        self._file.write(entry.data)
+        if entry.marks:
+            self.marks[len(self.offsets)] = entry.marks
+        self.offsets.append(self._size)
+        self.lengths.append(len(entry.data))
+        self._size += len(entry.data)
+
+    def _view(self) -> mmap.mmap:
+        # Remap when records were appended since the last read
+        if self._map is None or len(self._map) < self._size:
+            self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def read(self, index: int) -> Msg:
+        start = self.offsets[index]
+        return Msg.from_dict(json.loads(self._view()[start : start + self.lengths[index]]))
+
+    def indices(self, mark: str | None = None, exclude_mark: str | None = None) -> Iterator[int]:
+        for index in range(len(self.offsets)):
+            marks = self.marks.get(index, ())
+            if index in self.deleted or (mark is not None and mark not in marks) or (exclude_mark in marks):
+                continue
+            yield index
+
+    def state_dict(self) -> dict:
+        """The index of the records; the records themselves stay in the file."""
+        return {
+            "offsets": self.offsets.tolist(),
+            "lengths": self.lengths.tolist(),
+            "marks": {str(index): marks for index, marks in self.marks.items()},
+            "deleted": sorted(self.deleted),
+        }
+
+    def load_state_dict(self, state_dict: dict) -> None:
+        offsets, lengths = array("Q", state_dict["offsets"]), array("I", state_dict["lengths"])
+        if offsets and offsets[-1] + lengths[-1] > self._size:
+            raise ValueError(f"The spill log holds {self._size} bytes, the saved index needs {offsets[-1] + lengths[-1]}.")
+        self.offsets, self.lengths = offsets, lengths
+        self.marks = {int(index): list(marks) for index, marks in state_dict["marks"].items()}
+        self.deleted = set(state_dict["deleted"])
+
+    def clear(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.seek(0)
+        self._file.truncate()
+        self.offsets, self.lengths = array("Q"), array("I")
+        self.marks.clear()
+        self.deleted.clear()
+        self._size = 0
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+class BoundedMemory(MemoryBase):
+    """AgentScope memory holding at most ``max_tokens`` of messages; older turns go to a :class:`SpillLog`."""
+
+    def __init__(self, max_tokens: int = 4000, path: str | None = None) -> None:
+        super().__init__()
+        self.max_tokens = max_tokens
+        self.window: list[_Entry] = []
+        self.window_tokens = 0
+        self.log = SpillLog(path)
+
+    # The window
+
+    def _spill(self) -> None:
+        """Move the oldest whole turns to the log until the window fits (the current turn always stays)."""
+        while self.window_tokens > self.max_tokens:
+            end = next(
+                # A turn starts at a user message; marked ones are the agent's hints within a turn
+                (i for i in range(1, len(self.window)) if self.window[i].role == "user" and not self.window[i].marks),
+                None,
+            )
+            if end is None:
+                return
+            for entry in self.window[:end]:
+                self.log.append(entry)
+                self.window_tokens -= entry.tokens
+            del self.window[:end]
+
+    async def add(
+        self,
+        memories: Msg | list[Msg] | None,
+        marks: str | list[str] | None = None,
+        allow_duplicates: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        """Add message(s) with the given mark(s); duplicates are checked against the window."""
+        if memories is None:
+            return
+        if isinstance(memories, Msg):
+            memories = [memories]
+        marks = _marks(marks)
+        if not allow_duplicates:
+            existing = {entry.id for entry in self.window}
+            memories = [msg for msg in memories if msg.id not in existing]
+        for msg in memories:
+            # The record is the copy: no deepcopy of the caller's message is kept
+            entry = _Entry(msg.to_dict(), list(marks))
+            self.window.append(entry)
+            self.window_tokens += entry.tokens
+        self._spill()
+
+    async def get_memory(
+        self,
+        mark: str | None = None,
+        exclude_mark: str | None = None,
+        prepend_summary: bool = True,
+        include_spilled: bool = False,
+        **kwargs: Any,
+    ) -> list[Msg]:
+        """The window's messages, filtered by mark; ``include_spilled`` reads the spilled ones first."""
+        messages = []
+        if prepend_summary and self._compressed_summary:
+            messages.append(Msg("user", self._compressed_summary, "user"))
+        if include_spilled:
+            messages += [self.log.read(i) for i in self.log.indices(mark, exclude_mark)]
+        messages += [
+            entry.msg
+            for entry in self.window
+            if (mark is None or mark in entry.marks) and (exclude_mark is None or exclude_mark not in entry.marks)
+        ]
+        return messages
+
+    def spilled(self, mark: str | None = None) -> list[Msg]:
+        """The messages spilled to the log, oldest first, read back from disk."""
+        return [self.log.read(i) for i in self.log.indices(mark)]
+
+    async def size(self) -> int:
+        """Messages in the window and the log."""
+        return len(self.window) + len(self.log)
+
+    # Removing and re-marking
+
+    def _remove(self, keep) -> int:
+        kept = [entry for entry in self.window if keep(entry)]
+        removed = len(self.window) - len(kept)
+        self.window = kept
+        self.window_tokens = sum(entry.tokens for entry in kept)
+        return removed
+
+    async def delete(self, msg_ids: list[str], **kwargs: Any) -> int:
+        """Remove messages by ID; IDs that are not in the window are looked up in the log."""
+        ids = set(msg_ids)
+        removed = self._remove(lambda entry: entry.id not in ids)
+        if removed < len(ids):
+            spilled = [i for i in self.log.indices() if self.log.read(i).id in ids]
+            self.log.deleted.update(spilled)
+            removed += len(spilled)
+        return removed
+
+    async def delete_by_mark(self, mark: str | list[str], **kwargs: Any) -> int:
+        """Remove the messages that carry any of the mark(s)."""
+        marks = set(_marks(mark))
+        removed = self._remove(lambda entry: marks.isdisjoint(entry.marks))
+        spilled = [i for i, m in self.log.marks.items() if i not in self.log.deleted and not marks.isdisjoint(m)]
+        self.log.deleted.update(spilled)
+        return removed + len(spilled)
+
+    async def update_messages_mark(
+        self,
+        new_mark: str | None,
+        old_mark: str | None = None,
+        msg_ids: list[str] | None = None,
+    ) -> int:
+        """Add, replace or remove a mark, as ``InMemoryMemory.update_messages_mark`` does.
+
+        Spilled messages are re-marked too; IDs that are not in the window are
+        looked up in the log, as :meth:`delete` does.
+        """
+        ids = set(msg_ids) if msg_ids is not None else None
+        updated = 0
+        targets = [entry.marks for entry in self.window if ids is None or entry.id in ids]
+        if ids is None:
+            spilled = list(self.log.indices())
+        elif len(targets) < len(ids):
+            spilled = [i for i in self.log.indices() if self.log.read(i).id in ids]
+        else:
+            spilled = []
+        targets += [self.log.marks.setdefault(i, []) for i in spilled]
+        for marks in targets:
+            if old_mark is not None and old_mark not in marks:
+                continue
+            if new_mark is None:
+                if old_mark in marks:
+                    marks.remove(old_mark)
+                    updated += 1
+            else:
+                if old_mark is not None and old_mark in marks:
+                    marks.remove(old_mark)
+                if new_mark not in marks:
+                    marks.append(new_mark)
+                    updated += 1
+        for i in spilled:
+            if not self.log.marks[i]:
+                del self.log.marks[i]
+        return updated
+
+    async def clear(self) -> None:
+        self.window.clear()
+        self.window_tokens = 0
+        self.log.clear()
+
+    def close(self) -> None:
+        self.log.close()
+
+    # Sessions save the window and the log's index; the log file stays where it is,
+    # so a memory loading the state needs the same ``path``
+
+    def state_dict(self) -> dict:
+        return {
+            **super().state_dict(),
+            "content": [[json.loads(entry.data), entry.marks] for entry in self.window],
+            "log": self.log.state_dict(),
+        }
+
+    def load_state_dict(self, state_dict: dict, strict: bool = True) -> None:
+        if strict and "content" not in state_dict:
+            raise KeyError("The state_dict does not contain 'content' keys required for BoundedMemory.")
+        self._compressed_summary = state_dict.get("_compressed_summary", "")
+        self.window = [_Entry(msg_dict, list(marks)) for msg_dict, marks in state_dict.get("content", [])]
+        self.window_tokens = sum(entry.tokens for entry in self.window)
+        if "log" in state_dict:
+            self.log.load_state_dict(state_dict["log"])
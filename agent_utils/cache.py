@@ -0,0 +1,408 @@
+"""Opt-in response cache for chat completions.
+
+Repeated requests (same model, prompt, tools and sampling parameters) are
+answered from the cache instead of making another round trip to SAP
+Generative AI Hub. Two backends are available:
+
+* :class:`MemoryBackend` - in-process LRU, bounded by entry count,
+* :class:`SQLiteBackend` - on-disk, shared between runs and processes.
+
+Entries expire after ``ttl`` seconds. The cache plugs into both ways the
+examples talk to models:
+
+* library mode: :meth:`CompletionCache.install` wraps ``litellm.completion``
+  and ``litellm.acompletion``,
+* proxy mode: :class:`CachingTransport` / :class:`AsyncCachingTransport` are
+  ``httpx`` transports for the OpenAI-compatible clients;
+  :meth:`CompletionCache.instrument_client` puts them under an existing client
+  (for example the shared clients of :mod:`agent_utils.http_pool`).
+
+Enable it for an example without code changes with ``COMPLETION_CACHE=memory``
+or ``COMPLETION_CACHE=path/to/cache.sqlite`` (see :func:`install_from_env`).
+Streaming requests are never cached.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable
+
+import httpx
+
+#: Request fields that change the model's answer and therefore the cache key.
+KEY_FIELDS = (
+    "model",
+    "messages",
+    "tools",
+    "tool_choice",
+    "functions",
+    "function_call",
+    "response_format",
+    "temperature",
+    "top_p",
+    "max_tokens",
+    "max_completion_tokens",
+    "n",
+    "stop",
+    "seed",
+    "reasoning_effort",
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if hasattr(value, "model_dump"):
+        return _normalize(value.model_dump(exclude_none=True))
+    return value
+
+
+def request_key(request: dict) -> str:
+    """Stable hash of the parts of a completion request that affect the answer.
+
+    Whitespace differences in prompts and key order in tool schemas do not
+    change the key; transport details (API key, base URL, timeouts, ``stream``)
+    are ignored.
+    """
+    relevant = {name: _normalize(request[name]) for name in KEY_FIELDS if request.get(name) is not None}
+    data = json.dumps(relevant, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+@dataclass
+class Entry:
+    payload: bytes
+    expires_at: float
+    latency: float
+
+
+class MemoryBackend:
+    """Thread-safe in-memory LRU store."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Entry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """On-disk store; least recently used entries are evicted beyond ``max_entries``.
+
+    Eviction runs every ``evict_every`` inserts (1% of ``max_entries`` by
+    default), so the store may briefly hold that many entries too many.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], max_entries: int = 100_000, evict_every: int | None = None):
+        self.max_entries = max_entries
+        self.evict_every = evict_every or max(1, max_entries // 100)
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.fspath(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, payload BLOB NOT NULL, expires_at REAL NOT NULL, "
+            "latency REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used)")
+
+    def get(self, key: str) -> Entry | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, expires_at, latency FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+        return None if row is None else Entry(bytes(row[0]), row[1], row[2])
+
+    def set(self, key: str, entry: Entry) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+                (key, entry.payload, entry.expires_at, entry.latency, time.time()),
+            )
+            self._inserts += 1
+            if self._inserts >= self.evict_every:
+                self._inserts = 0
+                self._evict()
+
+    def _evict(self) -> None:
+        # Called with the lock held: expired entries first, then the least recently used
+        self._db.execute("DELETE FROM completions WHERE expires_at < ?", (time.time(),))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM completions").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM completions WHERE key IN (SELECT key FROM completions ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM completions")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "hit_ratio": self.hit_ratio}
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_ratio:.0%} hit ratio), "
+            f"{self.bypassed} bypassed, {self.saved_seconds:.2f}s of model latency saved"
+        )
+
+
+class CompletionCache:
+    """Cache front-end: TTL handling, statistics and the framework hooks."""
+
+    def __init__(self, backend: MemoryBackend | SQLiteBackend | None = None, ttl: float = 3600.0):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str) -> bytes | None:
+        entry = self.backend.get(key)
+        if entry is not None and entry.expires_at < time.time():
+            self.backend.delete(key)
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self.stats.saved_seconds += entry.latency
+        return entry.payload
+
+    def store(self, key: str, payload: bytes, latency: float) -> None:
+        self.backend.set(key, Entry(payload, time.time() + self.ttl, latency))
+
+    def bypass(self) -> None:
+        with self._lock:
+            self.stats.bypassed += 1
+
+    # Library mode
+
+    def wrap_completion(self, completion: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(completion)
+        def cached_completion(*args, **kwargs):
+            if kwargs.get("stream") or args:
+                self.bypass()
+                return completion(*args, **kwargs)
+            key = request_key(kwargs)
+            payload = self.lookup(key)
+            if payload is not None:
+                return _to_model_response(payload)
+            start = time.perf_counter()
+            response = completion(**kwargs)
+            self.store(key, _from_model_response(response), time.perf_counter() - start)
+            return response
+
+        return cached_completion
+
+    def wrap_acompletion(self, acompletion: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(acompletion)
+        async def cached_acompletion(*args, **kwargs):
+            if kwargs.get("stream") or args:
+                self.bypass()
+                return await acompletion(*args, **kwargs)
+            key = request_key(kwargs)
+            payload = self.lookup(key)
+            if payload is not None:
+                return _to_model_response(payload)
+            start = time.perf_counter()
+            response = await acompletion(**kwargs)
+            self.store(key, _from_model_response(response), time.perf_counter() - start)
+            return response
+
+        return cached_acompletion
+
+    def install(self) -> Callable[[], None]:
+        """Serve ``litellm.completion``/``acompletion`` from this cache; returns an undo function."""
+        from agent_utils.litellm_hooks import wrap_completions
+
+        return wrap_completions(self.wrap_completion, self.wrap_acompletion)
+
+    def instrument_client(self, client: httpx.Client | httpx.AsyncClient) -> None:
+        """Serve the chat completions sent through an existing ``httpx`` client from this cache."""
+        # httpx only takes a transport in the constructor; wrapping the default
+        # one keeps the pool settings and event hooks of shared clients
+        transport = client._transport
+        if isinstance(transport, (CachingTransport, AsyncCachingTransport)):
+            return
+        if isinstance(client, httpx.AsyncClient):
+            client._transport = AsyncCachingTransport(self, transport)
+        else:
+            client._transport = CachingTransport(self, transport)
+
+
+def _from_model_response(response: Any) -> bytes:
+    data = response.model_dump() if hasattr(response, "model_dump") else dict(response)
+    return json.dumps(data, default=str).encode()
+
+
+def _to_model_response(payload: bytes) -> Any:
+    import litellm
+
+    response = litellm.ModelResponse(**json.loads(payload))
+    response._hidden_params["cache_hit"] = True
+    return response
+
+
+# Proxy mode
+
+
+def _cache_key_for(request: httpx.Request) -> str | None:
+    if request.method != "POST" or not request.url.path.endswith("/chat/completions"):
+        return None
+    try:
+        body = json.loads(request.content)
+    except ValueError:
+        return None
+    if body.get("stream"):
+        return None
+    return request_key(body)
+
+
+def _cached_response(request: httpx.Request, payload: bytes) -> httpx.Response:
+    headers = {"content-type": "application/json", "x-cache": "HIT"}
+    return httpx.Response(200, headers=headers, content=payload, request=request)
+
+
+class CachingTransport(httpx.BaseTransport):
+    """``httpx`` transport that answers repeated chat-completion requests from a cache."""
+
+    def __init__(self, cache: CompletionCache, transport: httpx.BaseTransport | None = None):
+        self.cache = cache
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = _cache_key_for(request)
+        if key is None:
+            self.cache.bypass()
+            return self.transport.handle_request(request)
+        payload = self.cache.lookup(key)
+        if payload is not None:
+            return _cached_response(request, payload)
+        start = time.perf_counter()
+        response = self.transport.handle_request(request)
+        if response.status_code == 200:
+            self.cache.store(key, response.read(), time.perf_counter() - start)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncCachingTransport(httpx.AsyncBaseTransport):
+    """Async variant of :class:`CachingTransport` for ``httpx.AsyncClient``."""
+
+    def __init__(self, cache: CompletionCache, transport: httpx.AsyncBaseTransport | None = None):
+        self.cache = cache
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = _cache_key_for(request)
+        if key is None:
+            self.cache.bypass()
+            return await self.transport.handle_async_request(request)
+        payload = self.cache.lookup(key)
+        if payload is not None:
+            return _cached_response(request, payload)
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        if response.status_code == 200:
+            self.cache.store(key, await response.aread(), time.perf_counter() - start)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def cache_from_env() -> CompletionCache | None:
+    """Build the cache selected by ``COMPLETION_CACHE`` (``memory`` or a SQLite path).
+
+    ``COMPLETION_CACHE_TTL`` sets the TTL in seconds and
+    ``COMPLETION_CACHE_SIZE`` the maximum number of entries.
+    """
+    target = os.getenv("COMPLETION_CACHE")
+    if not target:
+        return None
+    ttl = float(os.getenv("COMPLETION_CACHE_TTL", "3600"))
+    size = os.getenv("COMPLETION_CACHE_SIZE")
+    if target == "memory":
+        backend = MemoryBackend(int(size or 1024))
+    else:
+        backend = SQLiteBackend(target, int(size or 100_000))
+    return CompletionCache(backend, ttl=ttl)
+
+
+def install_from_env() -> CompletionCache | None:
+    """Install the cache selected by ``COMPLETION_CACHE`` on LiteLLM and the shared proxy clients, if any."""
+    cache = cache_from_env()
+    if cache is not None:
+        from agent_utils.http_pool import shared_async_client, shared_client
+
+        cache.install()
+        cache.instrument_client(shared_client())
+        cache.instrument_client(shared_async_client())
+    return cache
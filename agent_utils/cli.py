@@ -0,0 +1,259 @@
+"""One command-line entry point for the weather agent of every framework.
+
+Selects a framework adapter (see :mod:`agent_utils.frameworks`) and a model,
+and answers prompts given as arguments, on stdin or in a JSONL file::
+
+    python -m agent_utils.cli -f crewai -m sap/gpt-4o "What's the weather in Paris?"
+    echo "What's the weather in Oslo?" | python -m agent_utils.cli -f pydantic_ai
+    python -m agent_utils.cli -f ag2 --input prompts.jsonl --output results.jsonl --workers 4
+
+Input lines are either plain text prompts or JSON objects like
+``{"id": ..., "prompt": "..."}`` or ``{"id": ..., "city": "..."}``.
+
+With ``--workers N`` prompts are spread over a pool of N processes. Each
+worker imports the framework and builds the agent once, then reuses it for
+every prompt it receives, so framework overhead that is CPU-bound (CrewAI,
+AG2 group chat orchestration) scales across cores instead of queueing behind
+the GIL. Results are written as soon as they finish (not in input order) and
+a throughput and latency summary goes to stderr.
+
+``--trace spans.jsonl`` (or ``otlp``) records an OpenTelemetry trace per
+prompt, with spans for the agent run, every LLM request and every tool call
+(see :mod:`agent_utils.tracing`); ``python -m agent_utils.span_collector
+report spans.jsonl`` breaks the latency down.
+
+``--replay evals.sqlite`` answers every LLM call from recorded responses
+instead of the model, and ``--replay-mode record`` (or ``auto``) records them
+first (see :mod:`agent_utils.replay`). ``--deployments`` spreads the LLM calls
+over several model deployments with fallback on 429/5xx (see
+:mod:`agent_utils.router`). ``--rpm``/``--tpm`` keep the LLM calls within a
+request and token budget, with a concurrency limit that backs off on 429s
+(see :mod:`agent_utils.ratelimit`); pool workers split the budgets evenly.
+
+Without ``--api-base`` (or ``PROXY_BASE_URL``) library-mode frameworks call
+SAP Generative AI Hub directly through LiteLLM; otherwise every LLM call goes
+to the given proxy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator, TextIO
+
+from agent_utils.cache import install_from_env as install_cache_from_env
+from agent_utils.frameworks import ADAPTERS, AgentAdapter, get_adapter
+from agent_utils.ratelimit import install_from_env as install_limiter_from_env
+from agent_utils.replay import MODES as REPLAY_MODES, install_from_env as install_replay_from_env
+from agent_utils.router import STRATEGIES, install_from_env as install_router_from_env
+from agent_utils.stats import LatencyStats
+from agent_utils.tracing import agent_span, setup_from_env
+from agent_utils.usage import RunRecord, UsageRecorder
+from agent_utils.weather_service import speculate_weather
+
+DEFAULT_MODEL = "sap/gpt-4o"
+
+
+def parse_prompts(lines: Iterable[str]) -> Iterator[tuple[object, str]]:
+    """``(id, prompt)`` pairs from plain-text or JSONL lines; blank lines are skipped."""
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            record = json.loads(line)
+            prompt = record.get("prompt") or f"What's the weather in {record['city']}?"
+            yield record.get("id", line_no), prompt
+        else:
+            yield line_no, line
+
+
+def build_adapter(
+    framework: str, model: str, api_base: str | None, api_key: str | None, limiter_share: float = 1.0
+) -> AgentAdapter:
+    """Set up the adapter with routing, rate limiting, record/replay, the response cache and usage accounting.
+
+    They are installed on LiteLLM and the shared proxy clients; ``limiter_share``
+    is this process's share of the rate limits.
+    """
+    from agent_utils.http_pool import shared_async_client, shared_client
+
+    adapter = get_adapter(framework)(model=model, api_base=api_base, api_key=api_key)
+    adapter.setup()
+    # Innermost first: replay keys on the requested model, not the routed one,
+    # replayed and cached calls skip the rate limits, and the usage recorder counts them too
+    install_router_from_env()
+    install_limiter_from_env(limiter_share)
+    install_replay_from_env()
+    install_cache_from_env()  # COMPLETION_CACHE, see PERFORMANCE.md
+    UsageRecorder.instrument_client(shared_client())
+    UsageRecorder.instrument_client(shared_async_client())
+    if adapter.library_mode:
+        UsageRecorder.install_litellm()
+    return adapter
+
+
+def answer(adapter: AgentAdapter, query_id: object, prompt: str) -> dict:
+    """Run one prompt; the result carries the run's usage record under ``usage``."""
+    recorder = UsageRecorder()
+    result = {"id": query_id, "prompt": prompt}
+    try:
+        with recorder.run(adapter.name, adapter.model, query_id), agent_span(adapter.name, adapter.model):
+            speculate_weather(prompt)  # TOOL_PREFETCH=1: look the city up during the first LLM call
+            result["answer"] = adapter.run(prompt)
+    except Exception as e:  # noqa: BLE001 - reported per prompt, the run goes on
+        result["error"] = repr(e)
+    usage = recorder.records[0].as_dict()
+    result.update(latency_s=round(usage["wall_s"], 4), usage=usage, pid=os.getpid())
+    return result
+
+
+# Worker processes: one adapter per process, built by the pool initializer
+
+_worker_adapter: AgentAdapter | None = None
+
+
+def _init_worker(framework: str, model: str, api_base: str | None, api_key: str | None, limiter_share: float) -> None:
+    global _worker_adapter
+    setup_from_env(f"agent-cli-{framework}")
+    _worker_adapter = build_adapter(framework, model, api_base, api_key, limiter_share)
+
+
+def _worker_answer(query_id: object, prompt: str) -> dict:
+    return answer(_worker_adapter, query_id, prompt)
+
+
+def run_in_process(args, prompts: Iterable[tuple[object, str]]) -> Iterator[dict]:
+    setup_from_env(f"agent-cli-{args.framework}")
+    adapter = build_adapter(args.framework, args.model, args.api_base, args.api_key)
+    try:
+        for query_id, prompt in prompts:
+            yield answer(adapter, query_id, prompt)
+    finally:
+        adapter.close()
+
+
+def run_in_pool(args, prompts: Iterable[tuple[object, str]]) -> Iterator[dict]:
+    initargs = (args.framework, args.model, args.api_base, args.api_key, 1 / args.workers)
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=initargs) as pool:
+        # A bounded number of prompts in flight keeps memory flat for large inputs
+        pending: set[Future] = set()
+        for item in prompts:
+            pending.add(pool.submit(_worker_answer, *item))
+            if len(pending) >= args.workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in done)
+        for future in wait(pending).done:
+            yield future.result()
+
+
+def add_replay_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--replay", help="record/replay store of LLM responses (default: $LLM_REPLAY)")
+    parser.add_argument("--replay-mode", choices=REPLAY_MODES, help="default: $LLM_REPLAY_MODE or replay")
+
+
+def apply_replay_arguments(args: argparse.Namespace) -> None:
+    # Read by build_adapter in this process and in the pool workers
+    if args.replay:
+        os.environ["LLM_REPLAY"] = args.replay
+    if args.replay_mode:
+        os.environ["LLM_REPLAY_MODE"] = args.replay_mode
+
+
+def write_result(result: dict, out: TextIO, jsonl: bool) -> None:
+    if jsonl:
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    elif "error" in result:
+        out.write(f"[{result['id']}] error: {result['error']}\n")
+    else:
+        out.write(f"{result['answer']}\n")
+    out.flush()
+
+
+def main(argv: list[str] | None = None) -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()  # before the defaults below read the environment
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("prompts", nargs="*", help="prompts to answer (default: read from --input or stdin)")
+    parser.add_argument("-f", "--framework", default="langgraph", choices=list(ADAPTERS))
+    parser.add_argument("-m", "--model", default=DEFAULT_MODEL)
+    parser.add_argument("--api-base", default=os.getenv("PROXY_BASE_URL"), help="proxy URL (default: $PROXY_BASE_URL)")
+    parser.add_argument("--api-key", default=os.getenv("LITELLM_PROXY_API_KEY"))
+    parser.add_argument("-i", "--input", help="file with one prompt or JSON object per line ('-' for stdin)")
+    parser.add_argument("-o", "--output", help="JSONL file results are appended to (default: stdout)")
+    parser.add_argument("--jsonl", action="store_true", help="write JSONL records to stdout instead of answers")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="worker processes (0: answer in this process)")
+    parser.add_argument("--usage", help="JSONL file per-run usage records are appended to")
+    parser.add_argument("--metrics", help="file the aggregated usage is written to in Prometheus text format")
+    parser.add_argument("--trace", help="span JSONL file, 'otlp' or 'console' (default: $TRACE_SPANS)")
+    parser.add_argument("--deployments", help="model[@api_base],... to route between (default: $MODEL_DEPLOYMENTS)")
+    parser.add_argument("--strategy", choices=STRATEGIES, help="routing strategy (default: $MODEL_ROUTER_STRATEGY)")
+    parser.add_argument("--rpm", type=float, help="LLM requests per minute, all workers together (default: $RATE_LIMIT_RPM)")
+    parser.add_argument("--tpm", type=float, help="LLM tokens per minute, all workers together (default: $RATE_LIMIT_TPM)")
+    add_replay_arguments(parser)
+    args = parser.parse_args(argv)
+    # Read by this process and the pool workers
+    if args.trace:
+        os.environ["TRACE_SPANS"] = args.trace
+    if args.deployments:
+        os.environ["MODEL_DEPLOYMENTS"] = args.deployments
+    if args.strategy:
+        os.environ["MODEL_ROUTER_STRATEGY"] = args.strategy
+    if args.rpm:
+        os.environ["RATE_LIMIT_RPM"] = f"{args.rpm:g}"
+    if args.tpm:
+        os.environ["RATE_LIMIT_TPM"] = f"{args.tpm:g}"
+    apply_replay_arguments(args)
+
+    if args.prompts:
+        prompts = enumerate(args.prompts, 1)
+    elif args.input and args.input != "-":
+        prompts = parse_prompts(open(args.input, encoding="utf-8"))
+    else:
+        prompts = parse_prompts(sys.stdin)
+
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    jsonl = args.jsonl or bool(args.output)
+    run = run_in_pool if args.workers > 0 else run_in_process
+    recorder = UsageRecorder(sink=args.usage)
+
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    first = None  # the first answer marks the end of framework start-up
+    try:
+        for result in run(args, prompts):
+            first = first or time.perf_counter()
+            write_result(result, out, jsonl)
+            recorder.add(RunRecord.from_dict(result["usage"]))
+            if "error" in result:
+                errors += 1
+            else:
+                latencies.append(result["latency_s"])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        recorder.close()
+    end = time.perf_counter()
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(recorder.prometheus())
+
+    done = len(latencies) + errors
+    if done > 1:
+        print(
+            f"{args.framework}: {done} prompts ({errors} failed) in {end - start:.1f}s, "
+            f"first answer after {first - start:.1f}s, then {(done - 1) / (end - first):.2f} prompts/s\n"
+            f"Latency: {LatencyStats.from_samples(latencies)}",
+            file=sys.stderr,
+        )
+    if recorder.records:
+        print(f"Usage per run:\n{recorder.summary()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
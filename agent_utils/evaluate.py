@@ -0,0 +1,148 @@
+"""Bulk evaluation of the weather agent against recorded LLM responses.
+
+Runs an evaluation set through one framework adapter (like :mod:`agent_utils.cli`)
+and checks every answer. Record the model's responses once, then replay them
+on every change to the agent code: no network, no model cost, the same answers
+every time, and thousands of prompts in seconds::
+
+    python -m agent_utils.evaluate -f langgraph evals.jsonl --replay evals.sqlite --replay-mode record
+    python -m agent_utils.evaluate -f langgraph evals.jsonl --replay evals.sqlite --baseline last.jsonl
+
+Each line of the evaluation set is a prompt or a JSON object::
+
+    {"id": 1, "city": "London"}
+    {"id": 2, "prompt": "Is it raining in Tokyo?", "expect": ["18°C"], "expect_tool_calls": 1}
+
+``expect`` lists strings the answer must contain (case-insensitive); a
+``city`` case expects the temperature of that city's weather report by
+default. ``expect_tool_calls`` is the exact number of tool calls of the run.
+
+``--output`` writes one result per case, with ``passed`` and ``failures``.
+With ``--baseline`` (the output of an earlier run) changed answers and the
+latency difference are reported too. The exit status is 1 if a case failed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Iterable, Iterator
+
+from agent_utils.cli import DEFAULT_MODEL, add_replay_arguments, apply_replay_arguments, run_in_pool, run_in_process
+from agent_utils.frameworks import ADAPTERS
+from agent_utils.stats import LatencyStats
+from agent_utils.weather import weather_report
+
+_TEMPERATURE = re.compile(r"-?\d+(?:\.\d+)?\s*°[CF]")
+
+
+def load_cases(lines: Iterable[str]) -> Iterator[dict]:
+    """Evaluation cases from plain-text or JSONL lines; blank lines are skipped."""
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        case = json.loads(line) if line.startswith("{") else {"prompt": line}
+        case.setdefault("id", line_no)
+        if "prompt" not in case:
+            case["prompt"] = f"What's the weather in {case['city']}?"
+        if "expect" not in case and "city" in case:
+            case["expect"] = _TEMPERATURE.findall(weather_report(case["city"]))
+        yield case
+
+
+def check(case: dict, result: dict) -> list[str]:
+    """The reasons ``result`` fails ``case``; empty if it passes."""
+    if "error" in result:
+        return [f"error: {result['error']}"]
+    answer = result["answer"].lower()
+    failures = [f"missing {text!r}" for text in case.get("expect", ()) if text.lower() not in answer]
+    expected_calls = case.get("expect_tool_calls")
+    if expected_calls is not None and result["usage"]["tool_calls"] != expected_calls:
+        failures.append(f"{result['usage']['tool_calls']} tool calls, expected {expected_calls}")
+    return failures
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return {record["id"]: record for record in map(json.loads, filter(str.strip, f))}
+
+
+def compare(results: list[dict], baseline: dict) -> str:
+    """Changed answers and latency against an earlier run."""
+    common = [result for result in results if result["id"] in baseline]
+    changed = [
+        result["id"] for result in common
+        if result.get("answer") != baseline[result["id"]].get("answer")
+    ]
+    now = LatencyStats.from_samples(result["latency_s"] for result in common)
+    before = LatencyStats.from_samples(baseline[result["id"]]["latency_s"] for result in common)
+    lines = [f"Baseline: {len(common)} cases in common, {len(changed)} answers changed"]
+    if changed:
+        lines.append(f"  changed: {', '.join(map(str, changed[:20]))}{' ...' if len(changed) > 20 else ''}")
+    if common:
+        lines.append(
+            f"  p50 latency {now.p50 * 1000:.1f} ms (baseline {before.p50 * 1000:.1f} ms), "
+            f"p95 {now.p95 * 1000:.1f} ms (baseline {before.p95 * 1000:.1f} ms)"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", help="evaluation set: one prompt or JSON object per line")
+    parser.add_argument("-f", "--framework", default="langgraph", choices=list(ADAPTERS))
+    parser.add_argument("-m", "--model", default=DEFAULT_MODEL)
+    parser.add_argument("--api-base", default=os.getenv("PROXY_BASE_URL"), help="proxy URL (default: $PROXY_BASE_URL)")
+    parser.add_argument("--api-key", default=os.getenv("LITELLM_PROXY_API_KEY"))
+    parser.add_argument("-w", "--workers", type=int, default=0, help="worker processes (0: run in this process)")
+    parser.add_argument("-o", "--output", help="JSONL file the results are written to")
+    parser.add_argument("--baseline", help="results of an earlier run to compare answers and latency with")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every failed case")
+    add_replay_arguments(parser)
+    args = parser.parse_args(argv)
+    apply_replay_arguments(args)
+
+    with open(args.cases, encoding="utf-8") as f:
+        cases = {case["id"]: case for case in load_cases(f)}
+    run = run_in_pool if args.workers > 0 else run_in_process
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+
+    results, failed = [], 0
+    start = time.perf_counter()
+    try:
+        for result in run(args, ((case_id, case["prompt"]) for case_id, case in cases.items())):
+            failures = check(cases[result["id"]], result)
+            result.update(passed=not failures, failures=failures)
+            results.append(result)
+            if failures:
+                failed += 1
+                if args.verbose:
+                    print(f"[{result['id']}] {'; '.join(failures)}", file=sys.stderr)
+            if out is not None:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    latency = LatencyStats.from_samples(result["latency_s"] for result in results)
+    print(
+        f"{args.framework}: {len(results) - failed}/{len(results)} cases passed in {elapsed:.1f}s "
+        f"({len(results) / elapsed:.1f} cases/s)\nLatency: {latency}",
+        file=sys.stderr,
+    )
+    if args.baseline:
+        print(compare(results, load_results(args.baseline)), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
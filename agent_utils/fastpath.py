@@ -0,0 +1,114 @@
+"""One-completion answers for prompts whose tool calls are predictable.
+
+ReAct-style agents (LlamaIndex's ``ReActAgent``, smolagents' ``CodeAgent``)
+spend two to four model calls on a weather question: one to decide to call
+``get_weather``, sometimes one to correct the format, and one to write the
+answer. The weather lookup is deterministic and its argument is in the
+prompt, so a :class:`FastPath` runs the lookups first and asks the model once,
+with the results after the question::
+
+    fast = FastPath("sap/gpt-5", lookup=get_weather, system_prompt=SYSTEM_PROMPT, temperature=1)
+    answer = fast.answer(prompt)          # or: await fast.aanswer(prompt)
+    if answer is None:                    # no city in the prompt: run the agent
+        answer = agent.run(prompt)
+
+The completion goes through ``litellm.completion``/``acompletion``, so usage
+accounting, tracing, the cache and the proxy settings apply to it as they do
+to the agents. ``TOOL_FAST_PATH=1`` turns it on in the adapters and examples
+that support it (see :func:`fast_path_enabled`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from agent_utils.prompt_cache import PromptLayout
+from agent_utils.weather import extract_cities
+
+CONTEXT_HEADER = (
+    "The {tool} tool has already been called for the question. "
+    "Answer from its results after the question; do not call any tools."
+)
+
+
+def fast_path_enabled() -> bool:
+    """Whether the single-completion fast path is on (``TOOL_FAST_PATH`` is set to a true value)."""
+    return os.getenv("TOOL_FAST_PATH", "").lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class FastPathStats:
+    answered: int = 0
+    fallbacks: int = 0  # prompts left to the agent loop
+
+
+def _result_text(result: Any) -> str:
+    return result if isinstance(result, str) else json.dumps(result, default=str)
+
+
+class FastPath:
+    """Answers with one completion after running ``lookup(city)`` for every city in the prompt.
+
+    ``lookup`` is the agent's own tool function (sync), so the model sees the
+    same results the agent loop would have given it. Extra keyword arguments
+    (``temperature``, ...) are passed to the completion.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        lookup: Callable[[str], Any],
+        system_prompt: str = "",
+        extract: Callable[[str], list[str]] = extract_cities,
+        tool_name: str = "get_weather",
+        **completion_kwargs: Any,
+    ):
+        self.model = model
+        self.lookup = lookup
+        self.system_prompt = system_prompt
+        self.extract = extract
+        self.tool_name = tool_name
+        self.completion_kwargs = completion_kwargs
+        self.stats = FastPathStats()
+        # The system prompt is the same for every question; the results go last (prompt caching)
+        self.layout = PromptLayout("\n\n".join(filter(None, [system_prompt, CONTEXT_HEADER.format(tool=tool_name)])))
+
+    def _request(self, prompt: str, cities: list[str], results: list[Any]) -> dict:
+        context = "\n".join(
+            f"{self.tool_name}(city={city!r}) -> {_result_text(result)}" for city, result in zip(cities, results)
+        )
+        return self.layout.request(self.model, prompt, context=context, **self.completion_kwargs)
+
+    def _cities(self, prompt: str) -> list[str]:
+        cities = self.extract(prompt)
+        if not cities:
+            self.stats.fallbacks += 1
+        return cities
+
+    def _answered(self, response: Any) -> str:
+        self.stats.answered += 1
+        return response.choices[0].message.content or ""
+
+    def answer(self, prompt: str) -> str | None:
+        """The model's answer in one completion, or ``None`` when the tool calls can't be predicted."""
+        import litellm
+
+        cities = self._cities(prompt)
+        if not cities:
+            return None
+        results = [self.lookup(city) for city in cities]
+        return self._answered(litellm.completion(**self._request(prompt, cities, results)))
+
+    async def aanswer(self, prompt: str) -> str | None:
+        """Async :meth:`answer`; the lookups run concurrently in worker threads."""
+        import litellm
+
+        cities = self._cities(prompt)
+        if not cities:
+            return None
+        results = await asyncio.gather(*(asyncio.to_thread(self.lookup, city) for city in cities))
+        return self._answered(await litellm.acompletion(**self._request(prompt, cities, list(results))))
@@ -0,0 +1,407 @@
+"""The weather agent of every example, behind one small interface.
+
+Each adapter builds its agent with the ``build_agent()`` (``build_crew()``,
+``build_pattern()``) function of the corresponding example script, passing
+the model and the proxy endpoint, and only adds what it takes to run the agent
+on a prompt. That lets benchmarks, the batch tools and the CLI drive all
+frameworks through the same task::
+
+    adapter = get_adapter("langgraph")(model="sap/gpt-4o", api_base=proxy_url, api_key="sk-stub")
+    adapter.setup()
+    print(adapter.run("What's the weather in London?"))
+
+The examples are loaded by path (:func:`load_example`) and import their
+framework when the agent is built, in :meth:`AgentAdapter.setup`, so importing
+this module is cheap and frameworks that are not installed only fail when used.
+With ``api_base=None`` library-mode frameworks call SAP Generative AI Hub
+directly through LiteLLM; otherwise every LLM call goes to the given proxy.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import importlib.util
+import os
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Iterable, Iterator
+
+from agent_utils.fastpath import FastPath, fast_path_enabled
+from agent_utils.history import HistoryCompactor
+from agent_utils.tracing import traced_tool
+from agent_utils.weather import extract_cities
+from agent_utils.weather_service import fetch_weather_report
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@functools.lru_cache(maxsize=None)
+def load_example(path: str) -> ModuleType:
+    """Import the example script at ``path`` (relative to the repository root).
+
+    The examples are scripts, not a package, so they are loaded by path the way
+    ``benchmarks/bench_startup.py`` does. The module is registered under its
+    file name and executed once per process; its ``main()`` does not run.
+    """
+    name = Path(path).stem
+    spec = importlib.util.spec_from_file_location(name, ROOT / path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# The examples' tools for the async-native frameworks are async; with
+# ``async_tools = False`` their adapters use this one, which blocks the event loop
+@traced_tool
+def get_weather(city: str) -> str:
+    """Retrieves the current weather report for a specified city.
+
+    Args:
+        city (str): The name of the city to retrieve weather information for.
+    """
+    return fetch_weather_report(city)
+
+
+class AgentAdapter:
+    """Base class: build the example's weather agent once, run it many times."""
+
+    name: str = ""
+    #: The example script the agent is built with, relative to the repository root.
+    example: str = ""
+    #: Top-level modules the framework needs, used to measure import cost.
+    modules: tuple[str, ...] = ()
+    #: Whether the example uses LiteLLM as a library (rather than only via the proxy).
+    library_mode: bool = True
+
+    def __init__(
+        self,
+        model: str = "sap/gpt-4o",
+        api_base: str | None = None,
+        api_key: str | None = None,
+        compactor: HistoryCompactor | None = None,
+    ):
+        self.model = model
+        self.api_base = api_base
+        self.api_key = api_key or os.getenv("LITELLM_PROXY_API_KEY") or "sk-1234"
+        #: Compacts the history sent with each LLM call in :meth:`chat` (LangGraph and AG2).
+        self.compactor = compactor
+
+    def _use_proxy(self) -> None:
+        # Route LiteLLM library calls through the proxy (or the offline stub).
+        import litellm
+
+        if self.api_base:
+            os.environ["LITELLM_PROXY_API_BASE"] = self.api_base
+            os.environ["LITELLM_PROXY_API_KEY"] = self.api_key
+            litellm.use_litellm_proxy = True
+
+    def setup(self) -> None:
+        raise NotImplementedError
+
+    def run(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def chat(self, prompts: Iterable[str]) -> Iterator[str]:
+        """Answer ``prompts`` as one conversation: each is sent with the history of the ones before."""
+        raise NotImplementedError(f"{self.name} has no multi-turn mode")
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncAgentAdapter(AgentAdapter):
+    """Adapter for async-native frameworks; keeps one event loop for all runs."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop
+
+    async def arun(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def run(self, prompt: str) -> str:
+        return self.loop.run_until_complete(self.arun(prompt))
+
+    def close(self) -> None:
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+
+class LangGraphAdapter(AgentAdapter):
+    name = "langgraph"
+    example = "langgraph_example/langgraph_agent.py"
+    modules = ("langgraph", "langchain_litellm")
+
+    def setup(self) -> None:
+        self._use_proxy()
+        from langchain_core.messages import HumanMessage
+
+        _, _, self._agent = load_example(self.example).build_agent(self.model, self.compactor)
+        self._human = HumanMessage
+
+    def run(self, prompt: str) -> str:
+        return self._agent.invoke([self._human(content=prompt)])[-1].content
+
+    def chat(self, prompts: Iterable[str]) -> Iterator[str]:
+        messages = []
+        for prompt in prompts:
+            messages = self._agent.invoke([*messages, self._human(content=prompt)])
+            yield messages[-1].content
+
+
+class CrewAIAdapter(AgentAdapter):
+    name = "crewai"
+    example = "crewai_example/crewai_litellm_lib.py"
+    #: Used instead of :attr:`example` when the adapter is given a proxy.
+    proxy_example = "crewai_example/crewai_litellm_proxy.py"
+    modules = ("crewai",)
+
+    def setup(self) -> None:
+        if self.api_base:
+            self._crew = load_example(self.proxy_example).build_crew(self.model, self.api_base, self.api_key)
+        else:
+            self._crew = load_example(self.example).build_crew(self.model)
+        # The examples print the crew's progress (or stream it with STREAM_TOKENS)
+        self._crew.verbose = False
+        self._crew.stream = False
+
+    def run(self, prompt: str) -> str:
+        # The examples' task ends with "Weather in {city}."
+        return str(self._crew.kickoff(inputs={"city": ", ".join(extract_cities(prompt)) or prompt}))
+
+
+class PydanticAIAdapter(AgentAdapter):
+    name = "pydantic_ai"
+    example = "pydantic_ai_example/pydantic_ai_litellm_proxy.py"
+    modules = ("pydantic_ai",)
+    library_mode = False
+
+    def setup(self) -> None:
+        self._agent = load_example(self.example).build_agent(self.model, self.api_base, self.api_key)
+
+    def run(self, prompt: str) -> str:
+        return self._agent.run_sync(prompt).output
+
+
+class GoogleADKAdapter(AsyncAgentAdapter):
+    name = "google_adk"
+    example = "google_adk_example/google_adk.py"
+    modules = ("google.adk",)
+
+    def setup(self) -> None:
+        self._use_proxy()
+        from google.adk.runners import InMemoryRunner
+        from google.genai import types
+
+        agent = load_example(self.example).build_agent(self.model)
+        self._runner = InMemoryRunner(agent=agent, app_name="weather_benchmark_app")
+        self._types = types
+
+    async def arun(self, prompt: str) -> str:
+        # A fresh session per run keeps the prompt size identical across runs.
+        session = await self._runner.session_service.create_session(app_name=self._runner.app_name, user_id="user_1")
+        content = self._types.Content(role="user", parts=[self._types.Part(text=prompt)])
+        answer = ""
+        async for event in self._runner.run_async(user_id="user_1", session_id=session.id, new_message=content):
+            if event.is_final_response() and event.content and event.content.parts:
+                answer = event.content.parts[0].text or ""
+        return answer
+
+
+class OpenAIAgentsAdapter(AsyncAgentAdapter):
+    name = "openai_agents"
+    example = "openai_adk_example/openai_adk.py"
+    modules = ("agents",)
+
+    def setup(self) -> None:
+        self._use_proxy()
+        from agents import Runner
+
+        self._agent = load_example(self.example).build_agent(self.model)
+        self._runner = Runner
+
+    async def arun(self, prompt: str) -> str:
+        result = await self._runner.run(self._agent, prompt)
+        return str(result.final_output)
+
+
+class StrandsAdapter(AgentAdapter):
+    name = "strands"
+    example = "aws_strands_example/aws_strands.py"
+    modules = ("strands",)
+
+    def setup(self) -> None:
+        self._use_proxy()
+        from strands.handlers.callback_handler import null_callback_handler
+
+        self._build = load_example(self.example).build_agent
+        self._quiet = null_callback_handler
+
+    def run(self, prompt: str) -> str:
+        # Strands agents keep the conversation; a new one per run keeps runs independent.
+        agent = self._build(self.model)
+        agent.callback_handler = self._quiet  # the example prints the reply as it arrives
+        return str(agent(prompt))
+
+
+class LlamaIndexAdapter(AsyncAgentAdapter):
+    name = "llamaindex"
+    example = "LlamaIndex_example/LlamaIndex_litellm.py"
+    modules = ("llama_index.core", "llama_index.llms.litellm")
+
+    def setup(self) -> None:
+        self._use_proxy()
+        example = load_example(self.example)
+        self._agent = example.build_agent(self.model)
+        # TOOL_FAST_PATH=1: one completion with the lookups done up front, the ReAct loop as fallback
+        self._fast = FastPath(self.model, example.get_weather, temperature=1) if fast_path_enabled() else None
+
+    async def arun(self, prompt: str) -> str:
+        if self._fast is not None:
+            answer = await self._fast.aanswer(prompt)
+            if answer is not None:
+                return answer
+        return str(await self._agent.run(user_msg=prompt))
+
+
+class SmolagentsAdapter(AgentAdapter):
+    name = "smolagents"
+    example = "smolagents_example/smolagents_litellm.py"
+    modules = ("smolagents",)
+
+    def setup(self) -> None:
+        self._use_proxy()
+        example = load_example(self.example)
+        self._agent = example.build_agent(self.model)
+        # TOOL_FAST_PATH=1: one completion with the lookups done up front, the code agent as fallback
+        self._fast = FastPath(self.model, example.get_weather) if fast_path_enabled() else None
+
+    def run(self, prompt: str) -> str:
+        if self._fast is not None:
+            answer = self._fast.answer(prompt)
+            if answer is not None:
+                return answer
+        return str(self._agent.run(prompt))
+
+
+class MicrosoftAgentAdapter(AsyncAgentAdapter):
+    name = "microsoft_agent"
+    example = "microsoft_agent_example/microsoft_agent_litellm_proxy.py"
+    modules = ("agent_framework",)
+    library_mode = False
+    #: Use the example's async tool (False: the blocking one, which stalls the event loop during lookups).
+    async_tools = True
+
+    def setup(self) -> None:
+        example = load_example(self.example)
+        tool = example.get_weather if self.async_tools else get_weather
+        self._agent = example.build_agent(self.model, self.api_base, self.api_key, tool=tool)
+
+    async def arun(self, prompt: str) -> str:
+        return (await self._agent.run(prompt)).text
+
+
+class AgentScopeAdapter(AsyncAgentAdapter):
+    name = "agentscope"
+    example = "agentscope_example/agentscope_litellm.py"
+    modules = ("agentscope",)
+    library_mode = False
+    #: Use the example's async tool (False: the blocking one, which stalls the event loop during lookups).
+    async_tools = True
+
+    def setup(self) -> None:
+        from agentscope.message import Msg, TextBlock
+        from agentscope.tool import ToolResponse
+
+        def blocking_get_weather(city: str) -> ToolResponse:
+            """Retrieves the current weather report for a specified city.
+            Args:
+                city (str): The name of the city to retrieve weather information for.
+            """
+            return ToolResponse(content=[TextBlock(type="text", text=get_weather(city))])
+
+        example = load_example(self.example)
+        tool = example.get_weather if self.async_tools else blocking_get_weather
+        self._agent = example.build_agent(self.model, self.api_base, self.api_key, tool=tool)
+        if hasattr(self._agent, "set_console_output_enabled"):
+            self._agent.set_console_output_enabled(False)
+        self._msg = Msg
+
+    async def arun(self, prompt: str) -> str:
+        await self._agent.memory.clear()
+        reply = await self._agent(self._msg(name="user", content=prompt, role="user"))
+        return reply.get_text_content() or ""
+
+
+class AG2Adapter(AgentAdapter):
+    name = "ag2"
+    example = "ag2_example/ag2_litellm_proxy.py"
+    modules = ("autogen",)
+    library_mode = False
+
+    def setup(self) -> None:
+        from autogen import ConversableAgent
+        from autogen.agentchat import initiate_group_chat
+
+        example = load_example(self.example)
+
+        def make_pattern(with_user: bool = False):
+            pattern = example.build_pattern(self.model, self.api_base, self.api_key, self.compactor)
+            if with_user:
+                # Resuming a chat from its history needs the user as a named agent
+                pattern.user_agent = ConversableAgent(name="user", llm_config=False, human_input_mode="NEVER")
+            return pattern
+
+        self._make_pattern = make_pattern
+        self._initiate = initiate_group_chat
+        self._marker = example.REPORT_MARKER
+
+    def run(self, prompt: str) -> str:
+        result, _, _ = self._initiate(pattern=self._make_pattern(), messages=prompt, max_rounds=10)
+        return result.summary.replace(self._marker, "").strip()
+
+    def chat(self, prompts: Iterable[str]) -> Iterator[str]:
+        history: list[dict] = []
+        for prompt in prompts:
+            messages = [*history, {"role": "user", "name": "user", "content": prompt}]
+            result, _, _ = self._initiate(
+                pattern=self._make_pattern(with_user=True), messages=messages, max_rounds=len(messages) + 10
+            )
+            history = result.chat_history
+            yield result.summary.replace(self._marker, "").strip()
+
+
+ADAPTERS: dict[str, type[AgentAdapter]] = {
+    adapter.name: adapter
+    for adapter in (
+        LangGraphAdapter,
+        CrewAIAdapter,
+        PydanticAIAdapter,
+        GoogleADKAdapter,
+        OpenAIAgentsAdapter,
+        StrandsAdapter,
+        LlamaIndexAdapter,
+        SmolagentsAdapter,
+        MicrosoftAgentAdapter,
+        AgentScopeAdapter,
+        AG2Adapter,
+    )
+}
+
+
+def get_adapter(name: str) -> type[AgentAdapter]:
+    """Look up an adapter class by framework name (see ``ADAPTERS``)."""
+    try:
+        return ADAPTERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown framework {name!r}; choose from {', '.join(ADAPTERS)}") from None
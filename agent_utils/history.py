@@ -0,0 +1,303 @@
+"""Conversation-history compaction with token budgets.
+
+Agents resend the whole conversation with every LLM call, so in a long chat
+the prompt grows with each turn and the total cost grows quadratically. A
+:class:`HistoryCompactor` runs before each call and shrinks the messages that
+are *sent*, while the framework keeps the full history. It is a pipeline of
+stages that each take and return OpenAI-style message dicts:
+
+* :class:`DropToolOutputs` shortens tool results the model has already
+  answered from (a later assistant message exists),
+* :class:`Summarize` replaces the oldest turns by one summary message once the
+  history exceeds a token budget; summaries are reused across calls,
+* :class:`SlidingWindow` keeps the newest turns that fit a token or message
+  budget, as a hard cap.
+
+Stages only ever cut at turn boundaries (before a user message), so a tool
+result is never separated from the assistant message that requested it.
+Leading system messages and the current turn are always kept.
+
+The same objects plug into AG2 as message transforms (:func:`add_to_ag2`) and
+into LangGraph via :func:`compact_langchain`; ``HISTORY_MAX_TOKENS`` enables
+the default pipeline in the examples (:func:`from_env`)::
+
+    compactor = default_compactor(max_tokens=2000)
+    response = model.invoke([system, *compact_langchain(compactor, messages)])
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Sequence
+
+Message = dict[str, Any]
+Summarizer = Callable[[Sequence[Message]], str]
+
+
+def message_text(message: Message) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def estimate_tokens(messages: Sequence[Message]) -> int:
+    """Rough prompt size of ``messages`` (about four characters per token, like the stub proxy)."""
+    return sum(math.ceil(len(json.dumps(message, default=str)) / 4) for message in messages)
+
+
+def _split_system(messages: Sequence[Message]) -> tuple[list[Message], list[Message]]:
+    leading = 0
+    while leading < len(messages) and messages[leading].get("role") in ("system", "developer"):
+        leading += 1
+    return list(messages[:leading]), list(messages[leading:])
+
+
+def _turn_starts(messages: Sequence[Message]) -> list[int]:
+    """Indices where a turn (a user message and everything answering it) begins."""
+    return [i for i, message in enumerate(messages) if message.get("role") == "user"] or [0]
+
+
+class CompactionStage:
+    """Base class of the pipeline stages; also usable as an AG2 ``MessageTransform``."""
+
+    def __call__(self, messages: list[Message], count: Callable[[Sequence[Message]], int]) -> list[Message]:
+        raise NotImplementedError
+
+    def apply_transform(self, messages: list[Message]) -> list[Message]:
+        return self(messages, estimate_tokens)
+
+    def get_logs(self, pre: list[Message], post: list[Message]) -> tuple[str, bool]:
+        before, after = estimate_tokens(pre), estimate_tokens(post)
+        return f"{type(self).__name__}: {before} -> {after} tokens", before != after
+
+
+@dataclass
+class DropToolOutputs(CompactionStage):
+    """Shorten tool results that a later assistant message has already used."""
+
+    keep_chars: int = 80
+
+    def _shorten(self, text: str) -> str:
+        if len(text) <= self.keep_chars:
+            return text
+        return f"{text[: self.keep_chars]}... [{len(text) - self.keep_chars} characters of tool output dropped]"
+
+    def __call__(self, messages, count):
+        answered = max((i for i, message in enumerate(messages) if message.get("role") == "assistant"), default=-1)
+        compacted = []
+        for i, message in enumerate(messages):
+            if message.get("role") == "tool" and i < answered:
+                message = {**message, "content": self._shorten(message_text(message))}
+                if "tool_responses" in message:  # AG2 bundles the results of parallel calls
+                    message["tool_responses"] = [
+                        {**response, "content": self._shorten(str(response.get("content", "")))}
+                        for response in message["tool_responses"]
+                    ]
+            compacted.append(message)
+        return compacted
+
+
+@dataclass
+class SlidingWindow(CompactionStage):
+    """Keep the newest whole turns within ``max_tokens`` and/or ``max_messages``."""
+
+    max_tokens: int | None = None
+    max_messages: int | None = None
+
+    def __call__(self, messages, count):
+        system, history = _split_system(messages)
+        budget = None if self.max_tokens is None else self.max_tokens - count(system)
+        starts = _turn_starts(history)
+        keep_from = starts[-1]  # the current turn is always kept
+        for start in reversed(starts[:-1]):
+            window = history[start:]
+            if budget is not None and count(window) > budget:
+                break
+            if self.max_messages is not None and len(window) > self.max_messages:
+                break
+            keep_from = start
+        return system + history[keep_from:]
+
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def extractive_summary(messages: Sequence[Message], max_chars: int = 2000) -> str:
+    """Offline summary: each question with the start of its answer, without tool traffic.
+
+    Only the most recent ``max_chars`` are kept, so the summary stays bounded too.
+    """
+    lines = []
+    for message in messages:
+        text = message_text(message)
+        if text.startswith(SUMMARY_PREFIX):  # the summary of the turns before these
+            lines.append(text[len(SUMMARY_PREFIX) :])
+            continue
+        text = " ".join(text.split())
+        if message.get("role") == "user" and text:
+            lines.append(f"User asked: {text[:200]}")
+        elif message.get("role") == "assistant" and text and not message.get("tool_calls"):
+            lines.append(f"Assistant answered: {text[:160]}")
+    summary = "\n".join(lines)
+    return summary if len(summary) <= max_chars else summary[-max_chars:].split("\n", 1)[-1]
+
+
+def llm_summarizer(model: str, **completion_kwargs: Any) -> Summarizer:
+    """A summarizer that asks ``model`` through LiteLLM (one extra call per summary update)."""
+
+    def summarize(messages: Sequence[Message]) -> str:
+        import litellm
+
+        transcript = "\n".join(f"{m.get('role')}: {message_text(m)}" for m in messages if message_text(m))
+        response = litellm.completion(
+            model=model,
+            messages=[
+                {"role": "system", "content": "Summarise this conversation in a few short sentences. "
+                 "Keep every fact the assistant may need later."},
+                {"role": "user", "content": transcript},
+            ],
+            **completion_kwargs,
+        )
+        return response.choices[0].message.content or ""
+
+    return summarize
+
+
+@dataclass
+class Summarize(CompactionStage):
+    """Replace the oldest turns by one summary message once the history exceeds ``max_tokens``.
+
+    The newest turns, up to ``keep_recent_tokens``, stay verbatim. Summaries
+    are cached by the messages they cover; when the summarised part grows, the
+    summarizer only gets the cached summary plus the turns added since, so a
+    long chat is not re-summarised from the start on every call.
+    """
+
+    max_tokens: int
+    keep_recent_tokens: int
+    summarizer: Summarizer = extractive_summary
+    max_cached: int = 256
+    _summaries: dict[str, tuple[int, str]] = field(default_factory=dict, init=False, repr=False)
+
+    @staticmethod
+    def _key(messages: Sequence[Message]) -> str:
+        return hashlib.sha256(json.dumps(messages, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _summary(self, old: list[Message]) -> str:
+        key = self._key(old)
+        if key in self._summaries:
+            return self._summaries[key][1]
+        covered = len(old)
+        # Start from the summary of the longest cached prefix, if there is one
+        for length in sorted({length for length, _ in self._summaries.values() if length < covered}, reverse=True):
+            cached = self._summaries.get(self._key(old[:length]))
+            if cached is not None:
+                old = [{"role": "user", "content": SUMMARY_PREFIX + cached[1]}, *old[length:]]
+                break
+        summary = self.summarizer(old)
+        if len(self._summaries) >= self.max_cached:
+            self._summaries.clear()
+        self._summaries[key] = (covered, summary)
+        return summary
+
+    def __call__(self, messages, count):
+        if count(messages) <= self.max_tokens:
+            return messages
+        system, history = _split_system(messages)
+        starts = _turn_starts(history)
+        split = starts[-1]
+        for start in reversed(starts[:-1]):
+            if count(history[start:]) > self.keep_recent_tokens:
+                break
+            split = start
+        if split == 0:
+            return messages
+        text = self._summary(history[:split])
+        # Trim the summary (oldest part first) to what is left of the budget
+        room = self.max_tokens - count([*system, *history[split:]]) - count([{"role": "user", "content": SUMMARY_PREFIX}])
+        if count([{"role": "user", "content": text}]) > room:
+            text = text[-max(room, 0) * 4 :].split("\n", 1)[-1] if room > 0 else ""
+        if not text:
+            return [*system, *history[split:]]
+        return [*system, {"role": "user", "content": SUMMARY_PREFIX + text}, *history[split:]]
+
+
+@dataclass
+class CompactionStats:
+    calls: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+
+    @property
+    def saved(self) -> float:
+        return 1 - self.tokens_out / self.tokens_in if self.tokens_in else 0.0
+
+
+class HistoryCompactor:
+    """Runs compaction stages in order before each LLM call and counts what they saved."""
+
+    def __init__(self, stages: Sequence[CompactionStage], token_counter: Callable[[Sequence[Message]], int] = estimate_tokens):
+        self.stages = list(stages)
+        self.count = token_counter
+        self.stats = CompactionStats()
+
+    def __call__(self, messages: Sequence[Message]) -> list[Message]:
+        compacted = list(messages)
+        for stage in self.stages:
+            compacted = stage(compacted, self.count)
+        self.stats.calls += 1
+        self.stats.tokens_in += self.count(messages)
+        self.stats.tokens_out += self.count(compacted)
+        return compacted
+
+    # AG2 MessageTransform protocol
+
+    def apply_transform(self, messages: list[Message]) -> list[Message]:
+        return self(messages)
+
+    def get_logs(self, pre: list[Message], post: list[Message]) -> tuple[str, bool]:
+        before, after = self.count(pre), self.count(post)
+        return f"History compacted from {before} to {after} tokens", before != after
+
+
+def default_compactor(max_tokens: int, summarizer: Summarizer = extractive_summary) -> HistoryCompactor:
+    """Drop consumed tool outputs, summarise beyond ``max_tokens``, then cap at ``max_tokens``."""
+    return HistoryCompactor(
+        [
+            DropToolOutputs(),
+            Summarize(max_tokens=max_tokens, keep_recent_tokens=max_tokens // 2, summarizer=summarizer),
+            SlidingWindow(max_tokens=max_tokens),
+        ]
+    )
+
+
+def from_env() -> HistoryCompactor | None:
+    """:func:`default_compactor` with the budget from ``HISTORY_MAX_TOKENS``, if it is set."""
+    max_tokens = os.getenv("HISTORY_MAX_TOKENS")
+    return default_compactor(int(max_tokens)) if max_tokens else None
+
+
+# Framework glue
+
+
+def compact_langchain(compactor: HistoryCompactor | None, messages: Sequence[Any]) -> list[Any]:
+    """Compact LangChain messages (converted to OpenAI dicts and back)."""
+    if compactor is None:
+        return list(messages)
+    from langchain_core.messages import convert_to_messages, convert_to_openai_messages
+
+    return convert_to_messages(compactor(convert_to_openai_messages(list(messages))))
+
+
+def add_to_ag2(compactor: HistoryCompactor, *agents: Any) -> None:
+    """Compact what the AG2 ``agents`` send to their LLM (the system message is kept as is)."""
+    from autogen.agentchat.contrib.capabilities.transform_messages import TransformMessages
+
+    capability = TransformMessages(transforms=[compactor], verbose=False)
+    for agent in agents:
+        capability.add_to_agent(agent)
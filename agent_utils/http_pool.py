@@ -0,0 +1,121 @@
+"""Shared, connection-pooled HTTP clients for the proxy examples.
+
+Every proxy example used to build its own client with default connection
+handling. Under load that means new TCP (and TLS) connections to the proxy
+instead of reusing warm ones. This module builds ``httpx`` clients with tuned
+keep-alive pools, connection limits and timeouts, shares one sync and one async
+client per process, and hands them to each framework:
+
+=========================  =====================================================
+Framework                  Injection
+=========================  =====================================================
+OpenAI SDK based clients   ``openai.AsyncOpenAI(http_client=shared_async_client())``
+PydanticAI                 ``LiteLLMProvider(http_client=shared_async_client())``
+Microsoft Agent Framework  ``OpenAIChatClient(async_client=async_openai_client(...))``
+AgentScope                 ``client_kwargs={"http_client": shared_async_client()}``
+AG2                        ``"http_client": shared_client()`` in the config list
+LiteLLM (CrewAI, library)  :func:`use_with_litellm`
+=========================  =====================================================
+
+HTTP/2 is used when the ``h2`` package is installed and the proxy is served
+over HTTPS; plain ``http://`` proxies use HTTP/1.1 keep-alive. Limits and
+timeouts can be tuned with environment variables (see :class:`PoolConfig`).
+
+The async client must be used from one event loop at a time, as is the case
+in the examples (one ``asyncio.run`` per process).
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib.util
+import os
+from dataclasses import dataclass
+
+import httpx
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Connection pool settings; defaults can be overridden with ``PROXY_HTTP_*`` variables."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 50
+    keepalive_expiry: float = 90.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 600.0  # long agent answers and slow tool turns
+    write_timeout: float = 30.0
+    pool_timeout: float = 30.0
+    http2: bool = True
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        return cls(
+            max_connections=int(_env_float("PROXY_HTTP_MAX_CONNECTIONS", cls.max_connections)),
+            max_keepalive_connections=int(_env_float("PROXY_HTTP_MAX_KEEPALIVE", cls.max_keepalive_connections)),
+            keepalive_expiry=_env_float("PROXY_HTTP_KEEPALIVE_EXPIRY", cls.keepalive_expiry),
+            connect_timeout=_env_float("PROXY_HTTP_CONNECT_TIMEOUT", cls.connect_timeout),
+            read_timeout=_env_float("PROXY_HTTP_READ_TIMEOUT", cls.read_timeout),
+            http2=os.getenv("PROXY_HTTP2", "1").lower() not in ("0", "false", "no", "off"),
+        )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout, read=self.read_timeout, write=self.write_timeout, pool=self.pool_timeout
+        )
+
+    @property
+    def use_http2(self) -> bool:
+        return self.http2 and importlib.util.find_spec("h2") is not None
+
+
+def create_client(config: PoolConfig | None = None, **kwargs) -> httpx.Client:
+    """A new pooled sync client; extra keyword arguments go to ``httpx.Client``."""
+    config = config or PoolConfig.from_env()
+    return httpx.Client(limits=config.limits, timeout=config.timeout, http2=config.use_http2, **kwargs)
+
+
+def create_async_client(config: PoolConfig | None = None, **kwargs) -> httpx.AsyncClient:
+    """A new pooled async client; extra keyword arguments go to ``httpx.AsyncClient``."""
+    config = config or PoolConfig.from_env()
+    return httpx.AsyncClient(limits=config.limits, timeout=config.timeout, http2=config.use_http2, **kwargs)
+
+
+@functools.cache
+def shared_client() -> httpx.Client:
+    """The process-wide pooled sync client."""
+    return create_client()
+
+
+@functools.cache
+def shared_async_client() -> httpx.AsyncClient:
+    """The process-wide pooled async client."""
+    return create_async_client()
+
+
+def async_openai_client(base_url: str | None, api_key: str | None):
+    """``openai.AsyncOpenAI`` for the proxy, using the shared async client."""
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=shared_async_client())
+
+
+def use_with_litellm() -> None:
+    """Make LiteLLM send OpenAI-compatible requests (including the proxy) through the shared clients."""
+    import litellm
+
+    litellm.client_session = shared_client()
+    litellm.aclient_session = shared_async_client()
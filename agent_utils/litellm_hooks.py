@@ -0,0 +1,83 @@
+"""Wrap ``litellm.completion`` / ``litellm.acompletion`` for library-mode examples.
+
+Frameworks call LiteLLM in different ways: some look up ``litellm.completion``
+at call time, others bind it at import time (``from litellm import acompletion``).
+:func:`wrap_completions` replaces the module attributes *and* every alias of
+the original functions found in already-imported modules, so one call covers
+all frameworks. Install wrappers after importing the framework.
+
+Wrappers stack: installing a cache and then a rate limiter makes the limiter
+the outermost layer.
+
+:func:`error_status` and :func:`retry_after` read what a failed call says
+about the server's load, for the wrappers that react to it.
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Any, Callable
+
+Wrapper = Callable[[Callable[..., Any]], Callable[..., Any]]
+
+_NAMES = ("completion", "acompletion")
+
+
+def wrap_completions(sync_wrapper: Wrapper, async_wrapper: Wrapper) -> Callable[[], None]:
+    """Install wrappers around LiteLLM's completion functions.
+
+    ``sync_wrapper(completion)`` and ``async_wrapper(acompletion)`` return the
+    replacement functions. Returns a function that undoes the patch.
+    """
+    import litellm
+
+    originals = {name: getattr(litellm, name) for name in _NAMES}
+    replacements = {
+        "completion": sync_wrapper(originals["completion"]),
+        "acompletion": async_wrapper(originals["acompletion"]),
+    }
+    by_identity = {id(fn): (fn, replacements[name]) for name, fn in originals.items()}
+
+    patched: list[tuple[object, str, Any]] = []
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, "__dict__", None)
+        if not namespace:
+            continue
+        for attr, value in list(namespace.items()):
+            match = by_identity.get(id(value))
+            if match is not None and match[0] is value:
+                setattr(module, attr, match[1])
+                patched.append((module, attr, value))
+
+    def undo() -> None:
+        for module, attr, value in reversed(patched):
+            setattr(module, attr, value)
+
+    return undo
+
+
+MAX_RETRY_AFTER = 60.0
+
+
+def error_status(error: Exception) -> int | None:
+    """HTTP status of a failed LiteLLM/OpenAI call; timeouts count as 408, connection errors as 503."""
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status
+    name = type(error).__name__
+    if "Timeout" in name:
+        return 408
+    if "Connect" in name or isinstance(error, ConnectionError):
+        return 503
+    return None
+
+
+def retry_after(error_or_response: Any) -> float | None:
+    """Seconds from the ``Retry-After`` header of an error or ``httpx`` response (at most a minute)."""
+    headers = getattr(error_or_response, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(error_or_response, "response", None), "headers", None)
+    try:
+        return min(float((headers or {}).get("retry-after")), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return None
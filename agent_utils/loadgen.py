@@ -0,0 +1,435 @@
+"""Open-loop load generator for the LiteLLM proxy, with HDR latency histograms.
+
+Replays agent traffic shaped like the weather examples against an
+OpenAI-compatible proxy: every conversation asks ``--turns`` weather
+questions (one or two cities each), and every question is a tool-call round
+trip, a streamed request offering ``get_weather``, the tool results, and a
+second streamed request for the report. The history grows turn by turn, as
+in a chat.
+
+Conversations start at a fixed rate, whether or not earlier ones have
+finished (open loop): a closed-loop tester that waits for replies slows down
+with the proxy and never sees the queue build up. Latencies are measured
+from the time a conversation was due, not the time the generator got round
+to it, so a late start is counted instead of hidden. Time to first token
+(the first streamed content or tool-call delta) and total latency of every
+request, and the latency of whole conversations, go into
+:class:`~agent_utils.stats.HdrHistogram`::
+
+    python -m agent_utils.loadgen --url http://localhost:4000 --rate 5 --duration 60
+
+``--sweep`` raises the rate step by step (``--step`` times each time) until
+the proxy saturates, then bisects between the last good and the first
+saturated rate. A rate is saturated when requests complete slower than they
+are sent, more than 1% fail, or the p99 latency exceeds ``--knee`` times the
+p99 at the first rate::
+
+    python -m agent_utils.loadgen --url http://localhost:4000 --sweep --rate 2 --duration 30
+
+``--stub "ARGS"`` starts ``python -m agent_utils.stub_proxy ARGS`` in its own
+process instead, so the whole run is offline; its ``--workers`` and
+``--overhead-ms`` stand in for ``litellm --num_workers`` and the proxy's time
+per request::
+
+    python -m agent_utils.loadgen --stub "--workers 4 --overhead-ms 20 --latency-ms 300" --sweep
+
+``--output`` appends one JSON record per rate, ``--hgrm PREFIX`` writes each
+rate's histograms in HdrHistogram's ``.hgrm`` format for its plotting tools.
+The generator reports how late it started conversations; when that lag grows,
+the client machine is the bottleneck, not the proxy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import httpx
+
+from agent_utils.http_pool import PoolConfig, create_async_client
+from agent_utils.stats import HdrHistogram
+from agent_utils.weather import weather_report
+
+SYSTEM_PROMPT = (
+    "You are the weather presenter on TV. Use the get_weather tool for every city you are asked about, "
+    "then answer with a couple of sentences of TV weather report including a small joke."
+)
+WEATHER_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "get_weather",
+        "description": "Retrieves the current weather report for a specified city.",
+        "parameters": {
+            "type": "object",
+            "properties": {"city": {"type": "string", "description": "The name of the city."}},
+            "required": ["city"],
+        },
+    },
+}
+CITIES = ["London", "Paris", "Tokyo", "New York", "Oslo", "Rome", "Lima", "Cairo", "Delhi", "Sydney", "Toronto", "Berlin"]
+
+
+class RequestError(Exception):
+    """A request that got no usable reply; ``kind`` is the HTTP status or the exception name."""
+
+    def __init__(self, kind: str):
+        super().__init__(kind)
+        self.kind = kind
+
+
+@dataclass
+class StepResult:
+    """Everything measured at one arrival rate."""
+
+    rate: float
+    duration: float
+    requests_per_conversation: int
+    ttft: HdrHistogram = field(default_factory=HdrHistogram)
+    latency: HdrHistogram = field(default_factory=HdrHistogram)
+    conversation: HdrHistogram = field(default_factory=HdrHistogram)
+    start_lag: HdrHistogram = field(default_factory=HdrHistogram)
+    conversations: int = 0
+    requests: int = 0
+    errors: Counter = field(default_factory=Counter)
+    steady_completed: int = 0  # requests finished in the last three quarters of the arrival window
+    wall_time: float = 0.0
+
+    @property
+    def failed(self) -> int:
+        return sum(self.errors.values())
+
+    @property
+    def offered_rps(self) -> float:
+        """Requests per second the conversations would send if nothing failed."""
+        return self.rate * self.requests_per_conversation
+
+    @property
+    def completed_rps(self) -> float:
+        """Requests per second finished once the first conversations have ramped up, while arrivals go on."""
+        return self.steady_completed / (0.75 * self.duration)
+
+    def saturated(self, p99_limit: float | None) -> str | None:
+        """Why this rate counts as saturated, or None."""
+        if self.conversations and self.failed / self.conversations > 0.01:
+            return f"{self.failed / self.conversations:.0%} failed"
+        if self.completed_rps < 0.95 * self.offered_rps:
+            return "requests complete slower than they are sent"
+        if p99_limit is not None and self.latency.value_at_percentile(99) > p99_limit:
+            return f"p99 above {p99_limit * 1000:.0f} ms"
+        return None
+
+    def as_dict(self) -> dict:
+        return {
+            "rate": self.rate,
+            "conversations": self.conversations,
+            "requests": self.requests,
+            "errors": dict(self.errors),
+            "offered_rps": round(self.offered_rps, 3),
+            "completed_rps": round(self.completed_rps, 3),
+            "wall_time_s": round(self.wall_time, 3),
+            **{
+                name: {
+                    **{k: round(v * 1000, 3) for k, v in histogram.latency_stats().as_dict().items() if k != "count"},
+                    "p999": round(histogram.value_at_percentile(99.9) * 1000, 3),
+                }
+                for name, histogram in (("ttft_ms", self.ttft), ("latency_ms", self.latency), ("conversation_ms", self.conversation), ("start_lag_ms", self.start_lag))
+            },
+        }
+
+
+class LoadGenerator:
+    """Sends weather conversations to ``url`` at a fixed rate and records their latencies."""
+
+    def __init__(self, url: str, api_key: str, model: str, turns: int = 2, tool_time: float = 0.0, max_connections: int = 1000, seed: int = 0):
+        self.url = url.rstrip("/") + "/chat/completions"
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.model = model
+        self.turns = turns
+        self.tool_time = tool_time
+        self.rng = random.Random(seed)
+        limits = dict(max_connections=max_connections, max_keepalive_connections=max_connections, http2=False)
+        self.pool = PoolConfig(**limits, read_timeout=120.0, pool_timeout=120.0)
+
+    async def _request(
+        self, client: httpx.AsyncClient, messages: list[dict], sent: float, result: StepResult, window: tuple[float, float]
+    ) -> dict:
+        """One streamed completion; returns the assistant message."""
+        body = {
+            "model": self.model,
+            "messages": messages,
+            "tools": [WEATHER_TOOL],
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        content, calls, first = [], {}, None
+        try:
+            async with client.stream("POST", self.url, json=body, headers=self.headers) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise RequestError(str(response.status_code))
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: ") or line == "data: [DONE]":
+                        continue
+                    try:
+                        chunk = json.loads(line[6:])
+                    except ValueError as e:
+                        raise RequestError("bad_sse") from e
+                    for choice in chunk.get("choices", []):
+                        delta = choice.get("delta") or {}
+                        if first is None and (delta.get("content") or delta.get("tool_calls")):
+                            first = time.perf_counter()
+                        content.append(delta.get("content") or "")
+                        for call in delta.get("tool_calls") or []:
+                            merged = calls.setdefault(call.get("index", 0), {"id": "", "name": "", "arguments": ""})
+                            merged["id"] = call.get("id") or merged["id"]
+                            function = call.get("function") or {}
+                            merged["name"] += function.get("name") or ""
+                            merged["arguments"] += function.get("arguments") or ""
+        except httpx.HTTPError as e:
+            raise RequestError(type(e).__name__) from e
+        done = time.perf_counter()
+        result.requests += 1
+        result.ttft.record((first or done) - sent)
+        result.latency.record(done - sent)
+        if window[0] <= done < window[1]:
+            result.steady_completed += 1
+        message = {"role": "assistant", "content": "".join(content) or None}
+        if calls:
+            message["tool_calls"] = [
+                {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+                for c in calls.values()
+            ]
+        return message
+
+    async def conversation(
+        self, client: httpx.AsyncClient, due: float, cities: list[list[str]], result: StepResult, window: tuple[float, float]
+    ) -> None:
+        """The turns of one conversation; the first request counts from ``due``, not from when it was sent."""
+        result.start_lag.record(time.perf_counter() - due)
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        sent = due
+        try:
+            for turn in cities:
+                messages.append({"role": "user", "content": f"What's the weather in {' and '.join(turn)}?"})
+                while True:
+                    message = await self._request(client, messages, sent, result, window)
+                    messages.append(message)
+                    if not message.get("tool_calls"):
+                        break
+                    if self.tool_time:
+                        await asyncio.sleep(self.tool_time)
+                    for call in message["tool_calls"]:
+                        city = json.loads(call["function"]["arguments"] or "{}").get("city", "")
+                        messages.append({"role": "tool", "tool_call_id": call["id"], "content": weather_report(city)})
+                    sent = time.perf_counter()
+                sent = time.perf_counter()
+        except RequestError as e:
+            result.errors[e.kind] += 1
+            return
+        result.conversation.record(time.perf_counter() - due)
+
+    async def settle(self, latency: float, timeout: float = 120.0) -> None:
+        """Wait until a lone request is answered within ``latency`` again, after a saturated rate.
+
+        Requests of conversations given up on are still queued in the proxy;
+        the next rate would be measured against that backlog.
+        """
+        probe = StepResult(rate=0.0, duration=0.0, requests_per_conversation=1)
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "What's the weather in London?"}]
+        deadline = time.perf_counter() + timeout
+        async with create_async_client(self.pool) as client:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    await self._request(client, messages, start, probe, (0.0, 0.0))
+                except RequestError:
+                    pass
+                else:
+                    if time.perf_counter() - start <= latency:
+                        return
+                await asyncio.sleep(1.0)
+
+    def _cities(self) -> list[list[str]]:
+        return [self.rng.sample(CITIES, self.rng.choice((1, 1, 1, 2))) for _ in range(self.turns)]
+
+    async def run(self, rate: float, duration: float, drain_timeout: float = 60.0) -> StepResult:
+        """Start ``rate`` conversations per second for ``duration`` seconds, then wait for them to finish.
+
+        Every rate gets a new client: the pool an overloaded rate leaves behind
+        (up to ``max_connections`` connections) slows httpx down at the next.
+        """
+        result = StepResult(rate=rate, duration=duration, requests_per_conversation=self.turns * 2)
+        tasks = []
+        async with create_async_client(self.pool) as client:
+            start = time.perf_counter()
+            window = (start + duration / 4, start + duration)
+            for number in range(max(round(rate * duration), 1)):
+                due = start + number / rate
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self.conversation(client, due, self._cities(), result, window)))
+            result.conversations = len(tasks)
+            _, pending = await asyncio.wait(tasks, timeout=drain_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if pending:
+                result.errors["unfinished"] += len(pending)
+            result.wall_time = time.perf_counter() - start
+        return result
+
+
+def print_header() -> None:
+    print(
+        f"{'conv/s':>7}{'req/s':>8}{'done/s':>8}{'failed':>8}  {'TTFT p50':>9}{'p99':>8}  "
+        f"{'latency p50':>12}{'p99':>8}{'p99.9':>8}{'max':>8}  {'lag p99':>8}"
+    )
+
+
+def print_step(result: StepResult, verdict: str | None) -> None:
+    ms = lambda histogram, q: f"{histogram.value_at_percentile(q) * 1000:8.0f}"  # noqa: E731
+    print(
+        f"{result.rate:7.2f}{result.offered_rps:8.1f}{result.completed_rps:8.1f}{result.failed:8d}  "
+        f"{ms(result.ttft, 50):>9}{ms(result.ttft, 99)}  {ms(result.latency, 50):>12}{ms(result.latency, 99)}"
+        f"{ms(result.latency, 99.9)}{result.latency.max * result.latency.unit * 1000:8.0f}  {ms(result.start_lag, 99)}"
+        + (f"  saturated: {verdict}" if verdict else ""),
+        flush=True,
+    )
+
+
+def save_step(result: StepResult, args) -> None:
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as out:
+            out.write(json.dumps(result.as_dict()) + "\n")
+    if args.hgrm:
+        for name in ("ttft", "latency", "conversation"):
+            with open(f"{args.hgrm}-{result.rate:g}-{name}.hgrm", "w", encoding="utf-8") as out:
+                out.write(getattr(result, name).percentile_distribution())
+
+
+async def sweep(generator: LoadGenerator, args) -> None:
+    """Raise the rate until it saturates, then bisect between the last good and the first saturated rate."""
+    p99_limit = args.p99_ms / 1000 if args.p99_ms else None
+    good, bad, rate = None, None, args.rate
+    while rate <= args.max_rate:
+        result = await generator.run(rate, args.duration, args.drain_timeout)
+        if good is None and bad is None:
+            settled = 1.5 * result.latency.value_at_percentile(50)
+            if p99_limit is None and args.knee:
+                p99_limit = args.knee * result.latency.value_at_percentile(99)
+        verdict = result.saturated(p99_limit)
+        print_step(result, verdict)
+        save_step(result, args)
+        if verdict:
+            bad = result
+            break
+        good = result
+        rate *= args.step
+        await asyncio.sleep(args.cooldown)
+    for _ in range(args.refine if good and bad else 0):
+        if result is bad:
+            await generator.settle(settled)
+        await asyncio.sleep(args.cooldown)
+        result = await generator.run((good.rate + bad.rate) / 2, args.duration, args.drain_timeout)
+        verdict = result.saturated(p99_limit)
+        print_step(result, verdict)
+        save_step(result, args)
+        if verdict:
+            bad = result
+        else:
+            good = result
+
+    print()
+    if bad is None:
+        print(f"Not saturated up to {good.rate:.2f} conversations/s ({good.offered_rps:.1f} requests/s)")
+    elif good is None:
+        print(f"Saturated already at {bad.rate:.2f} conversations/s; start lower with --rate")
+    else:
+        print(
+            f"Saturation between {good.rate:.2f} and {bad.rate:.2f} conversations/s "
+            f"({good.offered_rps:.1f}-{bad.offered_rps:.1f} requests/s); "
+            f"highest good rate: p99 {good.latency.value_at_percentile(99) * 1000:.0f} ms"
+        )
+
+
+def start_stub(stub_args: str) -> tuple[subprocess.Popen, str]:
+    """``python -m agent_utils.stub_proxy`` on a free port, in its own process; returns it and its URL."""
+    command = [sys.executable, "-m", "agent_utils.stub_proxy", "--port", "0", *shlex.split(stub_args)]
+    stub = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = stub.stdout.readline()
+    if not line:
+        raise RuntimeError(f"The stub proxy did not start: {' '.join(command)}")
+    return stub, line.rsplit(" ", 1)[-1].strip()
+
+
+async def run(args, url: str) -> None:
+    generator = LoadGenerator(url, args.api_key, args.model, args.turns, args.tool_ms / 1000, args.max_connections, args.seed)
+    print(
+        f"{url}, {args.model}: {args.turns} turns per conversation (2 requests each), "
+        f"{args.duration:g} s per rate\n"
+    )
+    print_header()
+    if args.sweep:
+        await sweep(generator, args)
+    else:
+        result = await generator.run(args.rate, args.duration, args.drain_timeout)
+        print_step(result, result.saturated(args.p99_ms / 1000 if args.p99_ms else None))
+        save_step(result, args)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("PROXY_BASE_URL", "http://localhost:4000"))
+    parser.add_argument("--api-key", default=os.getenv("LITELLM_PROXY_API_KEY", "sk-stub"))
+    parser.add_argument("--model", default="sap/gpt-4o")
+    parser.add_argument("--stub", metavar="ARGS", help="start the offline stub proxy with these arguments instead of --url")
+    parser.add_argument("--rate", type=float, default=2.0, help="conversations started per second (the first rate of a sweep)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals per rate")
+    parser.add_argument("--turns", type=int, default=2, help="weather questions per conversation")
+    parser.add_argument("--tool-ms", type=float, default=0.0, help="simulated tool time per tool round")
+    parser.add_argument("--sweep", action="store_true", help="raise the rate until the proxy saturates")
+    parser.add_argument("--step", type=float, default=1.5, help="rate factor between sweep steps")
+    parser.add_argument("--max-rate", type=float, default=1000.0)
+    parser.add_argument("--refine", type=int, default=2, help="bisection steps after the saturated rate is found")
+    parser.add_argument("--knee", type=float, default=2.0, help="saturated when p99 exceeds this times the first rate's p99")
+    parser.add_argument("--p99-ms", type=float, default=0.0, help="saturated when p99 latency exceeds this (overrides --knee)")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="seconds between rates")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="seconds to wait for conversations after the arrivals")
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--output", help="JSONL file one record per rate is appended to")
+    parser.add_argument("--hgrm", metavar="PREFIX", help="write PREFIX-<rate>-{ttft,latency,conversation}.hgrm files")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.sweep and args.rate > args.max_rate:
+        parser.error(f"--rate {args.rate:g} is above --max-rate {args.max_rate:g}: the sweep would run no step")
+    if args.sweep and args.step <= 1:
+        parser.error("--step must be greater than 1")
+
+    stub = None
+    url = args.url
+    if args.stub is not None:
+        stub, url = start_stub(args.stub)
+    try:
+        asyncio.run(run(args, url))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Speculative tool calls: start the predictable lookup while the model is still deciding.
+
+Every weather agent makes two model round trips: the model asks for
+``get_weather(city)``, then writes the report from the result. The city is
+almost always right there in the prompt, so the lookup does not have to wait
+for the first round trip. A :class:`Prefetcher` guesses the argument from the
+prompt (:func:`agent_utils.weather.extract_city` by default), runs the lookup
+on a background thread while the first model call is in flight, and hands the
+result to the tool call when it arrives::
+
+    prefetcher = Prefetcher(fetch_weather)
+    prefetcher.start("What's the weather in Paris?")   # before running the agent
+    ...
+    future = prefetcher.claim("Paris")                   # in the tool: None on a miss
+    result = future.result() if future else fetch_weather("Paris")
+
+A guess the model never asks for is wasted work (one lookup) and is dropped
+after ``ttl`` seconds; a tool call with other arguments just runs normally.
+The weather tools use one through :func:`agent_utils.weather_service.speculate_weather`
+when ``TOOL_PREFETCH`` is set (see :func:`prefetch_enabled`).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Generic, TypeVar
+
+from agent_utils.weather import extract_city, normalize_city
+
+T = TypeVar("T")
+
+
+def prefetch_enabled() -> bool:
+    """Whether speculative tool calls are on (``TOOL_PREFETCH`` is set to a true value)."""
+    return os.getenv("TOOL_PREFETCH", "").lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class PrefetchStats:
+    started: int = 0
+    hits: int = 0  # tool calls answered by a speculative lookup
+    misses: int = 0  # tool calls nobody had guessed
+    wasted: int = 0  # guesses no tool call asked for
+    skipped: int = 0  # prompts without a recognisable argument
+
+
+@dataclass
+class _Entry(Generic[T]):
+    future: Future
+    started: float
+    claims: int = 1  # runs that may still ask for it
+
+
+class Prefetcher(Generic[T]):
+    """Runs ``fetch(argument)`` ahead of time for the argument ``extract(prompt)`` guesses.
+
+    Guesses are keyed by the normalised argument, so "London" and "london"
+    match, and concurrent runs guessing the same argument share one lookup.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], T],
+        extract: Callable[[str], str | None] = extract_city,
+        ttl: float = 30.0,
+        max_workers: int = 16,
+    ):
+        self.fetch = fetch
+        self.extract = extract
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.stats = PrefetchStats()
+        self._entries: dict[str, _Entry[T]] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def start(self, prompt: str) -> str | None:
+        """Start the lookup ``prompt`` most likely needs; returns the guessed argument."""
+        argument = self.extract(prompt)
+        if not argument:
+            self.stats.skipped += 1
+            return None
+        key = normalize_city(argument)
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.claims += 1
+                return argument
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="prefetch")
+            future = self._executor.submit(self.fetch, argument)
+            self._entries[key] = _Entry(future, time.monotonic())
+            self.stats.started += 1
+        return argument
+
+    def claim(self, argument: str) -> Future | None:
+        """The speculative lookup for ``argument``, if one was started; ``None`` otherwise."""
+        if not self._entries:  # nothing speculated: the common case costs no lock
+            self.stats.misses += 1
+            return None
+        key = normalize_city(argument)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.future.cancelled():
+                self.stats.misses += 1
+                return None
+            entry.claims -= 1
+            if entry.claims <= 0:
+                del self._entries[key]
+            self.stats.hits += 1
+            return entry.future
+
+    def get(self, argument: str) -> T:
+        """``fetch(argument)``, answered by the speculative lookup when there is one."""
+        future = self.claim(argument)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception:  # noqa: BLE001 - the live call reports the error
+                pass
+        return self.fetch(argument)
+
+    def _expire(self, now: float) -> None:
+        for key in [key for key, entry in self._entries.items() if now - entry.started > self.ttl]:
+            self.stats.wasted += self._entries.pop(key).claims
+
+    def close(self) -> None:
+        with self._lock:
+            self.stats.wasted += sum(entry.claims for entry in self._entries.values())
+            self._entries.clear()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
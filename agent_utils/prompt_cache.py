@@ -0,0 +1,161 @@
+"""Stable prompt prefixes and cache-control markers for provider prompt caching.
+
+Providers serve the longest prompt prefix they have seen recently from a cache:
+OpenAI models (``sap/gpt-5``, ``sap/gpt-4.1``) automatically from 1024 tokens
+on, Anthropic models (``sap/claude-4.5-sonnet``) up to the blocks the request
+marks with ``cache_control``. Cached tokens are cheaper and skip most of the
+prefill time, but only if the prefix is byte-identical: a city interpolated
+into the system prompt, or an instruction rebuilt with a timestamp, makes every
+request a miss.
+
+:class:`PromptLayout` keeps the static parts (system prompt, few-shot
+examples, tool schemas) in one fixed prefix, built once, and appends whatever
+varies (history, the question, context looked up for it) after it::
+
+    layout = PromptLayout(SYSTEM_PROMPT, examples=FEW_SHOT, tools=TOOLS)
+    response = litellm.completion(**layout.request("sap/claude-4.5-sonnet", prompt, context=report))
+
+:func:`add_cache_control` marks the end of the tools, of the static system
+prefix and of the conversation so far for models that take markers (three of
+the four breakpoints Anthropic allows); other models get the request
+unchanged. ``PROMPT_CACHE=1`` installs it on LiteLLM for the library-mode
+examples (:func:`install_from_env`); through the proxy, the same markers come
+from ``cache_control_injection_points`` in the proxy's model config (see
+PROXY_SETUP.md). Cached-token counts are in the usage records
+(:mod:`agent_utils.usage`).
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Sequence
+
+Message = dict[str, Any]
+
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def prompt_cache_enabled() -> bool:
+    """Whether ``PROMPT_CACHE`` is set to a true value."""
+    return os.getenv("PROMPT_CACHE", "").lower() in ("1", "true", "yes", "on")
+
+
+def supports_cache_control(model: str | None) -> bool:
+    """Whether the model caches only what ``cache_control`` marks (Anthropic models)."""
+    name = (model or "").lower()
+    return "claude" in name or name.startswith(("anthropic/", "bedrock/anthropic"))
+
+
+def _marked(message: Message) -> Message:
+    content = message.get("content")
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    elif not content:
+        return message  # an assistant message with only tool calls has no block to mark
+    *head, last = content
+    return {**message, "content": [*head, {**last, "cache_control": EPHEMERAL}]}
+
+
+def add_cache_control(
+    messages: Sequence[Message], tools: Sequence[dict] | None = None
+) -> tuple[list[Message], list[dict] | None]:
+    """Copies of ``messages`` and ``tools`` with cache breakpoints after the tools,
+    the leading system messages and the conversation before the newest message."""
+    messages = list(messages)
+    marks = set()
+    system_end = 0
+    while system_end < len(messages) and messages[system_end].get("role") in ("system", "developer"):
+        system_end += 1
+    if system_end:
+        marks.add(system_end - 1)
+    # The next call of an agent loop resends the conversation up to here, plus its new messages
+    last = next((i for i in range(len(messages) - 2, system_end - 1, -1) if messages[i].get("content")), None)
+    if last is not None:
+        marks.add(last)
+    for index in marks:
+        messages[index] = _marked(messages[index])
+    if tools:
+        tools = [*tools[:-1], {**tools[-1], "cache_control": EPHEMERAL}]
+    return messages, list(tools) if tools is not None else None
+
+
+@dataclass(frozen=True)
+class PromptLayout:
+    """A fixed prompt prefix (system prompt, few-shot examples, tools) with the variable parts last."""
+
+    system: str
+    examples: tuple[Message, ...] = ()
+    tools: tuple[dict, ...] = ()
+    _prefix: list[Message] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        prefix = [{"role": "system", "content": self.system}, *self.examples]
+        object.__setattr__(self, "_prefix", prefix)
+
+    def messages(self, prompt: str, history: Sequence[Message] = (), context: str = "") -> list[Message]:
+        """Prefix, then ``history``, then the user message: ``prompt`` followed by ``context``."""
+        user = f"{prompt}\n\n{context}" if context else prompt
+        return [*self._prefix, *history, {"role": "user", "content": user}]
+
+    def request(self, model: str, prompt: str, history: Sequence[Message] = (), context: str = "", **kwargs: Any) -> dict:
+        """Keyword arguments for ``litellm.completion``, with cache markers where ``model`` takes them."""
+        messages = self.messages(prompt, history, context)
+        tools = list(self.tools) or None
+        if supports_cache_control(model):
+            messages, tools = add_cache_control(messages, tools)
+        request = {"model": model, "messages": messages, **kwargs}
+        if tools:
+            request["tools"] = tools
+        return request
+
+
+@dataclass
+class CacheControlStats:
+    marked: int = 0  # requests that got cache_control markers
+    unmarked: int = 0  # requests to models that cache automatically
+
+
+class CacheControl:
+    """Adds :func:`add_cache_control` markers to LiteLLM calls for models that take them."""
+
+    def __init__(self):
+        self.stats = CacheControlStats()
+
+    def _with_markers(self, kwargs: dict) -> dict:
+        if not supports_cache_control(kwargs.get("model")) or not kwargs.get("messages"):
+            self.stats.unmarked += 1
+            return kwargs
+        self.stats.marked += 1
+        messages, tools = add_cache_control(kwargs["messages"], kwargs.get("tools"))
+        return {**kwargs, "messages": messages, **({"tools": tools} if tools else {})}
+
+    def wrap_completion(self, completion: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(completion)
+        def completion_with_cache_control(*args, **kwargs):
+            return completion(*args, **self._with_markers(kwargs))
+
+        return completion_with_cache_control
+
+    def wrap_acompletion(self, acompletion: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(acompletion)
+        async def acompletion_with_cache_control(*args, **kwargs):
+            return await acompletion(*args, **self._with_markers(kwargs))
+
+        return acompletion_with_cache_control
+
+    def install(self) -> Callable[[], None]:
+        """Mark LiteLLM library calls; returns an undo function."""
+        from agent_utils.litellm_hooks import wrap_completions
+
+        return wrap_completions(self.wrap_completion, self.wrap_acompletion)
+
+
+def install_from_env() -> CacheControl | None:
+    """Install :class:`CacheControl` on LiteLLM if ``PROMPT_CACHE`` is set."""
+    if not prompt_cache_enabled():
+        return None
+    cache_control = CacheControl()
+    cache_control.install()
+    return cache_control
@@ -0,0 +1,561 @@
+"""Client-side rate limiting and adaptive concurrency for high-volume agent runs.
+
+Fanning an agent out over thousands of inputs sends LLM calls as fast as the
+workers can make them. Past the proxy's limits every call gets a 429, the
+frameworks retry, and the retries add to the overload. A :class:`RateLimiter`
+sits between the frameworks and the LLM calls and admits each call only when
+
+* the requests-per-minute and tokens-per-minute budgets allow it (token
+  buckets; prompt tokens are estimated up front and corrected with the
+  reported usage afterwards), and
+* fewer calls than the current concurrency limit are in flight. The limit
+  adapts AIMD-style: it grows by one per window of successful calls and is
+  halved on an overload signal (429, 502-504, timeouts), at most once per
+  ``decrease_interval``. A 429's ``Retry-After`` also empties the request
+  budget for that long, so calls resume at the budgeted pace, not in a burst.
+
+Calls that have to wait queue in FIFO order, from threads and event loops
+alike. :attr:`RateLimiter.stats` and :meth:`RateLimiter.prometheus` expose
+the current limit, the calls in flight and queued, and the queueing delay.
+
+Like the completion cache it hooks into LiteLLM (:meth:`RateLimiter.install`,
+used by CrewAI, Strands and the other library-mode examples) and into
+``httpx`` clients (:meth:`RateLimiter.instrument_client`) for proxy mode.
+``RATE_LIMIT_RPM``, ``RATE_LIMIT_TPM`` and ``RATE_LIMIT_CONCURRENCY`` enable
+it without code changes (see :func:`limiter_from_env`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import functools
+import json
+import math
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import httpx
+
+from agent_utils.litellm_hooks import error_status, retry_after
+from agent_utils.stats import LatencyStats
+
+#: Statuses that mean "too much load", as opposed to a broken request.
+OVERLOAD_STATUS = frozenset({408, 429, 502, 503, 504})
+
+
+def estimate_request_tokens(request: dict, completion_tokens: int = 256) -> int:
+    """Tokens a call will use: its prompt (about four characters per token) plus the completion."""
+    prompt = json.dumps(request.get("messages", []), default=str) + json.dumps(request.get("tools") or [], default=str)
+    limit = request.get("max_completion_tokens") or request.get("max_tokens") or completion_tokens
+    return math.ceil(len(prompt) / 4) + limit
+
+
+def _usage_tokens(response: Any) -> int | None:
+    usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+    if not usage:
+        return None
+    total = usage.get("total_tokens") if isinstance(usage, dict) else getattr(usage, "total_tokens", None)
+    return total or None
+
+
+class TokenBucket:
+    """``per_minute`` units, refilled continuously, with up to ``burst`` seconds' worth saved up.
+
+    A reservation larger than what is left puts the bucket into debt, and the
+    caller waits until it is paid off, so big requests are paced rather than refused.
+    """
+
+    def __init__(self, per_minute: float, burst: float = 1.0):
+        self.rate = per_minute / 60
+        self.capacity = max(self.rate * burst, 1.0)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount``; returns how long the caller has to wait for it."""
+        self._refill(now)
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def drain(self, seconds: float, now: float) -> None:
+        """Spend the next ``seconds`` of refill: nothing is available before then."""
+        self._refill(now)
+        self.level = min(self.level, -self.rate * seconds)
+
+    def adjust(self, amount: float, now: float) -> None:
+        """Charge (or with a negative ``amount`` refund) the difference to an earlier estimate."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+
+@dataclass
+class LimiterStats:
+    requests: int = 0
+    throttled: int = 0  # calls that had to wait
+    overloads: int = 0
+    decreases: int = 0
+    queue_delay_s: float = 0.0
+    max_queue_delay_s: float = 0.0
+    peak_inflight: int = 0
+
+
+@dataclass
+class _Ticket:
+    tokens: int
+    started: float
+
+
+class _Waiter:
+    """A queued call: a thread waiting on an event or a coroutine awaiting a future."""
+
+    __slots__ = ("event", "loop", "future")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop | None = None):
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class RateLimiter:
+    """Token buckets for RPM/TPM plus an AIMD concurrency limit; see the module docstring."""
+
+    def __init__(
+        self,
+        rpm: float | None = None,
+        tpm: float | None = None,
+        concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 256,
+        decrease: float = 0.5,
+        decrease_interval: float = 1.0,
+        burst: float = 1.0,
+        completion_tokens: int = 256,
+    ):
+        self.requests = TokenBucket(rpm, burst) if rpm else None
+        self.tokens = TokenBucket(tpm, burst) if tpm else None
+        self.limit = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease = decrease
+        self.decrease_interval = decrease_interval
+        self.completion_tokens = completion_tokens
+        self.stats = LimiterStats()
+        self.inflight = 0
+        self._waiters: collections.deque[_Waiter] = collections.deque()
+        self._last_decrease = 0.0
+        self._delays: collections.deque[float] = collections.deque(maxlen=10_000)
+        self._lock = threading.Lock()
+
+    # Admission
+
+    def _reserve(self, tokens: int) -> float:
+        """Reserve the budgets of one call; the delay before it may start."""
+        with self._lock:
+            now = time.monotonic()
+            delay = 0.0
+            if self.requests is not None:
+                delay = self.requests.reserve(1, now)
+            if self.tokens is not None:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+            return delay
+
+    def _enter(self, waiter_factory: Callable[[], _Waiter]) -> _Waiter | None:
+        """Take a concurrency slot, or queue a waiter that will be handed one."""
+        with self._lock:
+            if not self._waiters and self.inflight < int(self.limit):
+                self._entered()
+                return None
+            waiter = waiter_factory()
+            self._waiters.append(waiter)
+            return waiter
+
+    def _entered(self) -> None:
+        self.inflight += 1
+        self.stats.peak_inflight = max(self.stats.peak_inflight, self.inflight)
+
+    def _wake(self) -> None:
+        # Called with the lock held: hand free slots to the longest waiting calls
+        while self._waiters and self.inflight < int(self.limit):
+            self._entered()
+            self._waiters.popleft().wake()
+
+    def _started(self, tokens: int, queued_since: float) -> _Ticket:
+        now = time.perf_counter()
+        delay = now - queued_since
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.queue_delay_s += delay
+            self.stats.max_queue_delay_s = max(self.stats.max_queue_delay_s, delay)
+            if delay > 0.001:
+                self.stats.throttled += 1
+            self._delays.append(delay)
+        return _Ticket(tokens, now)
+
+    def acquire(self, tokens: int) -> _Ticket:
+        """Block until a call using about ``tokens`` may start."""
+        queued_since = time.perf_counter()
+        delay = self._reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        waiter = self._enter(_Waiter)
+        if waiter is not None:
+            waiter.event.wait()
+        return self._started(tokens, queued_since)
+
+    async def aacquire(self, tokens: int) -> _Ticket:
+        """Wait, without blocking the event loop, until a call using about ``tokens`` may start."""
+        queued_since = time.perf_counter()
+        delay = self._reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        waiter = self._enter(functools.partial(_Waiter, asyncio.get_running_loop()))
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        waiter = None
+                if waiter is not None:  # the slot was already handed over
+                    self.release(_Ticket(tokens, time.perf_counter()), abandoned=True)
+                raise
+        return self._started(tokens, queued_since)
+
+    def release(
+        self,
+        ticket: _Ticket,
+        used_tokens: int | None = None,
+        status: int | None = None,
+        retry: float | None = None,
+        abandoned: bool = False,
+    ) -> None:
+        """End a call: adapt the limit to how it went and let the next one in.
+
+        ``abandoned`` is for a slot given up before the call was sent: it only
+        frees the slot, and the limit stays as it is.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.inflight -= 1
+            if abandoned:
+                self._wake()
+                return
+            if self.tokens is not None and used_tokens is not None:
+                self.tokens.adjust(used_tokens - ticket.tokens, now)
+            if status in OVERLOAD_STATUS:
+                self.stats.overloads += 1
+                if now - self._last_decrease >= self.decrease_interval:
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease)
+                    self._last_decrease = now
+                    self.stats.decreases += 1
+                if retry and status == 429 and self.requests is not None:
+                    # The server's request budget ran out earlier than ours:
+                    # resume at the pace of the bucket, not with a burst
+                    self.requests.drain(retry, now)
+            elif status is None and self.inflight + 1 >= int(self.limit):
+                # Additive increase, by one slot per window of successful calls,
+                # and only while the limit is what holds the calls back
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._wake()
+
+    # Metrics
+
+    def snapshot(self) -> dict:
+        """Current limit, calls in flight and queued, and the queueing delay so far."""
+        with self._lock:
+            delays = LatencyStats.from_samples(self._delays)
+            return {
+                "limit": round(self.limit, 2),
+                "inflight": self.inflight,
+                "queued": len(self._waiters),
+                "peak_inflight": self.stats.peak_inflight,
+                "requests": self.stats.requests,
+                "throttled": self.stats.throttled,
+                "overloads": self.stats.overloads,
+                "decreases": self.stats.decreases,
+                "queue_delay_p50_s": delays.p50,
+                "queue_delay_p95_s": delays.p95,
+                "queue_delay_max_s": self.stats.max_queue_delay_s,
+            }
+
+    def prometheus(self, prefix: str = "agent_llm") -> str:
+        """Gauges and counters in the Prometheus text exposition format."""
+        with self._lock:
+            stats, limit, inflight, queued = self.stats, self.limit, self.inflight, len(self._waiters)
+            lines = [
+                ("concurrency_limit", "gauge", "Current adaptive concurrency limit", f"{limit:g}"),
+                ("inflight", "gauge", "LLM calls in flight", inflight),
+                ("queued", "gauge", "LLM calls waiting for the limiter", queued),
+                ("requests_total", "counter", "LLM calls admitted", stats.requests),
+                ("throttled_total", "counter", "LLM calls that had to wait", stats.throttled),
+                ("overloads_total", "counter", "Calls answered with 429, 502-504 or a timeout", stats.overloads),
+                ("queue_delay_seconds_sum", "counter", "Time calls spent waiting", f"{stats.queue_delay_s:g}"),
+                ("queue_delay_seconds_max", "gauge", "Longest wait so far", f"{stats.max_queue_delay_s:g}"),
+            ]
+        out = []
+        for name, kind, help_text, value in lines:
+            out += [f"# HELP {prefix}_{name} {help_text}.", f"# TYPE {prefix}_{name} {kind}", f"{prefix}_{name} {value}"]
+        return "\n".join(out) + "\n"
+
+    # Library mode
+
+    def wrap_completion(self, completion: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(completion)
+        def limited_completion(*args, **kwargs):
+            ticket = self.acquire(estimate_request_tokens(kwargs, self.completion_tokens))
+            try:
+                response = completion(*args, **kwargs)
+            except Exception as e:
+                self.release(ticket, status=error_status(e) or 0, retry=retry_after(e))
+                raise
+            if kwargs.get("stream"):
+                return _LimitedStream(response, self, ticket)
+            self.release(ticket, _usage_tokens(response))
+            return response
+
+        return limited_completion
+
+    def wrap_acompletion(self, acompletion: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(acompletion)
+        async def limited_acompletion(*args, **kwargs):
+            ticket = await self.aacquire(estimate_request_tokens(kwargs, self.completion_tokens))
+            try:
+                response = await acompletion(*args, **kwargs)
+            except BaseException as e:
+                self.release(ticket, status=error_status(e) or 0, retry=retry_after(e))
+                raise
+            if kwargs.get("stream"):
+                return _LimitedStream(response, self, ticket)
+            self.release(ticket, _usage_tokens(response))
+            return response
+
+        return limited_acompletion
+
+    def install(self) -> Callable[[], None]:
+        """Limit ``litellm.completion``/``acompletion``; returns an undo function."""
+        from agent_utils.litellm_hooks import wrap_completions
+
+        return wrap_completions(self.wrap_completion, self.wrap_acompletion)
+
+    # Proxy mode
+
+    def instrument_client(self, client: httpx.Client | httpx.AsyncClient) -> None:
+        """Limit the chat completions sent through an existing ``httpx`` client."""
+        # httpx only takes a transport in the constructor; wrapping the default
+        # one keeps the pool settings and event hooks of shared clients
+        transport = client._transport
+        if isinstance(transport, (LimitingTransport, AsyncLimitingTransport)):
+            return
+        if isinstance(client, httpx.AsyncClient):
+            client._transport = AsyncLimitingTransport(self, transport)
+        else:
+            client._transport = LimitingTransport(self, transport)
+
+
+class _Release:
+    """Releases a ticket exactly once: when a stream ends, is closed or is garbage collected."""
+
+    def __init__(self, limiter: RateLimiter, ticket: _Ticket, owner: object):
+        self._finalizer = weakref.finalize(owner, limiter.release, ticket)
+        self._limiter, self._ticket = limiter, ticket
+
+    def __call__(self, used_tokens: int | None = None) -> None:
+        if self._finalizer.detach() is not None:
+            self._limiter.release(self._ticket, used_tokens)
+
+
+class _LimitedStream:
+    """Passes a LiteLLM stream through and frees its slot once it is consumed."""
+
+    def __init__(self, stream: Any, limiter: RateLimiter, ticket: _Ticket):
+        self._stream = stream
+        self._release = _Release(limiter, ticket, self)
+        self._used: int | None = None
+
+    def _chunk(self, chunk: Any) -> None:
+        self._used = _usage_tokens(chunk) or self._used
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                self._chunk(chunk)
+                yield chunk
+        finally:
+            self._release(self._used)
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        try:
+            async for chunk in self._stream:
+                self._chunk(chunk)
+                yield chunk
+        finally:
+            self._release(self._used)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+def _chat_body(request: httpx.Request) -> dict | None:
+    if request.method != "POST" or not request.url.path.endswith("/chat/completions"):
+        return None
+    try:
+        return json.loads(request.content)
+    except ValueError:
+        return None
+
+
+class _SyncReleasingStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, release: _Release):
+        self._stream, self._release = stream, release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        self._stream.close()
+        self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: _Release):
+        self._stream, self._release = stream, release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+        self._release()
+
+
+def _response_tokens(content: bytes) -> int | None:
+    try:
+        return _usage_tokens(json.loads(content))
+    except ValueError:
+        return None
+
+
+class LimitingTransport(httpx.BaseTransport):
+    """``httpx`` transport that admits chat completions through a :class:`RateLimiter`.
+
+    A streamed response holds its slot until it is closed; its token use stays
+    at the estimate.
+    """
+
+    def __init__(self, limiter: RateLimiter, transport: httpx.BaseTransport | None = None):
+        self.limiter = limiter
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = _chat_body(request)
+        if body is None:
+            return self.transport.handle_request(request)
+        limiter = self.limiter
+        ticket = limiter.acquire(estimate_request_tokens(body, limiter.completion_tokens))
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TimeoutException:
+            limiter.release(ticket, status=408)
+            raise
+        except Exception:
+            limiter.release(ticket, status=0)
+            raise
+        if response.status_code >= 400:
+            limiter.release(ticket, status=response.status_code, retry=retry_after(response))
+        elif body.get("stream"):
+            response.stream = _SyncReleasingStream(response.stream, _Release(limiter, ticket, response))
+        else:
+            limiter.release(ticket, _response_tokens(response.read()))
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncLimitingTransport(httpx.AsyncBaseTransport):
+    """Async variant of :class:`LimitingTransport` for ``httpx.AsyncClient``."""
+
+    def __init__(self, limiter: RateLimiter, transport: httpx.AsyncBaseTransport | None = None):
+        self.limiter = limiter
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = _chat_body(request)
+        if body is None:
+            return await self.transport.handle_async_request(request)
+        limiter = self.limiter
+        ticket = await limiter.aacquire(estimate_request_tokens(body, limiter.completion_tokens))
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            limiter.release(ticket, status=408)
+            raise
+        except BaseException:
+            limiter.release(ticket, status=0)
+            raise
+        if response.status_code >= 400:
+            limiter.release(ticket, status=response.status_code, retry=retry_after(response))
+        elif body.get("stream"):
+            response.stream = _AsyncReleasingStream(response.stream, _Release(limiter, ticket, response))
+        else:
+            limiter.release(ticket, _response_tokens(await response.aread()))
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def limiter_from_env(share: float = 1.0) -> RateLimiter | None:
+    """Build the limiter set by ``RATE_LIMIT_RPM``, ``RATE_LIMIT_TPM`` and/or ``RATE_LIMIT_CONCURRENCY``.
+
+    ``RATE_LIMIT_CONCURRENCY`` is the starting concurrency limit (default 8),
+    ``RATE_LIMIT_MAX_CONCURRENCY`` its ceiling (default 256). ``share`` scales
+    the budgets, for processes that split them (e.g. ``1 / workers``).
+    """
+    rpm, tpm = os.getenv("RATE_LIMIT_RPM"), os.getenv("RATE_LIMIT_TPM")
+    concurrency = os.getenv("RATE_LIMIT_CONCURRENCY")
+    if not (rpm or tpm or concurrency):
+        return None
+    return RateLimiter(
+        rpm=float(rpm) * share if rpm else None,
+        tpm=float(tpm) * share if tpm else None,
+        concurrency=max(1, round(int(concurrency or 8) * share)),
+        max_concurrency=max(1, round(int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "256")) * share)),
+    )
+
+
+def install_from_env(share: float = 1.0) -> RateLimiter | None:
+    """Install the limiter from :func:`limiter_from_env` on LiteLLM and the shared proxy clients."""
+    limiter = limiter_from_env(share)
+    if limiter is not None:
+        from agent_utils.http_pool import shared_async_client, shared_client
+
+        limiter.install()
+        limiter.instrument_client(shared_client())
+        limiter.instrument_client(shared_async_client())
+    return limiter
@@ -0,0 +1,430 @@
+"""Record and replay LLM calls, for regression tests without the model.
+
+Recording captures every chat-completion request/response pair in a compact
+on-disk store (SQLite, zlib-compressed payloads), indexed by the hash of the
+request (:func:`agent_utils.cache.request_key`, plus whether it streams).
+Replay answers the same requests from the store with zero network traffic, so
+an evaluation set of thousands of prompts runs in seconds and gives the same
+answers every time. Three modes:
+
+* ``record`` - call the model and store every response (overwriting older ones),
+* ``replay`` - answer from the store only; a request that was never recorded
+  raises :class:`ReplayMiss` instead of reaching the network,
+* ``auto`` - replay what was recorded, record the rest.
+
+Like the completion cache, it plugs into both ways the examples talk to models:
+
+* library mode: :meth:`Replay.install` wraps ``litellm.completion`` and
+  ``litellm.acompletion`` (``ChatLiteLLM`` in LangGraph, ``LiteLlm`` in ADK,
+  ``LitellmModel`` in OpenAI Agents, CrewAI, Strands, ...),
+* proxy mode: :meth:`Replay.instrument_client` wraps the transport of an
+  ``httpx`` client, such as the shared clients of :mod:`agent_utils.http_pool`.
+
+Streams are recorded as their chunks (library mode) or their raw server-sent
+events (proxy mode) and replayed as streams. With ``latency_scale=1`` replies
+take as long as the recorded calls did; the default ``0`` answers at once.
+
+``LLM_REPLAY=evals.sqlite`` enables it for the CLI and the evaluation harness
+(:mod:`agent_utils.evaluate`), ``LLM_REPLAY_MODE`` picks the mode (default
+``replay``) and ``LLM_REPLAY_LATENCY_SCALE`` the latency scale.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Any, Callable
+
+import httpx
+
+from agent_utils.cache import request_key
+
+MODES = ("record", "replay", "auto")
+
+# Payload kinds: one JSON response, the chunks of a LiteLLM stream, a raw SSE body
+JSON, CHUNKS, SSE = "json", "chunks", "sse"
+
+
+def _keyword_binder(fn: Callable[..., Any]) -> Callable[[tuple, dict], dict]:
+    """Turns ``fn``'s positional arguments into keywords, so ``completion(model, messages)`` is keyed (and replayed) too."""
+    names = [
+        p.name
+        for p in inspect.signature(fn).parameters.values()
+        if p.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    ]
+
+    def bind(args: tuple, kwargs: dict) -> dict:
+        if not args:
+            return kwargs
+        if len(args) > len(names):
+            raise TypeError(f"{fn.__name__}() takes {len(names)} positional arguments but {len(args)} were given")
+        duplicate = next((name for name in names[: len(args)] if name in kwargs), None)
+        if duplicate is not None:
+            raise TypeError(f"{fn.__name__}() got multiple values for argument {duplicate!r}")
+        return {**dict(zip(names, args)), **kwargs}
+
+    return bind
+
+
+class ReplayMiss(LookupError):
+    """A request in ``replay`` mode that is not in the store."""
+
+    def __init__(self, key: str, model: str | None):
+        super().__init__(
+            f"no recorded response for request {key[:16]} (model {model!r}); "
+            f"record it with LLM_REPLAY_MODE=record or auto"
+        )
+        self.key = key
+
+
+def replay_key(request: dict, stream: bool) -> str:
+    """The store key: the completion cache's request hash, separate for streamed requests."""
+    return request_key(request) + (":stream" if stream else "")
+
+
+@dataclass
+class Interaction:
+    kind: str
+    payload: bytes
+    latency: float
+    model: str | None = None
+
+
+class ReplayStore:
+    """SQLite store of recorded interactions, safe to share between threads and processes."""
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = os.fspath(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS interactions ("
+            "key TEXT PRIMARY KEY, kind TEXT NOT NULL, payload BLOB NOT NULL, "
+            "latency REAL NOT NULL, model TEXT, recorded_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Interaction | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT kind, payload, latency, model FROM interactions WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else Interaction(row[0], zlib.decompress(row[1]), row[2], row[3])
+
+    def put(self, key: str, interaction: Interaction) -> None:
+        payload = zlib.compress(interaction.payload, 6)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO interactions VALUES (?, ?, ?, ?, ?, ?)",
+                (key, interaction.kind, payload, interaction.latency, interaction.model, time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM interactions").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # leave one compact file behind
+            self._db.close()
+
+
+@dataclass
+class ReplayStats:
+    hits: int = 0
+    misses: int = 0
+    recorded: int = 0
+    replayed_seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} replayed, {self.misses} missed, {self.recorded} recorded, "
+            f"{self.replayed_seconds:.2f}s of recorded model latency skipped"
+        )
+
+
+class Replay:
+    """Record/replay front-end: modes, statistics and the framework hooks."""
+
+    def __init__(self, store: ReplayStore, mode: str = "replay", latency_scale: float = 0.0):
+        if mode not in MODES:
+            raise ValueError(f"unknown replay mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.store = store
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.stats = ReplayStats()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str, model: str | None) -> Interaction | None:
+        """The recorded interaction, or ``None`` if the request should go to the model."""
+        if self.mode == "record":
+            return None
+        interaction = self.store.get(key)
+        with self._lock:
+            if interaction is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+                self.stats.replayed_seconds += interaction.latency
+        if interaction is None and self.mode == "replay":
+            raise ReplayMiss(key, model)
+        return interaction
+
+    def record(self, key: str, interaction: Interaction) -> None:
+        self.store.put(key, interaction)
+        with self._lock:
+            self.stats.recorded += 1
+
+    def delay(self, interaction: Interaction) -> float:
+        return interaction.latency * self.latency_scale
+
+    # Library mode
+
+    def wrap_completion(self, completion: Callable[..., Any]) -> Callable[..., Any]:
+        bind = _keyword_binder(completion)
+
+        @functools.wraps(completion)
+        def replayed_completion(*args, **kwargs):
+            kwargs = bind(args, kwargs)
+            stream = bool(kwargs.get("stream"))
+            key = replay_key(kwargs, stream)
+            interaction = self.lookup(key, kwargs.get("model"))
+            if interaction is not None:
+                if self.latency_scale:
+                    time.sleep(self.delay(interaction))
+                return _from_interaction(interaction, stream)
+            start = time.perf_counter()
+            response = completion(**kwargs)
+            if stream:
+                return _RecordingStream(response, self, key, kwargs.get("model"), start)
+            self.record(key, Interaction(JSON, _dump(response), time.perf_counter() - start, kwargs.get("model")))
+            return response
+
+        return replayed_completion
+
+    def wrap_acompletion(self, acompletion: Callable[..., Any]) -> Callable[..., Any]:
+        bind = _keyword_binder(acompletion)
+
+        @functools.wraps(acompletion)
+        async def replayed_acompletion(*args, **kwargs):
+            kwargs = bind(args, kwargs)
+            stream = bool(kwargs.get("stream"))
+            key = replay_key(kwargs, stream)
+            interaction = self.lookup(key, kwargs.get("model"))
+            if interaction is not None:
+                if self.latency_scale:
+                    await asyncio.sleep(self.delay(interaction))
+                return _from_interaction(interaction, stream)
+            start = time.perf_counter()
+            response = await acompletion(**kwargs)
+            if stream:
+                return _RecordingStream(response, self, key, kwargs.get("model"), start)
+            self.record(key, Interaction(JSON, _dump(response), time.perf_counter() - start, kwargs.get("model")))
+            return response
+
+        return replayed_acompletion
+
+    def install(self) -> Callable[[], None]:
+        """Record/replay ``litellm.completion``/``acompletion``; returns an undo function.
+
+        Install it before the usage recorder, so replayed calls are still counted.
+        """
+        from agent_utils.litellm_hooks import wrap_completions
+
+        return wrap_completions(self.wrap_completion, self.wrap_acompletion)
+
+    # Proxy mode
+
+    def instrument_client(self, client: httpx.Client | httpx.AsyncClient) -> None:
+        """Record/replay the chat completions sent through an existing ``httpx`` client."""
+        # httpx only takes a transport in the constructor; wrapping the default
+        # one keeps the pool settings and event hooks of shared clients
+        transport = client._transport
+        if isinstance(transport, (ReplayTransport, AsyncReplayTransport)):
+            return
+        if isinstance(client, httpx.AsyncClient):
+            client._transport = AsyncReplayTransport(self, transport)
+        else:
+            client._transport = ReplayTransport(self, transport)
+
+
+def _dump(response: Any) -> bytes:
+    data = response.model_dump() if hasattr(response, "model_dump") else dict(response)
+    return json.dumps(data, default=str).encode()
+
+
+def _from_interaction(interaction: Interaction, stream: bool) -> Any:
+    import litellm
+
+    data = json.loads(interaction.payload)
+    if stream:
+        return _ReplayedStream([litellm.ModelResponseStream(**chunk) for chunk in data])
+    return litellm.ModelResponse(**data)
+
+
+class _ReplayedStream:
+    """Recorded LiteLLM stream chunks, iterable both sync and async."""
+
+    def __init__(self, chunks: list[Any]):
+        self._chunks = chunks
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for chunk in self._chunks:
+            yield chunk
+
+
+class _RecordingStream:
+    """Passes a LiteLLM stream through and records its chunks once it is fully consumed."""
+
+    def __init__(self, stream: Any, replay: Replay, key: str, model: str | None, start: float):
+        self._stream = stream
+        self._replay, self._key, self._model, self._start = replay, key, model, start
+        self._chunks: list[dict] = []
+
+    def _chunk(self, chunk: Any) -> None:
+        self._chunks.append(json.loads(_dump(chunk)))
+
+    def _done(self) -> None:
+        payload = json.dumps(self._chunks).encode()
+        self._replay.record(self._key, Interaction(CHUNKS, payload, time.perf_counter() - self._start, self._model))
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._chunk(chunk)
+            yield chunk
+        self._done()
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        async for chunk in self._stream:
+            self._chunk(chunk)
+            yield chunk
+        self._done()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+def _request_of(request: httpx.Request) -> tuple[str, dict] | None:
+    if request.method != "POST" or not request.url.path.endswith("/chat/completions"):
+        return None
+    try:
+        body = json.loads(request.content)
+    except ValueError:
+        return None
+    return replay_key(body, bool(body.get("stream"))), body
+
+
+def _replayed_response(request: httpx.Request, interaction: Interaction) -> httpx.Response:
+    content_type = "text/event-stream" if interaction.kind == SSE else "application/json"
+    headers = {"content-type": content_type, "x-replay": "HIT"}
+    return httpx.Response(200, headers=headers, content=interaction.payload, request=request)
+
+
+def _recorded(response: httpx.Response, content: bytes, latency: float, model: str | None) -> Interaction:
+    kind = SSE if "text/event-stream" in response.headers.get("content-type", "") else JSON
+    return Interaction(kind, content, latency, model)
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """``httpx`` transport that records or replays chat-completion requests.
+
+    Recorded streams are read to the end before they are handed on, so
+    streaming output arrives all at once while recording.
+    """
+
+    def __init__(self, replay: Replay, transport: httpx.BaseTransport | None = None):
+        self.replay = replay
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        found = _request_of(request)
+        if found is None:
+            return self.transport.handle_request(request)
+        key, body = found
+        interaction = self.replay.lookup(key, body.get("model"))
+        if interaction is not None:
+            if self.replay.latency_scale:
+                time.sleep(self.replay.delay(interaction))
+            return _replayed_response(request, interaction)
+        start = time.perf_counter()
+        response = self.transport.handle_request(request)
+        if response.status_code == 200:
+            content = response.read()
+            self.replay.record(key, _recorded(response, content, time.perf_counter() - start, body.get("model")))
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    """Async variant of :class:`ReplayTransport` for ``httpx.AsyncClient``."""
+
+    def __init__(self, replay: Replay, transport: httpx.AsyncBaseTransport | None = None):
+        self.replay = replay
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        found = _request_of(request)
+        if found is None:
+            return await self.transport.handle_async_request(request)
+        key, body = found
+        interaction = self.replay.lookup(key, body.get("model"))
+        if interaction is not None:
+            if self.replay.latency_scale:
+                await asyncio.sleep(self.replay.delay(interaction))
+            return _replayed_response(request, interaction)
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        if response.status_code == 200:
+            content = await response.aread()
+            self.replay.record(key, _recorded(response, content, time.perf_counter() - start, body.get("model")))
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def replay_from_env() -> Replay | None:
+    """Build the replay selected by ``LLM_REPLAY`` (a store path), if it is set.
+
+    ``LLM_REPLAY_MODE`` is ``record``, ``replay`` (default) or ``auto`` and
+    ``LLM_REPLAY_LATENCY_SCALE`` scales the recorded latency of replies.
+    """
+    path = os.getenv("LLM_REPLAY")
+    if not path:
+        return None
+    mode = os.getenv("LLM_REPLAY_MODE", "replay")
+    return Replay(ReplayStore(path), mode=mode, latency_scale=float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "0")))
+
+
+def install_from_env() -> Replay | None:
+    """Install the replay selected by ``LLM_REPLAY`` on LiteLLM and the shared proxy clients."""
+    replay = replay_from_env()
+    if replay is not None:
+        from agent_utils.http_pool import shared_async_client, shared_client
+
+        replay.install()
+        replay.instrument_client(shared_client())
+        replay.instrument_client(shared_async_client())
+    return replay
@@ -0,0 +1,446 @@
+"""Client-side routing of chat completions over several model deployments.
+
+Every example pins one model on one proxy, so under peak load it runs into
+that deployment's rate limit while others sit idle. A :class:`Router` spreads
+requests over several deployments (models and/or proxy endpoints) and picks
+one per request:
+
+* ``least-latency`` - the lowest smoothed latency, scaled by the requests
+  already in flight there (so a burst does not all land on one deployment),
+* ``least-inflight`` - the fewest requests in flight, then the lowest latency,
+* ``round-robin`` - in turn, as a baseline.
+
+Deployments that answer 429 or 5xx (or cannot be reached) are tried again on
+another deployment at once. A 429 cools the deployment down for its
+``Retry-After`` (or ``cooldown`` seconds), as do ``allowed_fails``
+consecutive errors; cooled-down deployments are only used when no other is
+left. The time the router itself spends per request is measured
+(:attr:`RouterStats.overhead_s`).
+
+It plugs into both ways the examples talk to models, like the completion cache:
+
+* library mode: :meth:`Router.install` wraps ``litellm.completion`` and
+  ``litellm.acompletion`` and rewrites ``model``/``api_base``/``api_key``,
+* proxy mode: :meth:`Router.instrument_client` wraps the transport of an
+  ``httpx`` client and rewrites the URL, the ``model`` and the API key.
+
+``MODEL_DEPLOYMENTS`` enables it for the CLI and the library-mode examples
+(see :func:`router_from_env`)::
+
+    export MODEL_DEPLOYMENTS="sap/gpt-4o@http://127.0.0.1:4001,sap/gpt-4.1@http://127.0.0.1:4002"
+    export MODEL_ROUTER_STRATEGY=least-inflight
+"""
+
+from __future__ import annotations
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Iterator, Sequence
+
+import httpx
+
+from agent_utils.litellm_hooks import error_status, retry_after
+
+STRATEGIES = ("least-latency", "least-inflight", "round-robin")
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+@dataclass(eq=False)
+class Deployment:
+    """One model behind one endpoint; ``api_base=None`` keeps the client's endpoint."""
+
+    model: str
+    api_base: str | None = None
+    api_key: str | None = None
+    # Health, updated by the router
+    inflight: int = field(default=0, init=False)
+    latency: float | None = field(default=None, init=False)  # smoothed, seconds
+    requests: int = field(default=0, init=False)
+    failures: int = field(default=0, init=False)
+    consecutive_failures: int = field(default=0, init=False)
+    cooldown_until: float = field(default=0.0, init=False)
+
+    @property
+    def name(self) -> str:
+        return f"{self.model}@{self.api_base}" if self.api_base else self.model
+
+    def cooling(self, now: float) -> bool:
+        return self.cooldown_until > now
+
+    def snapshot(self) -> dict:
+        return {
+            "deployment": self.name,
+            "requests": self.requests,
+            "failures": self.failures,
+            "inflight": self.inflight,
+            "latency_ms": None if self.latency is None else round(self.latency * 1000, 1),
+            "cooling": self.cooling(time.monotonic()),
+        }
+
+
+def parse_deployments(spec: str) -> list[Deployment]:
+    """``"model[@api_base],..."`` as deployments, e.g. ``sap/gpt-4o@http://127.0.0.1:4001``."""
+    deployments = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, api_base = entry.partition("@")
+        deployments.append(Deployment(model=model, api_base=api_base or None))
+    return deployments
+
+
+@dataclass
+class RouterStats:
+    requests: int = 0
+    fallbacks: int = 0
+    exhausted: int = 0  # requests that failed on every deployment
+    overhead_s: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "overhead_us_per_request": self.overhead_us}
+
+    @property
+    def overhead_us(self) -> float:
+        return self.overhead_s / self.requests * 1e6 if self.requests else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.requests} requests, {self.fallbacks} fallbacks, {self.exhausted} failed everywhere, "
+            f"{self.overhead_us:.1f} us routing overhead per request"
+        )
+
+
+class NoDeploymentAvailable(RuntimeError):
+    pass
+
+
+class Router:
+    """Picks a deployment per request and tracks the health of each; see the module docstring."""
+
+    def __init__(
+        self,
+        deployments: Sequence[Deployment],
+        strategy: str = "least-latency",
+        cooldown: float = 5.0,
+        allowed_fails: int = 2,
+        smoothing: float = 0.3,
+    ):
+        if not deployments:
+            raise ValueError("the router needs at least one deployment")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown routing strategy {strategy!r}, expected one of {', '.join(STRATEGIES)}")
+        self.deployments = list(deployments)
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self.allowed_fails = allowed_fails
+        self.smoothing = smoothing
+        self.stats = RouterStats()
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    # Selection and health
+
+    def _score(self, deployment: Deployment) -> tuple:
+        latency = deployment.latency or 0.0  # untried deployments go first
+        if self.strategy == "least-inflight":
+            return deployment.inflight, latency
+        return latency * (deployment.inflight + 1), deployment.inflight
+
+    def pick(self, exclude: Sequence[Deployment] = ()) -> Deployment:
+        """Choose a deployment (not one of ``exclude``) and count the request as in flight."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [d for d in self.deployments if d not in exclude]
+            if not candidates:
+                raise NoDeploymentAvailable("every deployment failed for this request")
+            healthy = [d for d in candidates if not d.cooling(now)]
+            if not healthy:  # everything is cooling down: the one that recovers first
+                chosen = min(candidates, key=lambda d: d.cooldown_until)
+            elif self.strategy == "round-robin":
+                chosen = healthy[next(self._turn) % len(healthy)]
+            else:
+                chosen = min(healthy, key=self._score)
+            chosen.inflight += 1
+            chosen.requests += 1
+            return chosen
+
+    def succeeded(self, deployment: Deployment, latency: float) -> None:
+        with self._lock:
+            deployment.inflight -= 1
+            deployment.consecutive_failures = 0
+            if deployment.latency is None:
+                deployment.latency = latency
+            else:
+                deployment.latency += self.smoothing * (latency - deployment.latency)
+
+    def failed(self, deployment: Deployment, status: int | None, retry_after: float | None = None) -> None:
+        with self._lock:
+            deployment.inflight -= 1
+            deployment.failures += 1
+            deployment.consecutive_failures += 1
+            if status == 429 or deployment.consecutive_failures >= self.allowed_fails:
+                pause = retry_after if retry_after is not None else self.cooldown
+                deployment.cooldown_until = time.monotonic() + pause
+
+    def abandoned(self, deployment: Deployment) -> None:
+        """Free the slot of a call that ended without a verdict on the deployment (cancelled, interrupted)."""
+        with self._lock:
+            deployment.inflight -= 1
+
+    @contextmanager
+    def _overhead(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stats.overhead_s += elapsed
+
+    def _count(self, fallbacks: int = 0, exhausted: int = 0) -> None:
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.fallbacks += fallbacks
+            self.stats.exhausted += exhausted
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [deployment.snapshot() for deployment in self.deployments]
+
+    # Library mode
+
+    @staticmethod
+    def _litellm_params(deployment: Deployment) -> dict:
+        params = {"model": deployment.model}
+        if deployment.api_base:
+            params["api_base"] = deployment.api_base
+        if deployment.api_key:
+            params["api_key"] = deployment.api_key
+        return params
+
+    def wrap_completion(self, completion: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(completion)
+        def routed_completion(*args, **kwargs):
+            if args:
+                return completion(*args, **kwargs)
+            tried: list[Deployment] = []
+            while True:
+                with self._overhead():
+                    deployment = self.pick(tried)
+                start = time.perf_counter()
+                try:
+                    response = completion(**{**kwargs, **self._litellm_params(deployment)})
+                except Exception as e:
+                    if not self._fall_back(deployment, tried, error_status(e), retry_after(e)):
+                        raise
+                    continue
+                except BaseException:  # CancelledError (a timeout), KeyboardInterrupt
+                    self.abandoned(deployment)
+                    raise
+                with self._overhead():
+                    self.succeeded(deployment, time.perf_counter() - start)
+                    self._count(fallbacks=len(tried))
+                return response
+
+        return routed_completion
+
+    def wrap_acompletion(self, acompletion: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(acompletion)
+        async def routed_acompletion(*args, **kwargs):
+            if args:
+                return await acompletion(*args, **kwargs)
+            tried: list[Deployment] = []
+            while True:
+                with self._overhead():
+                    deployment = self.pick(tried)
+                start = time.perf_counter()
+                try:
+                    response = await acompletion(**{**kwargs, **self._litellm_params(deployment)})
+                except Exception as e:
+                    if not self._fall_back(deployment, tried, error_status(e), retry_after(e)):
+                        raise
+                    continue
+                except BaseException:  # CancelledError (a timeout), KeyboardInterrupt
+                    self.abandoned(deployment)
+                    raise
+                with self._overhead():
+                    self.succeeded(deployment, time.perf_counter() - start)
+                    self._count(fallbacks=len(tried))
+                return response
+
+        return routed_acompletion
+
+    def _fall_back(self, deployment: Deployment, tried: list[Deployment], status: int | None, retry_after: float | None) -> bool:
+        """Record a failed attempt; whether another deployment should be tried."""
+        with self._overhead():
+            if status not in RETRYABLE_STATUS:
+                self.abandoned(deployment)
+                self._count(fallbacks=len(tried))
+                return False
+            self.failed(deployment, status, retry_after)
+            tried.append(deployment)
+            if len(tried) == len(self.deployments):
+                self._count(fallbacks=len(tried) - 1, exhausted=1)
+                return False
+            return True
+
+    def install(self) -> Callable[[], None]:
+        """Route ``litellm.completion``/``acompletion``; returns an undo function."""
+        from agent_utils.litellm_hooks import wrap_completions
+
+        return wrap_completions(self.wrap_completion, self.wrap_acompletion)
+
+    # Proxy mode
+
+    def instrument_client(self, client: httpx.Client | httpx.AsyncClient) -> None:
+        """Route the chat completions sent through an existing ``httpx`` client."""
+        # httpx only takes a transport in the constructor; wrapping the default
+        # one keeps the pool settings and event hooks of shared clients
+        transport = client._transport
+        if isinstance(transport, (RoutingTransport, AsyncRoutingTransport)):
+            return
+        if isinstance(client, httpx.AsyncClient):
+            client._transport = AsyncRoutingTransport(self, transport)
+        else:
+            client._transport = RoutingTransport(self, transport)
+
+
+def _routed_request(request: httpx.Request, body: dict, deployment: Deployment) -> httpx.Request:
+    url = httpx.URL(deployment.api_base.rstrip("/") + "/chat/completions") if deployment.api_base else request.url
+    content = json.dumps({**body, "model": deployment.model}).encode()
+    headers = httpx.Headers(request.headers)
+    del headers["host"]
+    headers["content-length"] = str(len(content))
+    if deployment.api_key:
+        headers["authorization"] = f"Bearer {deployment.api_key}"
+    return httpx.Request(request.method, url, headers=headers, content=content, extensions=request.extensions)
+
+
+def _chat_body(request: httpx.Request) -> dict | None:
+    if request.method != "POST" or not request.url.path.endswith("/chat/completions"):
+        return None
+    try:
+        return json.loads(request.content)
+    except ValueError:
+        return None
+
+
+class RoutingTransport(httpx.BaseTransport):
+    """``httpx`` transport that sends each chat completion to a deployment chosen by the router.
+
+    The latency of a streamed response is the time to its headers.
+    """
+
+    def __init__(self, router: Router, transport: httpx.BaseTransport | None = None):
+        self.router = router
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = _chat_body(request)
+        if body is None:
+            return self.transport.handle_request(request)
+        router, tried = self.router, []
+        while True:
+            with router._overhead():
+                deployment = router.pick(tried)
+                routed = _routed_request(request, body, deployment)
+            start = time.perf_counter()
+            try:
+                response = self.transport.handle_request(routed)
+            except httpx.TransportError:
+                if not router._fall_back(deployment, tried, 503, None):
+                    raise
+                continue
+            except BaseException:  # CancelledError (a timeout), KeyboardInterrupt
+                router.abandoned(deployment)
+                raise
+            if response.status_code in RETRYABLE_STATUS:
+                if router._fall_back(deployment, tried, response.status_code, retry_after(response)):
+                    response.close()
+                    continue
+                return response
+            if response.status_code < 400:
+                with router._overhead():
+                    router.succeeded(deployment, time.perf_counter() - start)
+                    router._count(fallbacks=len(tried))
+            else:  # a bad request fails the same way on every deployment
+                router._fall_back(deployment, tried, response.status_code, None)
+            return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRoutingTransport(httpx.AsyncBaseTransport):
+    """Async variant of :class:`RoutingTransport` for ``httpx.AsyncClient``."""
+
+    def __init__(self, router: Router, transport: httpx.AsyncBaseTransport | None = None):
+        self.router = router
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = _chat_body(request)
+        if body is None:
+            return await self.transport.handle_async_request(request)
+        router, tried = self.router, []
+        while True:
+            with router._overhead():
+                deployment = router.pick(tried)
+                routed = _routed_request(request, body, deployment)
+            start = time.perf_counter()
+            try:
+                response = await self.transport.handle_async_request(routed)
+            except httpx.TransportError:
+                if not router._fall_back(deployment, tried, 503, None):
+                    raise
+                continue
+            except BaseException:  # CancelledError (a timeout), KeyboardInterrupt
+                router.abandoned(deployment)
+                raise
+            if response.status_code in RETRYABLE_STATUS:
+                if router._fall_back(deployment, tried, response.status_code, retry_after(response)):
+                    await response.aclose()
+                    continue
+                return response
+            if response.status_code < 400:
+                with router._overhead():
+                    router.succeeded(deployment, time.perf_counter() - start)
+                    router._count(fallbacks=len(tried))
+            else:  # a bad request fails the same way on every deployment
+                router._fall_back(deployment, tried, response.status_code, None)
+            return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def router_from_env() -> Router | None:
+    """Build the router for ``MODEL_DEPLOYMENTS`` (``model[@api_base],...``), if it is set.
+
+    ``MODEL_ROUTER_STRATEGY`` picks the strategy (default ``least-latency``)
+    and ``MODEL_ROUTER_COOLDOWN`` the cooldown in seconds.
+    """
+    spec = os.getenv("MODEL_DEPLOYMENTS")
+    if not spec:
+        return None
+    return Router(
+        parse_deployments(spec),
+        strategy=os.getenv("MODEL_ROUTER_STRATEGY", "least-latency"),
+        cooldown=float(os.getenv("MODEL_ROUTER_COOLDOWN", "5")),
+    )
+
+
+def install_from_env() -> Router | None:
+    """Install the router for ``MODEL_DEPLOYMENTS`` on LiteLLM and the shared proxy clients."""
+    router = router_from_env()
+    if router is not None:
+        from agent_utils.http_pool import shared_async_client, shared_client
+
+        router.install()
+        router.instrument_client(shared_client())
+        router.instrument_client(shared_async_client())
+    return router
@@ -0,0 +1,254 @@
+"""Stand-in OpenTelemetry collector and a latency report for the recorded spans.
+
+``serve`` accepts OTLP/HTTP trace exports (protobuf or JSON, as sent by
+``TRACE_SPANS=otlp``) and appends every span to a JSONL file, in the same
+format as ``TRACE_SPANS=spans.jsonl`` writes directly::
+
+    python -m agent_utils.span_collector serve --port 4318 --output spans.jsonl
+    TRACE_SPANS=otlp python -m agent_utils.cli -f langgraph "What's the weather in Paris?"
+
+``report`` breaks the latency of the recorded agent runs down into LLM
+requests, tool calls and the rest (framework overhead), and lists the spans by
+name::
+
+    python -m agent_utils.span_collector report spans.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable
+
+from agent_utils.stats import LatencyStats
+from agent_utils.tracing import TRACER_NAME
+
+
+def _any_value(value) -> object:
+    kind = value.WhichOneof("value")
+    if kind == "array_value":
+        return [_any_value(item) for item in value.array_value.values]
+    if kind == "kvlist_value":
+        return {item.key: _any_value(item.value) for item in value.kvlist_value.values}
+    return getattr(value, kind) if kind else None
+
+
+def otlp_to_dicts(request) -> list[dict]:
+    """Spans of an ``ExportTraceServiceRequest`` as records like :func:`agent_utils.tracing.span_to_dict`."""
+    spans = []
+    for resource_spans in request.resource_spans:
+        for scope_spans in resource_spans.scope_spans:
+            for span in scope_spans.spans:
+                spans.append(
+                    {
+                        "trace_id": span.trace_id.hex(),
+                        "span_id": span.span_id.hex(),
+                        "parent_id": span.parent_span_id.hex() or None,
+                        "name": span.name,
+                        "scope": scope_spans.scope.name or None,
+                        "start_ns": span.start_time_unix_nano,
+                        "end_ns": span.end_time_unix_nano,
+                        "duration_ms": (span.end_time_unix_nano - span.start_time_unix_nano) / 1e6,
+                        "status": ("UNSET", "OK", "ERROR")[span.status.code],
+                        "attributes": {item.key: _any_value(item.value) for item in span.attributes},
+                        "events": [{"name": event.name, "time_ns": event.time_unix_nano} for event in span.events],
+                    }
+                )
+    return spans
+
+
+class _CollectorHandler(BaseHTTPRequestHandler):
+    server: "SpanCollector"
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        from google.protobuf import json_format
+        from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import (
+            ExportTraceServiceRequest,
+            ExportTraceServiceResponse,
+        )
+
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.rstrip("/") != "/v1/traces":
+            self._reply(404, b"", "text/plain")
+            return
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        request = ExportTraceServiceRequest()
+        json_request = "json" in self.headers.get("Content-Type", "")
+        if json_request:
+            json_format.Parse(body, request)
+        else:
+            request.ParseFromString(body)
+        self.server.write(otlp_to_dicts(request))
+        if json_request:
+            self._reply(200, b"{}", "application/json")
+        else:
+            self._reply(200, ExportTraceServiceResponse().SerializeToString(), "application/x-protobuf")
+
+    def _reply(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class SpanCollector(ThreadingHTTPServer):
+    """OTLP/HTTP trace receiver appending spans to a JSONL file."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 4318, output: str = "spans.jsonl"):
+        super().__init__((host, port), _CollectorHandler)
+        self._file = open(output, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.spans = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def write(self, spans: list[dict]) -> None:
+        with self._lock:
+            self._file.writelines(json.dumps(span) + "\n" for span in spans)
+            self._file.flush()
+            self.spans += len(spans)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._file.close()
+
+
+# Report
+
+
+def load_spans(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _kind(span: dict) -> str:
+    return span["attributes"].get("gen_ai.operation.name", "")
+
+
+def _covered_ns(spans: Iterable[dict]) -> int:
+    """Time covered by the spans, counting overlaps (parallel calls) once."""
+    covered, end = 0, 0
+    for span in sorted(spans, key=lambda span: span["start_ns"]):
+        start = max(span["start_ns"], end)
+        if span["end_ns"] > start:
+            covered += span["end_ns"] - start
+            end = span["end_ns"]
+    return covered
+
+
+def breakdown(spans: list[dict], scope: str | None = TRACER_NAME) -> dict:
+    """Per-run latency split into LLM, tool and other time, plus statistics per span name.
+
+    A run is one ``invoke_agent`` span, or a whole trace without one. Only
+    spans of instrumentation ``scope`` are counted (``None``: all of them,
+    including the frameworks' own spans).
+    """
+    if scope is not None:
+        spans = [span for span in spans if span.get("scope") == scope]
+    traces: dict[str, list[dict]] = defaultdict(list)
+    for span in spans:
+        traces[span["trace_id"]].append(span)
+
+    runs = []
+    for trace in traces.values():
+        roots = [span for span in trace if _kind(span) == "invoke_agent"] or [None]
+        for root in roots:
+            start = root["start_ns"] if root else min(span["start_ns"] for span in trace)
+            end = root["end_ns"] if root else max(span["end_ns"] for span in trace)
+            inside = [span for span in trace if start <= span["start_ns"] and span["end_ns"] <= end]
+            llm = [span for span in inside if _kind(span) == "chat"]
+            tools = [span for span in inside if _kind(span) == "execute_tool"]
+            runs.append(
+                {
+                    "agent": root["attributes"].get("gen_ai.agent.name", root["name"]) if root else "-",
+                    "wall_s": (end - start) / 1e9,
+                    "llm_s": _covered_ns(llm) / 1e9,
+                    "tool_s": _covered_ns(tools) / 1e9,
+                    "other_s": (end - start - _covered_ns(llm + tools)) / 1e9,
+                    "llm_calls": len(llm),
+                    "tool_calls": len(tools),
+                }
+            )
+
+    by_name: dict[str, list[float]] = defaultdict(list)
+    first_chunk: list[float] = []
+    for span in spans:
+        by_name[span["name"]].append(span["duration_ms"] / 1000)
+        first = next((event for event in span.get("events", []) if event["name"] == "first_chunk"), None)
+        if first:
+            first_chunk.append((first["time_ns"] - span["start_ns"]) / 1e9)
+    return {
+        "runs": runs,
+        "spans": {name: LatencyStats.from_samples(durations) for name, durations in sorted(by_name.items())},
+        "first_chunk": LatencyStats.from_samples(first_chunk),
+    }
+
+
+def format_report(report: dict) -> str:
+    by_agent: dict[str, list[dict]] = defaultdict(list)
+    for run in report["runs"]:
+        by_agent[run["agent"]].append(run)
+    lines = [
+        f"{'agent':<18} {'runs':>5} {'wall ms':>9} {'LLM ms':>9} {'tool ms':>9} {'other ms':>9} {'other':>7}"
+        f" {'LLM calls':>10} {'tool calls':>11}"
+    ]
+    for agent, runs in sorted(by_agent.items()):
+        mean = {key: sum(run[key] for run in runs) / len(runs) for key in runs[0] if key != "agent"}
+        lines.append(
+            f"{agent[:18]:<18} {len(runs):>5} {mean['wall_s'] * 1000:>9.1f} {mean['llm_s'] * 1000:>9.1f}"
+            f" {mean['tool_s'] * 1000:>9.1f} {mean['other_s'] * 1000:>9.1f} {mean['other_s'] / max(mean['wall_s'], 1e-9):>7.1%}"
+            f" {mean['llm_calls']:>10.1f} {mean['tool_calls']:>11.1f}"
+        )
+    if report["first_chunk"].count:
+        lines.append(f"\nTime to first streamed chunk: {report['first_chunk']}")
+    lines.append(f"\n{'span':<32} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, stats in report["spans"].items():
+        lines.append(
+            f"{name[:32]:<32} {stats.count:>6} {stats.mean * 1000:>9.1f} {stats.p50 * 1000:>9.1f} {stats.p95 * 1000:>9.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stand-in OTLP collector and span latency report.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="receive OTLP/HTTP spans and append them to a JSONL file")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=4318)
+    serve.add_argument("--output", default="spans.jsonl")
+    report = commands.add_parser("report", help="latency breakdown of a span JSONL file")
+    report.add_argument("path")
+    report.add_argument("--all-scopes", action="store_true", help="include the frameworks' own spans")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        print(format_report(breakdown(load_spans(args.path), None if args.all_scopes else TRACER_NAME)))
+        return
+    collector = SpanCollector(args.host, args.port, args.output)
+    print(f"Span collector listening on {collector.url}/v1/traces, writing {args.output}")
+    try:
+        collector.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        collector.server_close()
+        print(f"{collector.spans} spans received")
+
+
+if __name__ == "__main__":
+    main()
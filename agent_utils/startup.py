@@ -0,0 +1,37 @@
+"""Start-up helpers for the example entry points.
+
+The examples import their framework inside ``main()`` (or a ``build_*``
+function), so loading a script costs little more than the interpreter itself.
+Scripts that ask the user for input first can also hide the framework import
+behind the prompt: :func:`preload` imports the modules in a background thread
+while ``input()`` waits, and the script joins the thread before building the
+agent::
+
+    loading = preload("crewai", "crewai.tools")
+    city = input("Input city: ")
+    loading.join()
+    crew = build_crew(city)  # the imports inside are now dictionary lookups
+
+Only the background thread imports while it runs, and ``join()`` is called
+before the main thread imports anything, so the two never race on a module.
+"""
+
+from __future__ import annotations
+
+import importlib
+import threading
+
+
+def _import_all(modules: tuple[str, ...]) -> None:
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception:  # noqa: BLE001 - the main thread re-raises it with a proper traceback
+            return
+
+
+def preload(*modules: str) -> threading.Thread:
+    """Import ``modules`` in a daemon thread; ``join()`` the returned thread before using them."""
+    thread = threading.Thread(target=_import_all, args=(modules,), name="preload", daemon=True)
+    thread.start()
+    return thread
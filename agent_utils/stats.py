@@ -0,0 +1,164 @@
+"""Small statistics helpers for the benchmark and batch scripts."""
+
+from __future__ import annotations
+
+import bisect
+import itertools
+import math
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Iterable
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Linearly interpolated percentile ``q`` (0-100) of pre-sorted values."""
+    if not sorted_values:
+        return math.nan
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+@dataclass
+class LatencyStats:
+    """Summary of a list of latencies, in seconds."""
+
+    count: int
+    mean: float
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+    @classmethod
+    def from_samples(cls, samples: Iterable[float]) -> "LatencyStats":
+        values = sorted(samples)
+        if not values:
+            return cls(0, math.nan, math.nan, math.nan, math.nan, math.nan)
+        return cls(
+            count=len(values),
+            mean=sum(values) / len(values),
+            p50=percentile(values, 50),
+            p95=percentile(values, 95),
+            p99=percentile(values, 99),
+            max=values[-1],
+        )
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+    def __str__(self) -> str:
+        return (
+            f"mean {self.mean * 1000:.1f} ms, p50 {self.p50 * 1000:.1f} ms, "
+            f"p95 {self.p95 * 1000:.1f} ms, p99 {self.p99 * 1000:.1f} ms, max {self.max * 1000:.1f} ms"
+        )
+
+
+class HdrHistogram:
+    """Latency histogram with a fixed relative precision, in the layout of HdrHistogram.
+
+    Values are counted in integer ``unit`` steps (microseconds by default) in
+    buckets whose width doubles every power of two but always has
+    ``significant_digits`` of precision, so any number of samples takes a few
+    kilobytes and percentiles are exact to that precision. Unlike
+    :class:`LatencyStats` it keeps no samples, and histograms of several
+    runs can be added up (:meth:`add`).
+    """
+
+    def __init__(self, significant_digits: int = 3, unit: float = 1e-6):
+        self.significant_digits = significant_digits
+        self.unit = unit
+        self._sub_bits = math.ceil(math.log2(2 * 10**significant_digits))
+        self.counts: Counter[int] = Counter()
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        bucket = max(value.bit_length() - self._sub_bits, 0)
+        return (bucket << (self._sub_bits - 1)) + (value >> bucket)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < 1 << self._sub_bits:
+            return index
+        bucket = (index >> (self._sub_bits - 1)) - 1
+        return ((index - (bucket << (self._sub_bits - 1))) << bucket) + (1 << bucket) - 1
+
+    def record(self, seconds: float) -> None:
+        value = max(round(seconds / self.unit), 0)
+        self.counts[self._index(value)] += 1
+        self.min = value if not self.count else min(self.min, value)
+        self.max = max(self.max, value)
+        self.count += 1
+        self.total += value
+
+    def add(self, other: HdrHistogram) -> None:
+        if other.unit != self.unit or other._sub_bits != self._sub_bits:
+            raise ValueError("Histograms with a different unit or precision cannot be added")
+        if other.count:
+            self.min = other.min if not self.count else min(self.min, other.min)
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count * self.unit if self.count else math.nan
+
+    def value_at_percentile(self, q: float) -> float:
+        """The value ``q`` percent (0-100) of the samples are at or below, in seconds."""
+        if not self.count:
+            return math.nan
+        rank = max(math.ceil(q / 100 * self.count), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._highest_equivalent(index), self.max) * self.unit
+        return self.max * self.unit
+
+    def latency_stats(self) -> LatencyStats:
+        if not self.count:
+            return LatencyStats.from_samples([])
+        return LatencyStats(
+            count=self.count,
+            mean=self.mean,
+            p50=self.value_at_percentile(50),
+            p95=self.value_at_percentile(95),
+            p99=self.value_at_percentile(99),
+            max=self.max * self.unit,
+        )
+
+    def percentile_distribution(self, ticks_per_half_distance: int = 5, scale: float = 1e-3) -> str:
+        """The ``.hgrm`` text HdrHistogram's plotting tools read; values in ``scale`` seconds (ms)."""
+        lines = [f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}", ""]
+        if self.count:
+            ranks = sorted(self.counts)
+            cumulative = list(itertools.accumulate(self.counts[i] for i in ranks))
+            q, half = 0.0, 0
+            while True:
+                position = bisect.bisect_left(cumulative, max(math.ceil(q / 100 * self.count), 1))
+                value = min(self._highest_equivalent(ranks[position]), self.max) * self.unit / scale
+                inverse = f"{1 / (1 - q / 100):14.2f}" if q < 100 else ""
+                lines.append(f"{value:12.3f} {q / 100:14.12f} {cumulative[position]:10d} {inverse}".rstrip())
+                if q >= 100:
+                    break
+                # Ticks get denser towards 100%: each halving of the remaining distance has the same number
+                step = 100 / 2**half / 2 / ticks_per_half_distance
+                q += step
+                if q >= 100 * (1 - 0.5 ** (half + 1)) - 1e-9:
+                    half += 1
+                if cumulative[position] == self.count and q < 100:
+                    q = 100.0
+        deviation = math.sqrt(
+            sum(self.counts[i] * (self._highest_equivalent(i) * self.unit - self.mean) ** 2 for i in self.counts) / self.count
+        ) if self.count else math.nan
+        lines += [
+            f"#[Mean    = {self.mean / scale:12.3f}, StdDeviation   = {deviation / scale:12.3f}]",
+            f"#[Max     = {self.max * self.unit / scale:12.3f}, Total count    = {self.count:12d}]",
+            f"#[Buckets = {len(self.counts):12d}, SubBuckets     = {1 << self._sub_bits:12d}]",
+        ]
+        return "\n".join(lines) + "\n"
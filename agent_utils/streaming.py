@@ -0,0 +1,88 @@
+"""Streaming output helpers: print tokens as they arrive and time them.
+
+Every example has a streaming mode, enabled with ``STREAM_TOKENS=1``. In that
+mode the example feeds each text delta and each tool-call event it receives to
+a :class:`StreamTimer`, which prints them immediately and records:
+
+* time to first token (TTFT), measured from the start of the request,
+* inter-token latency, the gaps between consecutive text deltas of one model
+  response. Gaps that span a tool call are not counted, so tool execution time
+  does not inflate the numbers.
+
+"Tokens" are the deltas the framework emits, which are usually (but not
+always) single model tokens.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from typing import TextIO
+
+from agent_utils.stats import LatencyStats
+
+
+def streaming_enabled() -> bool:
+    """Whether the examples should stream (``STREAM_TOKENS`` is set to a true value)."""
+    return os.getenv("STREAM_TOKENS", "").lower() in ("1", "true", "yes", "on")
+
+
+class StreamTimer:
+    """Prints streamed tokens and tool events, and reports TTFT and inter-token latency."""
+
+    def __init__(self, out: TextIO | None = None):
+        self.out = out or sys.stdout
+        self.start = time.perf_counter()
+        self.first_token: float | None = None
+        self.tokens = 0
+        self.gaps: list[float] = []
+        self.events = 0
+        self._last: float | None = None
+        self._at_line_start = True
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def token(self, text: str) -> None:
+        """Record and print one text delta."""
+        if not text:
+            return
+        now = time.perf_counter()
+        if self.first_token is None:
+            self.first_token = now - self.start
+        elif self._last is not None:
+            self.gaps.append(now - self._last)
+        self._last = now
+        self.tokens += 1
+        self.out.write(text)
+        self.out.flush()
+        self._at_line_start = text.endswith("\n")
+
+    def event(self, description: str) -> None:
+        """Print a non-text event (tool call, tool result) on its own line."""
+        self.events += 1
+        self._last = None  # the next delta belongs to a new model response
+        if not self._at_line_start:
+            self.out.write("\n")
+        self.out.write(f"[{self.elapsed() * 1000:7.0f} ms] {description}\n")
+        self.out.flush()
+        self._at_line_start = True
+
+    def summary(self) -> str:
+        total = self.elapsed()
+        if self.first_token is None:
+            return f"No tokens streamed ({self.events} events in {total:.2f}s)"
+        inter_token = LatencyStats.from_samples(self.gaps)
+        return (
+            f"TTFT {self.first_token * 1000:.0f} ms, {self.tokens} tokens and {self.events} events "
+            f"in {total:.2f}s\nInter-token latency: {inter_token}"
+        )
+
+    def finish(self) -> None:
+        """Print the timing summary."""
+        if not self._at_line_start:
+            self.out.write("\n")
+        self.out.write(f"\n{self.summary()}\n")
+        self.out.flush()
+        self._at_line_start = True
@@ -0,0 +1,552 @@
+"""Offline stand-in for the LiteLLM proxy.
+
+Serves the OpenAI chat-completions API with deterministic answers so the
+examples can be exercised and benchmarked without network access or SAP
+credentials:
+
+* a request that offers tools gets a ``get_weather`` tool call for the city in
+  the last user message, and once the tool result is in the conversation a
+  TV-style final report built from it,
+* ReAct-style text agents (LlamaIndex, CrewAI) get ``Action:`` / ``Final Answer:``
+  text and smolagents' ``CodeAgent`` gets a code block calling the tool,
+* latency, jitter, prompt-size dependent prefill time, streaming chunk
+  size/delay and error injection are configurable, as are rate limits like a
+  real deployment's (requests in flight, requests per minute) that answer
+  429, and ``GET /stats`` reports what was served,
+* ``workers`` and ``overhead`` model the proxy's own capacity
+  (``litellm --num_workers``): every request spends ``overhead`` seconds on
+  one of ``workers`` workers before the model call and queues while all are
+  busy, so the stub saturates at ``workers / overhead`` requests per second,
+* with ``prompt_cache`` on, a request whose leading tools and messages match
+  an earlier request's gets those tokens reported as
+  ``prompt_tokens_details.cached_tokens`` and no prefill time for them.
+  Claude models only cache up to blocks marked with ``cache_control``, the
+  others cache every prefix automatically, as the providers do.
+
+Start it and point the examples at it::
+
+    python -m agent_utils.stub_proxy --port 4000 --latency-ms 200
+    export PROXY_BASE_URL=http://127.0.0.1:4000 LITELLM_PROXY_API_KEY=sk-stub
+
+or use it in-process::
+
+    with StubProxy(config=StubConfig(latency=0.05)) as proxy:
+        ...  # proxy.url, proxy.stats()
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agent_utils.ratelimit import TokenBucket
+from agent_utils.weather import extract_cities, weather_report
+
+DEFAULT_MODELS = ("sap/gpt-4o", "sap/gpt-4.1", "sap/gpt-5", "sap/claude-4.5-sonnet")
+DEFAULT_CITY = "London"
+PREFIX_CACHE_SIZE = 4096  # prefixes remembered by the simulated prompt cache
+REPORT_MARKER = "==== REPORT GENERATED ===="
+JOKE = "Why did the weather presenter bring a ladder? To reach the high pressure!"
+
+
+_ERROR_TYPES = {429: "rate_limit_error", 503: "service_unavailable"}
+
+
+@dataclass
+class StubConfig:
+    """Behaviour of the stub; times are in seconds."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    prefill_per_1k: float = 0.0  # extra delay per 1000 prompt tokens
+    chunk_size: int = 4
+    chunk_delay: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    max_concurrency: int = 0  # requests in flight beyond this get a 429 (0: unlimited)
+    rpm: int = 0  # requests per minute, refilled continuously with one second of burst (0: unlimited)
+    workers: int = 0  # proxy workers; requests queue while all are busy (0: unlimited)
+    overhead: float = 0.0  # proxy time per request, spent on a worker
+    prompt_cache: bool = False  # reuse prompt prefixes seen before, like a provider's prompt cache
+    cache_min_tokens: int = 1024  # shorter prefixes are not cached
+    seed: int = 0
+    models: tuple[str, ...] = DEFAULT_MODELS
+
+
+@dataclass
+class Reply:
+    """What the stub model answers: text, tool calls, or both."""
+
+    content: str | None = None
+    tool_calls: list[dict] = field(default_factory=list)
+
+
+def message_text(message: dict) -> str:
+    """Flatten OpenAI message content (a string or a list of parts) to text."""
+    content = message.get("content")
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+def requested_cities(text: str) -> list[str]:
+    """Cities a prompt asks about; "in London, Paris and Tokyo" yields three."""
+    return extract_cities(text) or [DEFAULT_CITY]
+
+
+def _has_cache_control(block: dict) -> bool:
+    content = block.get("content")
+    parts = content if isinstance(content, list) else []
+    return "cache_control" in block or any(isinstance(part, dict) and "cache_control" in part for part in parts)
+
+
+def prompt_prefixes(body: dict) -> list[tuple[str, int, bool]]:
+    """(hash, tokens, marked) of every prefix of the prompt, tools first, in the order providers cache them."""
+    explicit = "claude" in str(body.get("model", "")).lower()
+    digest = hashlib.sha256()
+    tokens = 0
+    prefixes = []
+    for block in [*(body.get("tools") or []), *(body.get("messages") or [])]:
+        data = json.dumps(block, sort_keys=True)
+        digest.update(data.encode())
+        tokens += estimate_tokens(data)
+        prefixes.append((digest.hexdigest(), tokens, _has_cache_control(block) or not explicit))
+    return prefixes
+
+
+def _final_answer(reports: list[str], system: str) -> str:
+    answer = " ".join(reports) + " " + JOKE if reports else JOKE
+    if REPORT_MARKER in system:
+        answer += "\n" + REPORT_MARKER
+    return answer
+
+
+def _report_text(tool_output: str) -> str:
+    # Tools such as the ADK example's return {"status": ..., "report": ...}.
+    try:
+        data = json.loads(tool_output)
+    except ValueError:
+        return tool_output.strip()
+    if isinstance(data, dict):
+        return str(data.get("report") or data.get("error_message") or tool_output)
+    return tool_output.strip()
+
+
+def _tool_arguments(tool: dict, city: str) -> dict:
+    properties = tool.get("function", {}).get("parameters", {}).get("properties", {})
+    if "city" in properties:
+        return {"city": city}
+    if len(properties) == 1:
+        return {next(iter(properties)): city}
+    return {}
+
+
+def plan_reply(body: dict) -> Reply:
+    """Decide the deterministic answer to a chat-completions request body."""
+    messages = body.get("messages") or []
+    system = "\n".join(message_text(m) for m in messages if m.get("role") in ("system", "developer"))
+    last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+    prompt = message_text(messages[last_user]) if last_user >= 0 else ""
+
+    tools = body.get("tools") or []
+    if tools:
+        tool_outputs = [message_text(m) for m in messages[last_user + 1 :] if m.get("role") == "tool"]
+        if tool_outputs:
+            return Reply(content=_final_answer([_report_text(out) for out in tool_outputs], system))
+        tool = next((t for t in tools if t.get("function", {}).get("name") == "get_weather"), tools[0])
+        return Reply(
+            tool_calls=[
+                {"name": tool["function"]["name"], "arguments": _tool_arguments(tool, city)}
+                for city in requested_cities(prompt)
+            ]
+        )
+
+    if "Action Input" in system or "Action Input" in prompt:
+        # ReAct text protocol (LlamaIndex ReActAgent, CrewAI): tool results come
+        # back as "Observation:" text somewhere in the conversation.
+        conversation = "\n".join(message_text(m) for m in messages if m.get("role") not in ("system", "developer"))
+        if "Observation:" in conversation:
+            observation = conversation.rsplit("Observation:", 1)[1].strip().split("\n\n", 1)[0]
+            answer = _final_answer([_report_text(observation)], system)
+            return Reply(content=f"Thought: I now know the final answer\nFinal Answer: {answer}")
+        city = requested_cities(prompt)[0]
+        return Reply(
+            content="Thought: I need the current weather to answer.\n"
+            f"Action: get_weather\nAction Input: {json.dumps({'city': city})}"
+        )
+
+    if "final_answer" in system:
+        # smolagents CodeAgent: answer with a code block that calls the tool.
+        city = requested_cities(prompt)[0]
+        open_tag, close_tag = ("<code>", "</code>") if "<code>" in system else ("```py", "```")
+        return Reply(
+            content="Thought: I will look up the weather and return it as the final answer.\n"
+            f"{open_tag}\nreport = get_weather(city={city!r})\n"
+            f"final_answer(report + {' ' + JOKE!r})\n{close_tag}"
+        )
+
+    reports = [weather_report(city) for city in requested_cities(prompt)]
+    return Reply(content=_final_answer(reports, system))
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # keep-alive replies would wait for the client's delayed ACK
+    server: "_StubServer"
+
+    def setup(self):
+        super().setup()
+        self.server.stub._count(connections=1)  # one handler per TCP connection
+
+    def log_message(self, format, *args):  # noqa: A002 - signature from BaseHTTPRequestHandler
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        stub = self.server.stub
+        if path in ("/models", "/v1/models"):
+            models = [{"id": m, "object": "model", "owned_by": "stub"} for m in stub.config.models]
+            self._send_json(200, {"object": "list", "data": models})
+        elif path.startswith("/health"):
+            self._send_json(200, {"status": "healthy"})
+        elif path == "/stats":
+            self._send_json(200, stub.stats())
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        stub = self.server.stub
+        if path == "/stats/reset":
+            self._read_json()
+            stub.reset_stats()
+            self._send_json(200, {"status": "ok"})
+        elif path in ("/chat/completions", "/v1/chat/completions"):
+            stub.handle_completion(self, self._read_json())
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # load tests open many connections at once
+
+    def __init__(self, address, stub: "StubProxy", verbose: bool):
+        self.stub = stub
+        self.verbose = verbose
+        super().__init__(address, _StubHandler)
+
+    def handle_error(self, request, client_address):
+        # A client that went away mid-reply (killed, timed out) is not a stub error
+        if not isinstance(sys.exc_info()[1], ConnectionError) or self.verbose:
+            super().handle_error(request, client_address)
+
+
+class StubProxy:
+    """OpenAI-compatible stub server; see the module docstring."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        config: StubConfig | None = None,
+        *,
+        verbose: bool = False,
+    ) -> None:
+        self.config = config or StubConfig()
+        self._server = _StubServer((host, port), self, verbose)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._ids = itertools.count(1)
+        self._stats: Counter[str] = Counter()
+        self._active = 0
+        self._rpm = TokenBucket(self.config.rpm) if self.config.rpm else None
+        self._prefixes: OrderedDict[str, None] = OrderedDict()
+        self._workers = threading.Semaphore(self.config.workers) if self.config.workers else None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubProxy":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-proxy", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "StubProxy":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            self._stats.update(increments)
+
+    def _draw(self) -> tuple[float, bool]:
+        config = self.config
+        with self._lock:
+            delay = config.latency + (self._rng.uniform(-config.jitter, config.jitter) if config.jitter else 0.0)
+            fail = config.error_rate > 0 and self._rng.random() < config.error_rate
+        return max(delay, 0.0), fail
+
+    def _admit(self) -> bool:
+        """Take a slot within the rate limits, or return False for a 429."""
+        config = self.config
+        with self._lock:
+            if config.max_concurrency and self._active >= config.max_concurrency:
+                return False
+            if self._rpm is not None:
+                now = time.monotonic()
+                if self._rpm.reserve(1, now) > 0:
+                    self._rpm.adjust(-1, now)  # refused: give the request back
+                    return False
+            self._active += 1
+            return True
+
+    def _cached_tokens(self, body: dict) -> int:
+        """Tokens of the longest cached prefix of the prompt; caches this prompt's cacheable prefixes."""
+        cached = 0
+        with self._lock:
+            for digest, tokens, cacheable in prompt_prefixes(body):
+                if not cacheable or tokens < self.config.cache_min_tokens:
+                    continue
+                if digest in self._prefixes:
+                    self._prefixes.move_to_end(digest)
+                    cached = tokens
+                else:
+                    self._prefixes[digest] = None
+                    if len(self._prefixes) > PREFIX_CACHE_SIZE:
+                        self._prefixes.popitem(last=False)
+        return cached
+
+    def handle_completion(self, handler: _StubHandler, body: dict) -> None:
+        if not self._admit():
+            self._count(requests=1, errors=1, rate_limited=1)
+            handler._send_json(
+                429,
+                {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error", "code": 429}},
+                {"Retry-After": "1"},
+            )
+            return
+        try:
+            self._complete(handler, body)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _work(self) -> None:
+        """Spend the proxy's per-request overhead on a free worker, waiting for one if needed."""
+        if self._workers is None:
+            if self.config.overhead:
+                time.sleep(self.config.overhead)
+            return
+        start = time.perf_counter()
+        with self._workers:
+            waited = time.perf_counter() - start
+            self._count(worker_waits=1 if waited > 0.001 else 0, worker_wait_ms=round(waited * 1000))
+            time.sleep(self.config.overhead)
+
+    def _complete(self, handler: _StubHandler, body: dict) -> None:
+        self._work()
+        delay, fail = self._draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            status = self.config.error_status
+            self._count(requests=1, errors=1)
+            handler._send_json(
+                status,
+                {"error": {"message": "Injected stub error", "type": _ERROR_TYPES.get(status, "server_error"), "code": status}},
+                {"Retry-After": "1"} if status == 429 else None,
+            )
+            return
+
+        prompt_text = json.dumps(body.get("messages", [])) + json.dumps(body.get("tools", []))
+        prompt_tokens = estimate_tokens(prompt_text)
+        cached_tokens = min(self._cached_tokens(body), prompt_tokens) if self.config.prompt_cache else 0
+        if self.config.prefill_per_1k:
+            time.sleep(self.config.prefill_per_1k * (prompt_tokens - cached_tokens) / 1000)
+
+        reply = plan_reply(body)
+        number = next(self._ids)
+        completion_id = f"chatcmpl-stub-{number}"
+        tool_calls = [
+            {
+                "id": f"call_stub_{number}_{i}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["arguments"])},
+            }
+            for i, call in enumerate(reply.tool_calls)
+        ]
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens((reply.content or "") + json.dumps(tool_calls)),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if self.config.prompt_cache:
+            usage["prompt_tokens_details"] = {"cached_tokens": cached_tokens}
+        self._count(
+            requests=1,
+            completions=1,
+            streamed=1 if body.get("stream") else 0,
+            tool_call_replies=1 if tool_calls else 0,
+            final_replies=0 if tool_calls else 1,
+            prompt_tokens=usage["prompt_tokens"],
+            cached_tokens=cached_tokens,
+            completion_tokens=usage["completion_tokens"],
+        )
+
+        model = body.get("model", self.config.models[0])
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": reply.content}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            handler._send_json(
+                200,
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                    "usage": usage,
+                },
+            )
+            return
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+        self._stream(handler, completion_id, model, reply, tool_calls, finish_reason, usage if include_usage else None)
+
+    def _stream(self, handler, completion_id, model, reply, tool_calls, finish_reason, usage) -> None:
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        created = int(time.time())
+
+        def event(delta: dict | None, finish: str | None = None, **extra) -> None:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model}
+            chunk["choices"] = [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish}]
+            chunk.update(extra)
+            handler.write_chunk(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+
+        event({"role": "assistant", "content": ""})
+        text = reply.content or ""
+        size = max(self.config.chunk_size, 1)
+        for start in range(0, len(text), size):
+            if self.config.chunk_delay and start:
+                time.sleep(self.config.chunk_delay)
+            event({"content": text[start : start + size]})
+        for i, call in enumerate(tool_calls):
+            event({"tool_calls": [{"index": i, **call}]})
+        event({}, finish_reason)
+        if usage is not None:
+            event(None, usage=usage)
+        handler.write_chunk(b"data: [DONE]\n\n")
+        handler.write_chunk(b"")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible stub of the LiteLLM proxy.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before each response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter added to the latency")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0, help="extra delay per 1000 prompt tokens")
+    parser.add_argument("--chunk-size", type=int, default=4, help="characters per streamed content chunk")
+    parser.add_argument("--chunk-delay-ms", type=float, default=0.0, help="delay between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected errors")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="429 beyond this many requests in flight")
+    parser.add_argument("--rpm", type=int, default=0, help="429 beyond this many requests per minute")
+    parser.add_argument("--workers", type=int, default=0, help="proxy workers, like litellm --num_workers (0: unlimited)")
+    parser.add_argument("--overhead-ms", type=float, default=0.0, help="proxy time per request, spent on a worker")
+    parser.add_argument("--prompt-cache", action="store_true", help="simulate provider prompt caching")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        prefill_per_1k=args.prefill_ms_per_1k / 1000,
+        chunk_size=args.chunk_size,
+        chunk_delay=args.chunk_delay_ms / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        max_concurrency=args.max_concurrency,
+        rpm=args.rpm,
+        workers=args.workers,
+        overhead=args.overhead_ms / 1000,
+        prompt_cache=args.prompt_cache,
+        seed=args.seed,
+    )
+    stub = StubProxy(args.host, args.port, config, verbose=args.verbose)
+    print(f"Stub LiteLLM proxy listening on {stub.url}", flush=True)
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
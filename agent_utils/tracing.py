@@ -0,0 +1,454 @@
+"""OpenTelemetry spans for agent runs, LLM requests and tool calls.
+
+Enable tracing for an example without code changes with ``TRACE_SPANS``:
+
+* ``TRACE_SPANS=spans.jsonl`` writes finished spans to a JSONL file,
+* ``TRACE_SPANS=otlp`` exports them over OTLP/HTTP to
+  ``OTEL_EXPORTER_OTLP_ENDPOINT`` (default ``http://localhost:4318``), for
+  example to the stand-in collector ``python -m agent_utils.span_collector``,
+* ``TRACE_SPANS=console`` prints them.
+
+Spans follow the OpenTelemetry GenAI conventions and are created where every
+framework's work passes anyway, like :mod:`agent_utils.usage`:
+
+* ``invoke_agent {framework}``: one agent run (:func:`agent_span`),
+* ``chat {model}``: each LLM request, from the LiteLLM wrappers in library
+  mode or the ``httpx`` response hooks of the shared proxy clients; token
+  counts are attributes, and streamed responses get a ``first_chunk`` event,
+* ``execute_tool {name}``: each tool call (:func:`traced_tool`).
+
+Frameworks with their own OpenTelemetry support (Google ADK, Strands) add
+their spans to the same traces once a tracer provider is installed. Without
+``TRACE_SPANS`` nothing is imported and the decorators cost one global lookup.
+Requires ``opentelemetry-sdk`` (and ``opentelemetry-exporter-otlp-proto-http``
+for ``otlp``).
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Sequence
+
+if TYPE_CHECKING:
+    import httpx
+
+#: Instrumentation scope of the spans created here.
+TRACER_NAME = "agent_utils"
+
+_tracer = None  # set by setup_tracing()
+_in_litellm: ContextVar[bool] = ContextVar("tracing_in_litellm", default=False)
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+# Exporter
+
+
+def span_to_dict(span: Any) -> dict:
+    """A finished SDK span as a flat, JSON-friendly record (also written by the span collector)."""
+    parent = span.parent
+    return {
+        "trace_id": format(span.context.trace_id, "032x"),
+        "span_id": format(span.context.span_id, "016x"),
+        "parent_id": format(parent.span_id, "016x") if parent else None,
+        "name": span.name,
+        "scope": span.instrumentation_scope.name if span.instrumentation_scope else None,
+        "start_ns": span.start_time,
+        "end_ns": span.end_time,
+        "duration_ms": (span.end_time - span.start_time) / 1e6,
+        "status": span.status.status_code.name,
+        "attributes": dict(span.attributes or {}),
+        "events": [{"name": event.name, "time_ns": event.timestamp} for event in span.events],
+    }
+
+
+def _file_exporter(path: str):
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class FileSpanExporter(SpanExporter):
+        """Appends finished spans to a JSONL file."""
+
+        def __init__(self):
+            self._file = open(path, "a", encoding="utf-8")
+            self._lock = threading.Lock()
+
+        def export(self, spans: Sequence[Any]) -> SpanExportResult:
+            lines = "".join(json.dumps(span_to_dict(span), default=str) + "\n" for span in spans)
+            with self._lock:
+                self._file.write(lines)
+                self._file.flush()
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            self._file.close()
+
+    return FileSpanExporter()
+
+
+def setup_tracing(target: str, service_name: str = "agent-examples") -> Any:
+    """Install a tracer provider exporting to ``target`` (a file path, ``otlp`` or ``console``).
+
+    Also adds the LLM request hooks to LiteLLM (if it is importable) and to the
+    shared ``httpx`` clients of :mod:`agent_utils.http_pool`. Returns the provider.
+    """
+    global _tracer
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+    if target == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter()
+    elif target == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        exporter = _file_exporter(target)
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(TRACER_NAME)
+
+    from agent_utils.http_pool import shared_async_client, shared_client
+
+    instrument_client(shared_client())
+    instrument_client(shared_async_client())
+    try:
+        install_litellm()
+    except ImportError:
+        pass  # proxy-only example
+    return provider
+
+
+def setup_from_env(service_name: str = "agent-examples") -> Any:
+    """:func:`setup_tracing` with the target from ``TRACE_SPANS``, if it is set."""
+    target = os.getenv("TRACE_SPANS")
+    return setup_tracing(target, service_name) if target else None
+
+
+# Agent runs and tools
+
+
+@contextmanager
+def agent_span(framework: str, model: str | None = None, **attributes: Any) -> Iterator[Any]:
+    """Span around one agent run; LLM and tool spans inside it become its children."""
+    if _tracer is None:
+        yield None
+        return
+    attributes = {"gen_ai.operation.name": "invoke_agent", "gen_ai.agent.name": framework, **attributes}
+    if model:
+        attributes["gen_ai.request.model"] = model
+    with _tracer.start_as_current_span(f"invoke_agent {framework}", attributes=attributes) as span:
+        yield span
+
+
+def _record_tool_call() -> None:
+    # Only counted once usage accounting is in use: importing agent_utils.usage
+    # here would add httpx to every example's start-up
+    usage = sys.modules.get("agent_utils.usage")
+    if usage is not None:
+        usage.record_tool_call()
+
+
+def traced_tool(fn: Callable[..., Any] | None = None, *, name: str | None = None) -> Callable[..., Any]:
+    """Decorator: an ``execute_tool`` span around each call of a (sync or async) tool function.
+
+    Each call is also counted in the current :mod:`agent_utils.usage` run. The
+    wrapper keeps the function's name, signature and docstring, so the
+    frameworks build the same tool schema from it.
+    """
+    if fn is None:
+        return functools.partial(traced_tool, name=name)
+    tool_name = name or fn.__name__
+
+    def attributes(args: tuple, kwargs: dict) -> dict:
+        arguments = json.dumps([*map(str, args), *(f"{k}={v}" for k, v in kwargs.items())])
+        return {"gen_ai.operation.name": "execute_tool", "gen_ai.tool.name": tool_name, "tool.arguments": arguments[:256]}
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            _record_tool_call()
+            if _tracer is None:
+                return await fn(*args, **kwargs)
+            with _tracer.start_as_current_span(f"execute_tool {tool_name}", attributes=attributes(args, kwargs)):
+                return await fn(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        _record_tool_call()
+        if _tracer is None:
+            return fn(*args, **kwargs)
+        with _tracer.start_as_current_span(f"execute_tool {tool_name}", attributes=attributes(args, kwargs)):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+# LLM requests: library mode
+
+
+def _chat_attributes(model: str | None, usage: Any = None) -> dict:
+    attributes = {"gen_ai.operation.name": "chat", "gen_ai.system": "litellm"}
+    if model:
+        attributes["gen_ai.request.model"] = model
+    if usage is not None:
+        get = usage.get if isinstance(usage, dict) else lambda key: getattr(usage, key, None)
+        attributes["gen_ai.usage.input_tokens"] = get("prompt_tokens") or 0
+        attributes["gen_ai.usage.output_tokens"] = get("completion_tokens") or 0
+    return attributes
+
+
+class _StreamSpan:
+    """Ends an LLM span when its LiteLLM stream is exhausted; marks the first chunk."""
+
+    def __init__(self, stream: Any, span: Any):
+        self._stream = stream
+        self._span = span
+        self._first = True
+
+    def _chunk(self, chunk: Any) -> None:
+        if self._first:
+            self._span.add_event("first_chunk")
+            self._first = False
+        usage = getattr(chunk, "usage", None)
+        if usage:
+            self._span.set_attributes(_chat_attributes(None, usage))
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                self._chunk(chunk)
+                yield chunk
+        finally:
+            self._span.end()
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        try:
+            async for chunk in self._stream:
+                self._chunk(chunk)
+                yield chunk
+        finally:
+            self._span.end()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+def _finish(span: Any, response: Any, model: str | None) -> Any:
+    if not hasattr(response, "choices"):  # a stream: the span ends with it
+        return _StreamSpan(response, span)
+    span.set_attributes(_chat_attributes(model, getattr(response, "usage", None)))
+    span.end()
+    return response
+
+
+def _wrap_completion(completion: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(completion)
+    def traced_completion(*args, **kwargs):
+        if _tracer is None:
+            return completion(*args, **kwargs)
+        model = kwargs.get("model")
+        span = _tracer.start_span(f"chat {model}", attributes=_chat_attributes(model))
+        token = _in_litellm.set(True)
+        try:
+            response = completion(*args, **kwargs)
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(_error_status(e))
+            span.end()
+            raise
+        finally:
+            _in_litellm.reset(token)
+        return _finish(span, response, model)
+
+    return traced_completion
+
+
+def _wrap_acompletion(acompletion: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(acompletion)
+    async def traced_acompletion(*args, **kwargs):
+        if _tracer is None:
+            return await acompletion(*args, **kwargs)
+        model = kwargs.get("model")
+        span = _tracer.start_span(f"chat {model}", attributes=_chat_attributes(model))
+        token = _in_litellm.set(True)
+        try:
+            response = await acompletion(*args, **kwargs)
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(_error_status(e))
+            span.end()
+            raise
+        finally:
+            _in_litellm.reset(token)
+        return _finish(span, response, model)
+
+    return traced_acompletion
+
+
+def _error_status(error: Exception) -> Any:
+    from opentelemetry.trace import Status, StatusCode
+
+    return Status(StatusCode.ERROR, repr(error))
+
+
+def install_litellm() -> Callable[[], None]:
+    """Trace LiteLLM library calls; returns an undo function."""
+    from agent_utils.litellm_hooks import wrap_completions
+
+    return wrap_completions(_wrap_completion, _wrap_acompletion)
+
+
+# LLM requests: proxy mode
+
+
+_START = "agent_utils.tracing.start_ns"
+
+
+def _chat_request(request: httpx.Request) -> bool:
+    return request.method == "POST" and request.url.path.endswith("/chat/completions")
+
+
+def _request_hook(request: httpx.Request) -> None:
+    if _tracer is not None and _chat_request(request):
+        request.extensions = {**request.extensions, _START: time.time_ns()}
+
+
+def _response_span(response: httpx.Response) -> Any:
+    request = response.request
+    start = request.extensions.get(_START)
+    if _tracer is None or start is None or _in_litellm.get():
+        return None
+    try:
+        body = json.loads(request.content)
+    except ValueError:
+        body = {}
+    model = body.get("model")
+    attributes = {**_chat_attributes(model), "http.response.status_code": response.status_code}
+    span = _tracer.start_span(f"chat {model}", attributes=attributes, start_time=start)
+    if response.status_code >= 400:
+        from opentelemetry.trace import Status, StatusCode
+
+        span.set_status(Status(StatusCode.ERROR, f"HTTP {response.status_code}"))
+    return span
+
+
+class _BodySpan:
+    """Reads usage from the response body and ends the span when the body is done."""
+
+    def __init__(self, response: httpx.Response, span: Any):
+        self._span = span
+        self._sse = "text/event-stream" in response.headers.get("content-type", "")
+        self._buffer = b""
+        self._first = True
+
+    def feed(self, data: bytes) -> None:
+        if self._first and data:
+            self._span.add_event("first_chunk")
+            self._first = False
+        self._buffer += data
+        if self._sse:
+            *lines, self._buffer = self._buffer.split(b"\n")
+            for line in lines:
+                if line.startswith(b"data:") and b'"usage"' in line:
+                    self._usage(line[5:])
+
+    def end(self) -> None:
+        if self._span is None:
+            return
+        if self._buffer:
+            self._usage(self._buffer[5:] if self._sse else self._buffer)
+        self._span.end()
+        self._span = None
+
+    def _usage(self, payload: bytes) -> None:
+        try:
+            usage = json.loads(payload).get("usage")
+        except (ValueError, AttributeError):
+            return
+        if usage:
+            self._span.set_attributes(_chat_attributes(None, usage))
+
+
+@functools.cache
+def _span_streams() -> tuple[type, type]:
+    # Defined on first use: httpx is only imported once a client is instrumented
+    import httpx
+
+    class SyncSpanStream(httpx.SyncByteStream):
+        def __init__(self, stream: httpx.SyncByteStream, body: _BodySpan):
+            self._stream, self._body = stream, body
+
+        def __iter__(self):
+            for chunk in self._stream:
+                self._body.feed(chunk)
+                yield chunk
+            self._body.end()
+
+        def close(self) -> None:
+            self._body.end()
+            self._stream.close()
+
+    class AsyncSpanStream(httpx.AsyncByteStream):
+        def __init__(self, stream: httpx.AsyncByteStream, body: _BodySpan):
+            self._stream, self._body = stream, body
+
+        async def __aiter__(self):
+            async for chunk in self._stream:
+                self._body.feed(chunk)
+                yield chunk
+            self._body.end()
+
+        async def aclose(self) -> None:
+            self._body.end()
+            await self._stream.aclose()
+
+    return SyncSpanStream, AsyncSpanStream
+
+
+def _sync_response_hook(response: httpx.Response) -> None:
+    span = _response_span(response)
+    if span is not None:
+        response.stream = _span_streams()[0](response.stream, _BodySpan(response, span))
+
+
+async def _async_request_hook(request: httpx.Request) -> None:
+    _request_hook(request)
+
+
+async def _async_response_hook(response: httpx.Response) -> None:
+    span = _response_span(response)
+    if span is not None:
+        response.stream = _span_streams()[1](response.stream, _BodySpan(response, span))
+
+
+def instrument_client(client: httpx.Client | httpx.AsyncClient) -> None:
+    """Trace chat completions sent through an ``httpx`` client."""
+    import httpx
+
+    if isinstance(client, httpx.AsyncClient):
+        hooks = {"request": _async_request_hook, "response": _async_response_hook}
+    else:
+        hooks = {"request": _request_hook, "response": _sync_response_hook}
+    for event, hook in hooks.items():
+        if hook not in client.event_hooks[event]:
+            client.event_hooks[event].append(hook)
@@ -0,0 +1,472 @@
+"""Per-run token, call and cost accounting for every framework.
+
+The frameworks report usage in different shapes, or not at all
+(``crew.kickoff()``, ``initiate_group_chat``). This module counts it where
+every framework's traffic passes anyway:
+
+* library mode: :meth:`UsageRecorder.install_litellm` wraps
+  ``litellm.completion``/``acompletion`` and reads ``response.usage``,
+* proxy mode: :meth:`UsageRecorder.instrument_client` adds response hooks to
+  an ``httpx`` client (for example the shared clients of
+  :mod:`agent_utils.http_pool`) and reads the ``usage`` field of JSON and
+  streamed responses,
+* tool calls: every tool decorated with
+  :func:`agent_utils.tracing.traced_tool` calls :func:`record_tool_call`.
+
+Everything that happens inside ``with recorder.run(framework, model):`` is
+added to one :class:`RunRecord`: prompt and completion tokens, the prompt
+tokens the provider served from its prompt cache, LLM calls, tool calls, cost
+and wall time. Records can be appended to a JSONL file as they
+finish and aggregated into Prometheus metrics::
+
+    recorder = UsageRecorder(sink="usage.jsonl")
+    recorder.install_litellm()
+    with recorder.run("crewai", "sap/gpt-4o"):
+        adapter.run("What's the weather in Paris?")
+    print(recorder.summary())
+    Path("usage.prom").write_text(recorder.prometheus())
+
+Costs come from LiteLLM (``response_cost`` in library mode, the
+``x-litellm-response-cost`` header of the proxy) when it knows the model's
+price. LiteLLM streams are asked for their usage
+(``stream_options={"include_usage": True}``); streams through the proxy only
+carry token counts when the framework asks for them.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Iterator
+
+import httpx
+
+#: Upper bounds (seconds) of the run duration histogram buckets.
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass
+class RunRecord:
+    framework: str
+    model: str
+    id: Any = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # of the prompt tokens, served from the provider's prompt cache
+    llm_calls: int = 0
+    tool_calls: int = 0
+    cost_usd: float = 0.0
+    wall_s: float = 0.0
+    started_at: float = field(default_factory=time.time)
+    error: str | None = None
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "total_tokens": self.total_tokens}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RunRecord":
+        return cls(**{key: value for key, value in data.items() if key != "total_tokens"})
+
+
+# The run the current code belongs to. Frameworks that hand work to threads
+# without copying the context still reach the run if it is the only one active.
+_current: ContextVar[RunRecord | None] = ContextVar("usage_run", default=None)
+_in_litellm: ContextVar[bool] = ContextVar("usage_in_litellm", default=False)
+_active: list[RunRecord] = []
+_active_lock = threading.Lock()
+
+
+def current_run() -> RunRecord | None:
+    record = _current.get()
+    if record is None:
+        with _active_lock:
+            record = _active[0] if len(_active) == 1 else None
+    return record
+
+
+def record_llm_call(
+    prompt_tokens: int = 0, completion_tokens: int = 0, cost_usd: float | None = None, cached_tokens: int = 0
+) -> None:
+    """Add one LLM call to the current run, if any."""
+    record = current_run()
+    if record is None:
+        return
+    with _active_lock:
+        record.llm_calls += 1
+        record.prompt_tokens += prompt_tokens or 0
+        record.completion_tokens += completion_tokens or 0
+        record.cached_tokens += cached_tokens or 0
+        record.cost_usd += cost_usd or 0.0
+
+
+def record_tool_call() -> None:
+    """Add one tool execution to the current run, if any."""
+    record = current_run()
+    if record is not None:
+        with _active_lock:
+            record.tool_calls += 1
+
+
+def _tokens(usage: Any) -> tuple[int, int]:
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+
+
+def cached_tokens(usage: Any) -> int:
+    """Prompt tokens read from the provider's prompt cache (OpenAI and Anthropic usage shapes)."""
+    if usage is None:
+        return 0
+    if not isinstance(usage, dict):
+        usage = {
+            "prompt_tokens_details": getattr(usage, "prompt_tokens_details", None),
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None),
+        }
+    details = usage.get("prompt_tokens_details") or {}
+    cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+    return cached or usage.get("cache_read_input_tokens") or 0
+
+
+# Library mode
+
+
+def _litellm_cost(response: Any) -> float | None:
+    cost = (getattr(response, "_hidden_params", None) or {}).get("response_cost")
+    if cost is not None:
+        return cost
+    try:
+        import litellm
+
+        return litellm.completion_cost(completion_response=response)
+    except Exception:  # noqa: BLE001 - unknown model price
+        return None
+
+
+def _record_response(response: Any, model: str | None, is_async: bool) -> Any:
+    if not hasattr(response, "choices"):  # a stream
+        if is_async and hasattr(response, "__aiter__"):
+            return _AsyncStreamUsage(response, model)
+        if hasattr(response, "__iter__"):
+            return _SyncStreamUsage(response, model)
+    usage = getattr(response, "usage", None)
+    record_llm_call(*_tokens(usage), _litellm_cost(response), cached_tokens(usage))
+    return response
+
+
+def _stream_cost(model: str | None, prompt_tokens: int, completion_tokens: int) -> float:
+    try:
+        import litellm
+
+        return sum(litellm.cost_per_token(model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens))
+    except Exception:  # noqa: BLE001 - unknown model price
+        return 0.0
+
+
+class _SyncStreamUsage:
+    """Passes a LiteLLM stream through and picks up its usage chunk."""
+
+    def __init__(self, stream: Any, model: str | None):
+        self._stream = stream
+        self._model = model
+        self._record = current_run()
+        record_llm_call()
+
+    def _chunk(self, chunk: Any) -> None:
+        usage = getattr(chunk, "usage", None)
+        prompt_tokens, completion_tokens = _tokens(usage)
+        if self._record is not None and (prompt_tokens or completion_tokens):
+            cost = _stream_cost(self._model, prompt_tokens, completion_tokens)
+            with _active_lock:
+                self._record.prompt_tokens += prompt_tokens
+                self._record.completion_tokens += completion_tokens
+                self._record.cached_tokens += cached_tokens(usage)
+                self._record.cost_usd += cost
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._chunk(chunk)
+            yield chunk
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class _AsyncStreamUsage(_SyncStreamUsage):
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        async for chunk in self._stream:
+            self._chunk(chunk)
+            yield chunk
+
+
+def _with_stream_usage(kwargs: dict) -> dict:
+    # Streams only report usage when asked to; LiteLLM puts it on the last chunk
+    if kwargs.get("stream") and "stream_options" not in kwargs:
+        kwargs = {**kwargs, "stream_options": {"include_usage": True}}
+    return kwargs
+
+
+def _wrap_completion(completion: Callable[..., Any]) -> Callable[..., Any]:
+    if getattr(completion, "_counts_usage", False):
+        return completion  # already counted further down (build_adapter ran before in this process)
+
+    @functools.wraps(completion)
+    def completion_with_usage(*args, **kwargs):
+        token = _in_litellm.set(True)
+        try:
+            kwargs = _with_stream_usage(kwargs)
+            return _record_response(completion(*args, **kwargs), kwargs.get("model"), is_async=False)
+        finally:
+            _in_litellm.reset(token)
+
+    completion_with_usage._counts_usage = True  # functools.wraps carries it to the layers installed above
+    return completion_with_usage
+
+
+def _wrap_acompletion(acompletion: Callable[..., Any]) -> Callable[..., Any]:
+    if getattr(acompletion, "_counts_usage", False):
+        return acompletion  # already counted further down (build_adapter ran before in this process)
+
+    @functools.wraps(acompletion)
+    async def acompletion_with_usage(*args, **kwargs):
+        token = _in_litellm.set(True)
+        try:
+            kwargs = _with_stream_usage(kwargs)
+            return _record_response(await acompletion(*args, **kwargs), kwargs.get("model"), is_async=True)
+        finally:
+            _in_litellm.reset(token)
+
+    acompletion_with_usage._counts_usage = True  # functools.wraps carries it to the layers installed above
+    return acompletion_with_usage
+
+
+# Proxy mode
+
+
+class _UsageScanner:
+    """Finds ``usage`` in a chat-completion body, JSON or server-sent events."""
+
+    def __init__(self, response: httpx.Response):
+        self.sse = "text/event-stream" in response.headers.get("content-type", "")
+        self.buffer = b""
+        self.prompt_tokens = self.completion_tokens = self.cached_tokens = 0
+
+    def feed(self, data: bytes) -> None:
+        self.buffer += data
+        if not self.sse:
+            return
+        *lines, self.buffer = self.buffer.split(b"\n")
+        for line in lines:
+            if line.startswith(b"data:") and b'"usage"' in line:
+                self._read(line[5:])
+
+    def finish(self) -> tuple[int, int, int]:
+        if self.buffer:
+            self._read(self.buffer[5:] if self.sse else self.buffer)
+        return self.prompt_tokens, self.completion_tokens, self.cached_tokens
+
+    def _read(self, payload: bytes) -> None:
+        try:
+            usage = json.loads(payload).get("usage")
+        except (ValueError, AttributeError):
+            return
+        prompt, completion = _tokens(usage)
+        self.prompt_tokens += prompt
+        self.completion_tokens += completion
+        self.cached_tokens += cached_tokens(usage)
+
+
+class _SyncUsageStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, scanner: _UsageScanner, record: RunRecord | None):
+        self._stream, self._scanner, self._record = stream, scanner, record
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._scanner.feed(chunk)
+            yield chunk
+        _add_tokens(self._record, *self._scanner.finish())
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class _AsyncUsageStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, scanner: _UsageScanner, record: RunRecord | None):
+        self._stream, self._scanner, self._record = stream, scanner, record
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._scanner.feed(chunk)
+            yield chunk
+        _add_tokens(self._record, *self._scanner.finish())
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+def _add_tokens(record: RunRecord | None, prompt_tokens: int, completion_tokens: int, cached: int) -> None:
+    # The body may be read after the run's context is gone, so the record is bound up front
+    if record is not None:
+        with _active_lock:
+            record.prompt_tokens += prompt_tokens
+            record.completion_tokens += completion_tokens
+            record.cached_tokens += cached
+
+
+def _track_response(response: httpx.Response) -> RunRecord | None:
+    request = response.request
+    if _in_litellm.get() or request.method != "POST" or not request.url.path.endswith("/chat/completions"):
+        return None
+    record = current_run()
+    if record is None or response.status_code != 200:
+        return None
+    cost = response.headers.get("x-litellm-response-cost")
+    with _active_lock:
+        record.llm_calls += 1
+        record.cost_usd += float(cost) if cost else 0.0
+    return record
+
+
+def _sync_response_hook(response: httpx.Response) -> None:
+    record = _track_response(response)
+    if record is not None:
+        response.stream = _SyncUsageStream(response.stream, _UsageScanner(response), record)
+
+
+async def _async_response_hook(response: httpx.Response) -> None:
+    record = _track_response(response)
+    if record is not None:
+        response.stream = _AsyncUsageStream(response.stream, _UsageScanner(response), record)
+
+
+# Recorder
+
+
+class UsageRecorder:
+    """Collects :class:`RunRecord` objects, writes them as JSONL and aggregates metrics."""
+
+    def __init__(self, sink: str | os.PathLike[str] | None = None):
+        self.records: list[RunRecord] = []
+        self._sink = open(sink, "a", encoding="utf-8") if sink else None
+        self._lock = threading.Lock()
+        self._totals: dict[tuple[str, str], dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._buckets: dict[tuple[str, str], list[int]] = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+
+    @contextmanager
+    def run(self, framework: str, model: str, run_id: Any = None) -> Iterator[RunRecord]:
+        """Attribute all usage inside the block to a new record, added to the recorder on exit."""
+        record = RunRecord(framework, model, run_id)
+        token = _current.set(record)
+        with _active_lock:
+            _active.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record.error = repr(e)
+            raise
+        finally:
+            record.wall_s = time.perf_counter() - start
+            _current.reset(token)
+            with _active_lock:
+                _active.remove(record)
+            self.add(record)
+
+    def add(self, record: RunRecord) -> None:
+        """Add a finished record (for example one sent back by a worker process)."""
+        with self._lock:
+            self.records.append(record)
+            totals = self._totals[(record.framework, record.model)]
+            totals["runs"] += 1
+            totals["errors"] += record.error is not None
+            for name in ("prompt_tokens", "completion_tokens", "cached_tokens", "llm_calls", "tool_calls", "cost_usd", "wall_s"):
+                totals[name] += getattr(record, name)
+            buckets = self._buckets[(record.framework, record.model)]
+            buckets[next((i for i, bound in enumerate(DURATION_BUCKETS) if record.wall_s <= bound), -1)] += 1
+            if self._sink is not None:
+                self._sink.write(json.dumps(record.as_dict(), ensure_ascii=False, default=str) + "\n")
+                self._sink.flush()
+
+    @staticmethod
+    def install_litellm() -> Callable[[], None]:
+        """Count LiteLLM library calls; returns an undo function."""
+        from agent_utils.litellm_hooks import wrap_completions
+
+        return wrap_completions(_wrap_completion, _wrap_acompletion)
+
+    @staticmethod
+    def instrument_client(client: httpx.Client | httpx.AsyncClient) -> None:
+        """Count chat completions sent through an ``httpx`` client."""
+        hook = _async_response_hook if isinstance(client, httpx.AsyncClient) else _sync_response_hook
+        if hook not in client.event_hooks["response"]:
+            client.event_hooks["response"].append(hook)
+
+    def summary(self) -> str:
+        """Per framework and model: runs and average usage per run."""
+        lines = [
+            f"{'framework':<16}{'model':<20}{'runs':>6}{'prompt tok':>12}{'cached':>8}{'compl tok':>11}"
+            f"{'LLM calls':>11}{'tool calls':>12}{'cost $':>10}{'wall s':>9}"
+        ]
+        with self._lock:
+            for (framework, model), totals in sorted(self._totals.items()):
+                runs = totals["runs"]
+                lines.append(
+                    f"{framework:<16}{model:<20}{runs:>6.0f}{totals['prompt_tokens'] / runs:>12.0f}"
+                    f"{totals['cached_tokens'] / max(totals['prompt_tokens'], 1):>8.0%}"
+                    f"{totals['completion_tokens'] / runs:>11.0f}{totals['llm_calls'] / runs:>11.1f}"
+                    f"{totals['tool_calls'] / runs:>12.1f}{totals['cost_usd'] / runs:>10.5f}{totals['wall_s'] / runs:>9.2f}"
+                )
+        return "\n".join(lines)
+
+    def prometheus(self, prefix: str = "agent") -> str:
+        """All aggregates in the Prometheus text exposition format."""
+        counters = [
+            ("runs", "runs", "Agent runs"),
+            ("errors", "run_errors", "Agent runs that raised"),
+            ("prompt_tokens", "prompt_tokens", "Prompt tokens sent to the model"),
+            ("completion_tokens", "completion_tokens", "Completion tokens generated by the model"),
+            ("cached_tokens", "cached_tokens", "Prompt tokens served from the provider's prompt cache"),
+            ("llm_calls", "llm_calls", "LLM calls"),
+            ("tool_calls", "tool_calls", "Tool executions"),
+            ("cost_usd", "cost_usd", "Model cost in USD, where LiteLLM knows the price"),
+        ]
+        with self._lock:
+            items = sorted(self._totals.items())
+            buckets = {key: list(counts) for key, counts in self._buckets.items()}
+        out = []
+        for key, name, help_text in counters:
+            out += [f"# HELP {prefix}_{name}_total {help_text}.", f"# TYPE {prefix}_{name}_total counter"]
+            for (framework, model), totals in items:
+                out.append(f'{prefix}_{name}_total{{framework="{framework}",model="{model}"}} {totals[key]:g}')
+
+        metric = f"{prefix}_run_duration_seconds"
+        out += [f"# HELP {metric} Wall time per agent run.", f"# TYPE {metric} histogram"]
+        for (framework, model), totals in items:
+            labels = f'framework="{framework}",model="{model}"'
+            cumulative = 0
+            for bound, count in zip([*map(str, DURATION_BUCKETS), "+Inf"], buckets[(framework, model)]):
+                cumulative += count
+                out.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            out.append(f"{metric}_sum{{{labels}}} {totals['wall_s']:g}")
+            out.append(f"{metric}_count{{{labels}}} {totals['runs']:g}")
+        return "\n".join(out) + "\n"
+
+    def close(self) -> None:
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
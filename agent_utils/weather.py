@@ -0,0 +1,262 @@
+"""Weather data backend shared by every example's ``get_weather`` tool.
+
+The examples used to rebuild a ``mock_weather_db`` dict literal on every tool
+call. This module builds a normalised index once per process instead:
+
+* exact lookups are a single dict probe on the normalised city name,
+* aliases ("NYC", "Tokio", ...) resolve to their canonical city,
+* misses fall back to a trigram-filtered fuzzy match, so typos such as
+  "Londn" still find "London" without scanning every known city.
+
+The default data set is the three cities used throughout the examples. Point
+``WEATHER_DATA_PATH`` at a JSON or CSV file to load a larger one (see
+:func:`load_weather_index` for the formats).
+"""
+
+from __future__ import annotations
+
+import csv
+import difflib
+import functools
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Mapping
+
+DEFAULT_REPORTS = {
+    "New York": "The weather in New York is sunny with a temperature of 25°C.",
+    "London": "It's cloudy in London with a temperature of 15°C.",
+    "Tokyo": "Tokyo is experiencing light rain and a temperature of 18°C.",
+}
+
+DEFAULT_ALIASES = {
+    "NYC": "New York",
+    "New York City": "New York",
+    "Tokio": "Tokyo",
+}
+
+FALLBACK_REPORT = "The weather in {city} is sunny with a temperature of 20°C."
+ERROR_MESSAGE = "Sorry, I don't have weather information for '{city}'."
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+_PLACE = r"\bin\s+(?:the\s+)?([A-Z][\w'\-]*(?:\s+[A-Z][\w'\-]*)*)"
+_WEATHER_PLACE = re.compile(r"(?:weather|forecast|temperature)\b[^.?!]*?" + _PLACE)
+_CAPITALISED_PLACE = re.compile(_PLACE)
+_TRAILING_PLACE = re.compile(r"\bin\s+(?:the\s+)?([^\W\d_][\w' \-]*?)\s*[?.!]*\s*$", re.IGNORECASE)
+_NAME = r"[A-Z][\w'\-]*(?:\s+[A-Z][\w'\-]*)*"
+_CITY_LIST = re.compile(rf"\bin\s+({_NAME}(?:\s*(?:,|\band\b)\s*{_NAME})+)")
+_LIST_SEPARATOR = re.compile(r"\s*(?:,|\band\b)\s*")
+_SHORT_PROMPT_WORDS = 3
+_FUZZY_CACHE_SIZE = 65536
+_FUZZY_PROBE_GRAMS = 5
+
+
+def normalize_city(name: str) -> str:
+    """Normalise a city name for lookups.
+
+    Case, whitespace, punctuation and accents are ignored, so "São Paulo",
+    "sao paulo" and "Sao-Paulo" all map to ``"saopaulo"``.
+    """
+    if name.isascii():
+        key = name.lower().replace(" ", "")
+        return key if key.isalnum() else _NON_ALNUM.sub("", key)
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return _NON_ALNUM.sub("", name.casefold())
+
+
+def _trigrams(key: str) -> set[str]:
+    padded = f"^{key}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class WeatherIndex:
+    """Precomputed, normalised weather lookup table.
+
+    Build it once and share it; lookups are thread-safe.
+    """
+
+    def __init__(
+        self,
+        reports: Mapping[str, str],
+        aliases: Mapping[str, str] | None = None,
+        *,
+        fuzzy_cutoff: float = 0.8,
+    ) -> None:
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._reports: dict[str, str] = {}
+        for city, report in reports.items():
+            self._reports[normalize_city(city)] = report
+
+        self._aliases: dict[str, str] = {}
+        for alias, city in (aliases or {}).items():
+            target = normalize_city(city)
+            if target not in self._reports:
+                raise ValueError(f"Alias {alias!r} points to unknown city {city!r}")
+            self._aliases[normalize_city(alias)] = target
+
+        # The fuzzy structures are only needed on a miss, so they are built lazily.
+        self._lock = threading.Lock()
+        self._keys: list[str] | None = None
+        self._postings: dict[str, list[int]] | None = None
+        self._fuzzy_cache: dict[str, str | None] = {}
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+    def __contains__(self, city: object) -> bool:
+        return isinstance(city, str) and self.resolve(city) is not None
+
+    def resolve(self, city: str, *, fuzzy: bool = True) -> str | None:
+        """Return the normalised key ``city`` refers to, or ``None``."""
+        key = normalize_city(city)
+        if key in self._reports:
+            return key
+        alias = self._aliases.get(key)
+        if alias is not None:
+            return alias
+        if fuzzy and len(key) >= 3:
+            return self._fuzzy_resolve(key)
+        return None
+
+    def get(self, city: str, *, fuzzy: bool = True) -> str | None:
+        """Return the weather report for ``city``, or ``None`` if unknown."""
+        key = self.resolve(city, fuzzy=fuzzy)
+        return None if key is None else self._reports[key]
+
+    def _build_fuzzy_index(self) -> None:
+        keys = list(self._reports) + list(self._aliases)
+        postings: dict[str, list[int]] = {}
+        for i, key in enumerate(keys):
+            for gram in _trigrams(key):
+                postings.setdefault(gram, []).append(i)
+        self._keys, self._postings = keys, postings
+
+    def _fuzzy_resolve(self, key: str) -> str | None:
+        cached = self._fuzzy_cache.get(key, False)
+        if cached is not False:
+            return cached
+
+        if self._postings is None:
+            with self._lock:
+                if self._postings is None:
+                    self._build_fuzzy_index()
+
+        # A one-character typo changes at most three of the query's trigrams, so
+        # among the query's rarest trigrams the intended city must contain all
+        # but three. Only those (short) postings are scanned, never every key.
+        postings = self._postings
+        grams = sorted(_trigrams(key), key=lambda g: len(postings.get(g, ())))
+        probe = grams[:_FUZZY_PROBE_GRAMS]
+        counts: Counter[int] = Counter()
+        for gram in probe:
+            counts.update(postings.get(gram, ()))
+        required = max(1, len(probe) - 3)
+        candidates = [i for i, n in counts.items() if n >= required]
+
+        match = None
+        best = self.fuzzy_cutoff
+        matcher = difflib.SequenceMatcher(b=key, autojunk=False)
+        for i in candidates:
+            candidate = self._keys[i]
+            if 2 * min(len(candidate), len(key)) < best * (len(candidate) + len(key)):
+                continue
+            matcher.set_seq1(candidate)
+            if matcher.quick_ratio() < best:
+                continue
+            ratio = matcher.ratio()
+            if ratio > best or (ratio == best and match is None):
+                match, best = candidate, ratio
+        if match is not None:
+            match = self._aliases.get(match, match)
+
+        if len(self._fuzzy_cache) >= _FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.clear()
+        self._fuzzy_cache[key] = match
+        return match
+
+
+def _read_aliases(value: str | Iterable[str] | None) -> list[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [alias.strip() for alias in value.split("|") if alias.strip()]
+    return list(value)
+
+
+def load_weather_index(path: str | os.PathLike[str], **kwargs) -> WeatherIndex:
+    """Load a :class:`WeatherIndex` from a JSON or CSV file.
+
+    JSON files hold ``{"reports": {city: report}, "aliases": {alias: city}}``.
+    CSV files need ``city`` and ``report`` columns and may add an ``aliases``
+    column with ``|``-separated alternative names.
+    """
+    path = Path(path)
+    reports: dict[str, str] = {}
+    aliases: dict[str, str] = {}
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                reports[row["city"]] = row["report"]
+                for alias in _read_aliases(row.get("aliases")):
+                    aliases[alias] = row["city"]
+    else:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        reports.update(data["reports"])
+        aliases.update(data.get("aliases", {}))
+    return WeatherIndex(reports, aliases, **kwargs)
+
+
+@functools.cache
+def get_weather_index() -> WeatherIndex:
+    """Return the process-wide index, loading it on first use."""
+    path = os.getenv("WEATHER_DATA_PATH")
+    if path:
+        return load_weather_index(path)
+    return WeatherIndex(DEFAULT_REPORTS, DEFAULT_ALIASES)
+
+
+def weather_report(city: str) -> str:
+    """Report for ``city``; unknown cities get a generic sunny forecast."""
+    report = get_weather_index().get(city)
+    return report if report is not None else FALLBACK_REPORT.format(city=city)
+
+
+def weather_lookup(city: str) -> dict:
+    """Status dict for ``city`` in the shape the ADK-style examples return."""
+    report = get_weather_index().get(city)
+    if report is None:
+        return {"status": "error", "error_message": ERROR_MESSAGE.format(city=city)}
+    return {"status": "success", "report": report}
+
+
+def extract_city(text: str) -> str | None:
+    """Best-effort guess of the city a weather prompt asks about.
+
+    Handles "What's the weather in New York?"-style questions and bare city
+    names such as "London"; returns ``None`` when no city can be spotted.
+    """
+    for pattern in (_WEATHER_PLACE, _CAPITALISED_PLACE, _TRAILING_PLACE):
+        match = pattern.search(text)
+        if match:
+            return match.group(1).strip()
+    words = text.strip(" \t\n?.!").split()
+    if 0 < len(words) <= _SHORT_PROMPT_WORDS:
+        return " ".join(words)
+    return None
+
+
+def extract_cities(text: str) -> list[str]:
+    """Every city a weather prompt asks about: "in London, Paris and Tokyo" yields three.
+
+    Falls back to :func:`extract_city`; empty when no city can be spotted.
+    """
+    match = _CITY_LIST.search(text)
+    if match:
+        return [city for city in _LIST_SEPARATOR.split(match.group(1)) if city]
+    city = extract_city(text)
+    return [city] if city else []
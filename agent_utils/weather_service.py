@@ -0,0 +1,231 @@
+"""Local stand-in for a remote weather API, with sync and async clients for it.
+
+The ``get_weather`` tools normally answer from the in-process index
+(:mod:`agent_utils.weather`). A real weather backend is an HTTP call that takes
+tens to hundreds of milliseconds, and a synchronous tool making that call
+inside an async agent blocks its event loop for the whole round trip. Start the
+stub service and point the tools at it to see the difference::
+
+    python -m agent_utils.weather_service --port 8081 --latency-ms 200
+    export WEATHER_SERVICE_URL=http://127.0.0.1:8081
+
+* :func:`fetch_weather` (and :func:`fetch_weather_report`) is the blocking
+  client used by synchronous tools,
+* :func:`afetch_weather` (and :func:`afetch_weather_report`) is the async client for async-native frameworks
+  (Microsoft Agent Framework, AgentScope): one keep-alive ``httpx.AsyncClient``
+  per event loop, and at most ``MAX_WEATHER_CONCURRENCY``
+  (default 16) lookups in flight per event loop, so an agent that asks for
+  many cities at once does not flood the backend.
+
+Without ``WEATHER_SERVICE_URL`` both answer from the local index.
+
+With ``TOOL_PREFETCH=1``, :func:`speculate_weather` starts the lookup for the
+city in a prompt before the agent runs, and both clients answer from it when
+the model asks for that city (see :mod:`agent_utils.prefetch`).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Iterator
+from urllib.parse import parse_qs, urlparse
+
+from agent_utils.prefetch import Prefetcher, prefetch_enabled
+from agent_utils.weather import FALLBACK_REPORT, weather_lookup
+
+if TYPE_CHECKING:
+    import httpx
+
+MAX_WEATHER_CONCURRENCY = int(os.getenv("MAX_WEATHER_CONCURRENCY", "16"))
+
+
+# Service
+
+
+class _WeatherHandler(BaseHTTPRequestHandler):
+    server: "WeatherService"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # keep-alive replies would wait for the client's delayed ACK
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            self._send(200, self.server.stats())
+            return
+        if url.path != "/weather":
+            self._send(404, {"error": "not found"})
+            return
+        city = parse_qs(url.query).get("city", [""])[0]
+        with self.server.in_flight():
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            self._send(200, weather_lookup(city))
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class WeatherService(ThreadingHTTPServer):
+    """``GET /weather?city=...`` after ``latency`` seconds; ``GET /stats`` counts lookups and peak concurrency."""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        super().__init__((host, port), _WeatherHandler)
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._stats: Counter = Counter()
+        self._active = 0
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @contextmanager
+    def in_flight(self) -> Iterator[None]:
+        with self._lock:
+            self._active += 1
+            self._stats["lookups"] += 1
+            self._stats["peak_concurrency"] = max(self._stats["peak_concurrency"], self._active)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def __enter__(self) -> "WeatherService":
+        self._thread = threading.Thread(target=self.serve_forever, name="weather-service", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+# Clients
+
+
+def service_url() -> str | None:
+    return os.getenv("WEATHER_SERVICE_URL")
+
+
+def _report(city: str, result: dict) -> str:
+    # Same answer as agent_utils.weather.weather_report: unknown cities get a generic forecast
+    return result["report"] if result.get("status") == "success" else FALLBACK_REPORT.format(city=city)
+
+
+def fetch_weather(city: str) -> dict:
+    """Blocking lookup: the weather service if configured, else the local index."""
+    return weather_prefetcher.get(city)
+
+
+def _fetch_weather(city: str) -> dict:
+    url = service_url()
+    if not url:
+        return weather_lookup(city)
+    from agent_utils.http_pool import shared_client
+
+    response = shared_client().get(f"{url}/weather", params={"city": city})
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_weather_report(city: str) -> str:
+    return _report(city, fetch_weather(city))
+
+
+# Per event loop: a keep-alive client and the concurrency limit. asyncio
+# primitives and pooled connections must not be shared across loops.
+_loop_state: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _for_loop() -> tuple["httpx.AsyncClient", asyncio.Semaphore]:
+    loop = asyncio.get_running_loop()
+    state = _loop_state.get(loop)
+    if state is None:
+        from agent_utils.http_pool import create_async_client
+
+        state = _loop_state[loop] = (create_async_client(), asyncio.Semaphore(MAX_WEATHER_CONCURRENCY))
+    return state
+
+
+async def afetch_weather(city: str) -> dict:
+    """Non-blocking lookup with at most ``MAX_WEATHER_CONCURRENCY`` requests in flight per event loop."""
+    future = weather_prefetcher.claim(city)
+    if future is not None:
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception:  # noqa: BLE001 - the live lookup reports the error
+            pass
+    url = service_url()
+    if not url:
+        return weather_lookup(city)
+    client, slots = _for_loop()
+    async with slots:
+        response = await client.get(f"{url}/weather", params={"city": city})
+    response.raise_for_status()
+    return response.json()
+
+
+async def afetch_weather_report(city: str) -> str:
+    return _report(city, await afetch_weather(city))
+
+
+# Speculative lookups
+
+#: Lookups started from prompts, claimed by :func:`fetch_weather` and :func:`afetch_weather`
+weather_prefetcher: Prefetcher[dict] = Prefetcher(_fetch_weather, max_workers=MAX_WEATHER_CONCURRENCY)
+
+
+def speculate_weather(prompt: str) -> str | None:
+    """With ``TOOL_PREFETCH`` set, start looking up the city ``prompt`` asks about; returns the city."""
+    if not prefetch_enabled():
+        return None
+    return weather_prefetcher.start(prompt)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local stub of a remote weather API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="delay of each lookup")
+    args = parser.parse_args()
+
+    service = WeatherService(args.host, args.port, args.latency_ms / 1000)
+    print(f"Weather service listening on {service.url}/weather?city=...")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,120 @@
 # pip install agentscope
 import os
-import litellm
 from dotenv import load_dotenv
-from agentscope.model import OpenAIChatModel
-from agentscope.tool import ToolResponse, Toolkit
-from agentscope.message import TextBlock
-from agentscope.agent import ReActAgent
-from agentscope.formatter import DashScopeChatFormatter
-from agentscope.memory import InMemoryMemory
-from agentscope.message import Msg
+from agent_utils.cache import install_from_env as install_cache_from_env
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather_service import afetch_weather_report
 import asyncio
 
-# set env variable
-litellm.use_litellm_proxy = True
-load_dotenv()
+# AgentScope is imported when the agent is built, not when this module is
+# loaded. It talks to the proxy through the OpenAI client, so LiteLLM is not imported.
 
-api_base = os.getenv("PROXY_BASE_URL")
-api_key = os.getenv("LITELLM_PROXY_API_KEY")
 
-# tool definition
-def get_weather(city: str) -> ToolResponse:
+# tool definition. It is async, so lookups against a remote weather service
+# (WEATHER_SERVICE_URL, see PERFORMANCE.md) do not block the event loop
+@traced_tool
+async def get_weather(city: str):
     """Retrieves the current weather report for a specified city.
     Args:
         city (str): The name of the city to retrieve weather information for.
             Examples: "New York", "London", "Tokyo".
     """
-    city_normalized = city.lower().replace(" ", "")
-
-    mock_weather_db = {
-        "newyork": "The weather in New York is sunny with a temperature of 25°C.",
-        "london": "It's cloudy in London with a temperature of 15°C.",
-        "tokyo": "Tokyo is experiencing light rain and a temperature of 18°C.",
-    }
-
-    if city_normalized in mock_weather_db:
-        return ToolResponse(content=[
-            TextBlock(type="text",
-                      text=mock_weather_db[city_normalized])
-        ])
-    else:
-        return ToolResponse(content=[
-            TextBlock(type="text",
-                      text=f"The weather in {city} is sunny with a temperature of 20°C.")
-        ])
-# Register the tool function in a toolkit
-toolkit = Toolkit()
-toolkit.register_tool_function(get_weather)
-
-# model setup
-sap_model = OpenAIChatModel(model_name='sap/gpt-4o',
-                        api_key=api_key,
-                        client_args={"base_url": api_base},
-                        stream=False)
-
-agent = ReActAgent(
-        name="weather agent",
-        sys_prompt="You are a helpful weather assistant. "
-                "When the user asks for the weather in a specific city, "
-                "use the 'get_weather' tool to find the information. "
-                "If the tool returns an error, inform the user politely. "
-                "If the tool is successful, write a couple of sentences for a "
-                "TV weather report in the city including a small joke",
-        model=sap_model,
-        formatter=DashScopeChatFormatter(),
-        toolkit=toolkit,
-        memory=InMemoryMemory(),
-    )
-
-msg = Msg(
-        name="user",
-        content="What is the weather like in Tbilisi?",
-        role="user",
-    )
-
-async def run_conversation():
-    result = await agent(msg)
+    from agentscope.message import TextBlock
+    from agentscope.tool import ToolResponse
+
+    return ToolResponse(content=[
+        TextBlock(type="text", text=await afetch_weather_report(city))
+    ])
+
+
+def build_agent(
+    model: str = "sap/gpt-4o",
+    api_base: str | None = None,
+    api_key: str | None = None,
+    tool=get_weather,  # benchmarks swap in a blocking version to compare
+):
+    from agentscope.model import OpenAIChatModel
+    from agentscope.tool import Toolkit
+    from agentscope.agent import ReActAgent
+    from agentscope.formatter import DashScopeChatFormatter
+    from agentscope.memory import InMemoryMemory
+    from agent_utils.http_pool import shared_async_client
+    from agent_utils.agentscope_memory import memory_from_env
+
+    api_base = api_base or os.getenv("PROXY_BASE_URL")
+    api_key = api_key or os.getenv("LITELLM_PROXY_API_KEY")
+
+    # Register the tool function in a toolkit
+    toolkit = Toolkit()
+    toolkit.register_tool_function(tool, func_name="get_weather")
+
+    # model setup
+    sap_model = OpenAIChatModel(model_name=model,
+                            api_key=api_key,
+                            # pooled keep-alive connections to the proxy
+                            client_args={"base_url": api_base, "http_client": shared_async_client()},
+                            stream=streaming_enabled())
+
+    return ReActAgent(
+            name="weather agent",
+            sys_prompt="You are a helpful weather assistant. "
+                    "When the user asks for the weather in a specific city, "
+                    "use the 'get_weather' tool to find the information. "
+                    "If the tool returns an error, inform the user politely. "
+                    "If the tool is successful, write a couple of sentences for a "
+                    "TV weather report in the city including a small joke",
+            model=sap_model,
+            formatter=DashScopeChatFormatter(),
+            toolkit=toolkit,
+            # HISTORY_MAX_TOKENS keeps the newest turns within that many tokens in
+            # memory and spills older ones to disk (see PERFORMANCE.md)
+            memory=memory_from_env() or InMemoryMemory(),
+            parallel_tool_calls=True,  # the tool calls of one reply run concurrently
+        )
+
+
+def user_message():
+    from agentscope.message import Msg
+
+    return Msg(
+            name="user",
+            content="What is the weather like in Tbilisi?",
+            role="user",
+        )
+
+async def run_conversation(agent):
+    result = await agent(user_message())
     print(result)
 
-asyncio.run(run_conversation())
+async def stream_conversation(agent):
+    """Prints tokens and tool calls as they arrive, followed by TTFT and inter-token latency."""
+    from agentscope.pipeline import stream_printing_messages
+
+    timer = StreamTimer()
+    printed = {}  # message id -> number of characters already printed
+    agent.set_console_output_enabled(False)
+    # Streamed chunks are cumulative: every chunk holds the whole message so far
+    async for chunk, last in stream_printing_messages([agent], agent(user_message())):
+        for block in chunk.get_content_blocks():
+            if block["type"] == "tool_use" and last:
+                timer.event(f"tool call: {block['name']}")
+            elif block["type"] == "tool_result":
+                timer.event(f"tool result: {block['output'][0]['text']}")
+        text = chunk.get_text_content() or ""
+        timer.token(text[printed.get(chunk.id, 0):])
+        printed[chunk.id] = len(text)
+    timer.finish()
+
+
+def main():
+    load_dotenv()
+    setup_from_env("agentscope")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    install_cache_from_env()  # COMPLETION_CACHE=memory: repeated requests skip the proxy, see PERFORMANCE.md
+    agent = build_agent()
+    with agent_span("agentscope", "sap/gpt-4o"):
+        asyncio.run(stream_conversation(agent) if streaming_enabled() else run_conversation(agent))
+
+
+if __name__ == "__main__":
+    main()
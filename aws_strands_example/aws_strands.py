@@ -1,36 +1,64 @@
-from strands.models.litellm import LiteLLMModel
-from strands import Agent
-from strands.tools import tool
+import asyncio
+
 from dotenv import load_dotenv
+from agent_utils.ratelimit import install_from_env as install_limiter_from_env
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather import weather_report
 
-load_dotenv()
+# Strands is imported when the agent is built, not when this module is loaded
 
 
-@tool
+@traced_tool
 def get_weather(city: str):
-    city_normalized = city.lower().replace(" ", "")
+    return weather_report(city)
+
+
+def build_agent(model: str = "sap/gpt-5"):
+    from strands.models.litellm import LiteLLMModel
+    from strands import Agent
+    from strands.tools import tool
+    from strands.handlers.callback_handler import PrintingCallbackHandler
 
-    mock_weather_db = {
-        "newyork": "The weather in New York is sunny with a temperature of 25°C.",
-        "london": "It's cloudy in London with a temperature of 15°C.",
-        "tokyo": "Tokyo is experiencing light rain and a temperature of 18°C.",
-    }
+    return Agent(
+        system_prompt="You are a helpful weather assistant. "
+                "When the user asks about a specific city, "
+                "use the 'get_weather' tool to find the weather information. "
+                "Provide the TV weather report in two sentences including a small joke.",
+        model=LiteLLMModel(model_id=model),
+        tools=[tool(get_weather)],
+        # In streaming mode the events are printed by stream_response() instead
+        callback_handler=None if streaming_enabled() else PrintingCallbackHandler(),
+    )
 
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return f"The weather in {city} is sunny with a temperature of 20°C."
+async def stream_response(agent, prompt: str):
+    """Prints tokens and tool calls as they arrive, followed by TTFT and inter-token latency."""
+    timer = StreamTimer()
+    async for event in agent.stream_async(prompt):
+        if "data" in event:
+            timer.token(event["data"])
+        elif "message" in event:
+            for block in event["message"]["content"]:
+                if "toolUse" in block:
+                    timer.event(f"tool call: {block['toolUse']['name']}")
+                elif "toolResult" in block:
+                    timer.event(f"tool result: {block['toolResult']['content'][0].get('text', '')}")
+    timer.finish()
 
 
-agent = Agent(
-    system_prompt="You are a helpful weather assistant. "
-            "When the user asks about a specific city, "
-            "use the 'get_weather' tool to find the weather information. "
-            "Provide the TV weather report in two sentences including a small joke.",
-    model=LiteLLMModel(model_id="sap/gpt-5"),
-    tools=[get_weather],
-)
+def main():
+    load_dotenv()
+    setup_from_env("strands")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    agent = build_agent()
+    # RATE_LIMIT_RPM / RATE_LIMIT_TPM pace agents fanned out over many prompts
+    install_limiter_from_env()
+    with agent_span("strands", "sap/gpt-5"):
+        if streaming_enabled():
+            asyncio.run(stream_response(agent, "london"))
+        else:
+            response = agent("london")
+            print(response)
 
 
-response = agent("london")
-print(response)
+if __name__ == "__main__":
+    main()
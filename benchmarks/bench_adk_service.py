@@ -0,0 +1,118 @@
+"""Google ADK: per-request Runner/session vs the pooled ``AgentService``.
+
+Simulates many users holding multi-turn weather conversations against the
+offline stub proxy and compares:
+
+* ``per-request``: a new session service, Runner and session for every
+  request, as ``google_adk.py`` used to do,
+* ``service``: one long-lived ``AgentService`` with a session per user,
+* ``service+compaction``: the same with ``max_history_turns`` set.
+
+For each mode it reports throughput, latency, the average prompt size sent to
+the model (as counted by the stub) and the session pool statistics:
+
+    python benchmarks/bench_adk_service.py --users 50 --turns 8 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from agent_utils.adk_service import AgentService
+from agent_utils.frameworks import load_example
+from agent_utils.stats import LatencyStats
+from agent_utils.stub_proxy import StubConfig, StubProxy
+
+CITIES = ["London", "Tokyo", "New York", "Paris", "Tbilisi", "Berlin", "Madrid", "Oslo"]
+APP_NAME = "weather_benchmark_app"
+
+
+def build_agent(model: str):
+    # The agent of google_adk.py, with the model under test
+    return load_example("google_adk_example/google_adk.py").build_agent(model)
+
+
+async def per_request_call(agent, query: str, user_id: str) -> str:
+    """The old pattern: everything is created for a single request."""
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+
+    session_service = InMemorySessionService()
+    session = await session_service.create_session(app_name=APP_NAME, user_id=user_id)
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+    content = types.Content(role="user", parts=[types.Part(text=query)])
+    answer = ""
+    async for event in runner.run_async(user_id=user_id, session_id=session.id, new_message=content):
+        if event.is_final_response() and event.content and event.content.parts:
+            answer = event.content.parts[0].text or ""
+    return answer
+
+
+async def run_mode(mode: str, agent, args, proxy: StubProxy) -> dict:
+    service = None
+    if mode != "per-request":
+        history = args.history_turns if mode == "service+compaction" else None
+        service = AgentService(agent, app_name=APP_NAME, max_history_turns=history, max_concurrency=args.concurrency)
+        call = service.call_agent_async
+    else:
+        call = lambda query, user_id: per_request_call(agent, query, user_id)  # noqa: E731
+
+    await call("What is the weather like in London?", "warm-up")
+    proxy.reset_stats()
+
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def conversation(user: int):
+        # Turns of one user are sequential, users run concurrently
+        for turn in range(args.turns):
+            query = f"What is the weather like in {CITIES[(user + turn) % len(CITIES)]}?"
+            async with slots:
+                start = time.perf_counter()
+                await call(query, f"user_{user}")
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(conversation(user) for user in range(args.users)))
+    wall = time.perf_counter() - start
+
+    stats = proxy.stats()
+    result = {
+        "mode": mode,
+        "wall_s": wall,
+        "throughput": len(latencies) / wall,
+        "latency": LatencyStats.from_samples(latencies),
+        "prompt_tokens_per_call": stats["prompt_tokens"] / max(stats["completions"], 1),
+    }
+    if service is not None:
+        result["pool"] = service.pool_stats()
+        await service.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=6, help="requests per user")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--history-turns", type=int, default=2, help="max_history_turns for the compaction mode")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="simulated model latency per LLM call")
+    parser.add_argument("--model", default="sap/gpt-4o")
+    parser.add_argument("--modes", default="per-request,service,service+compaction", help="comma-separated subset to run")
+    args = parser.parse_args()
+
+    with StubProxy(config=StubConfig(latency=args.latency_ms / 1000)) as proxy:
+        os.environ.update(LITELLM_PROXY_API_BASE=proxy.url, LITELLM_PROXY_API_KEY="sk-stub", USE_LITELLM_PROXY="True")
+        agent = build_agent(args.model)
+        for mode in args.modes.split(","):
+            result = asyncio.run(run_mode(mode, agent, args, proxy))
+            print(f"{mode}: {result['throughput']:.1f} requests/s, latency {result['latency']}")
+            print(f"  prompt tokens per LLM call: {result['prompt_tokens_per_call']:.0f}")
+            if "pool" in result:
+                print(f"  pool: {result['pool']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""What a SQLite checkpoint saves when a long LangGraph batch crashes halfway.
+
+Runs ``langgraph_example/langgraph_batch.py`` over ``--queries`` prompts
+against the offline stub proxy and kills it (SIGKILL, no clean-up) once
+``--crash-at`` of the results are written. Then it finishes the job twice:
+
+* resumed: the same command with ``--checkpoint``; finished queries are
+  skipped and interrupted ones continue from their last finished task,
+* restarted: without checkpoints, the only option is to run everything again.
+
+::
+
+    python benchmarks/bench_checkpoint.py --queries 10000
+    python benchmarks/bench_checkpoint.py --queries 1000 --crash-at 0.8 --latency-ms 200
+
+Reports LLM calls, tokens and wall time of each run, as counted by the stub.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from agent_utils.stub_proxy import StubConfig, StubProxy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH = os.path.join(ROOT, "langgraph_example", "langgraph_batch.py")
+
+
+def lines(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def run(label: str, command: list[str], env: dict, proxy: StubProxy, kill_at: int | None = None, output: str = "") -> dict:
+    """Run the batch (killing it once ``output`` has ``kill_at`` lines) and report what the stub served."""
+    proxy.reset_stats()
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    if kill_at is not None:
+        while process.poll() is None and lines(output) < kill_at:
+            time.sleep(0.05)
+        process.kill()
+    summary = process.communicate()[0]
+    wall = time.perf_counter() - start
+    stats = proxy.stats()
+    result = {
+        "run": label,
+        "wall_s": wall,
+        "llm_calls": stats.get("completions", 0),
+        "prompt_tokens": stats.get("prompt_tokens", 0),
+        "completion_tokens": stats.get("completion_tokens", 0),
+        "results": lines(output),
+    }
+    print(
+        f"{label:<10} {wall:7.1f} s  {result['llm_calls']:>6} LLM calls  "
+        f"{result['prompt_tokens'] + result['completion_tokens']:>9} tokens"
+    )
+    for line in summary.splitlines():
+        if line.startswith(("Checkpoints:", "Queries:")):
+            print(f"{'':<11}{line}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--crash-at", type=float, default=0.5, help="share of results written before the crash")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="stub latency per model call")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    prompts = os.path.join(workdir, "prompts.jsonl")
+    with open(prompts, "w", encoding="utf-8") as f:
+        for i in range(args.queries):
+            f.write(json.dumps({"id": i, "city": f"Testville{i}"}) + "\n")
+    checkpoint = os.path.join(workdir, "checkpoints.sqlite")
+
+    with StubProxy(config=StubConfig(latency=args.latency_ms / 1000)) as proxy:
+        env = {
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.getenv("PYTHONPATH")])),
+            "USE_LITELLM_PROXY": "True",
+            "LITELLM_PROXY_API_BASE": proxy.url,
+            "LITELLM_PROXY_API_KEY": "sk-stub",
+        }
+        env.pop("LANGGRAPH_CHECKPOINT_DB", None)
+
+        def batch(output: str, *extra: str) -> list[str]:
+            return [sys.executable, BATCH, prompts, "--output", os.path.join(workdir, output),
+                    "--concurrency", str(args.concurrency), *extra]
+
+        print(f"{args.queries} queries, {args.concurrency} in flight, {args.latency_ms:.0f} ms per model call\n")
+        crashed = run("crashed", batch("out.jsonl", "--checkpoint", checkpoint), env, proxy,
+                      kill_at=int(args.queries * args.crash_at), output=os.path.join(workdir, "out.jsonl"))
+        resumed = run("resumed", batch("out.jsonl", "--checkpoint", checkpoint), env, proxy,
+                      output=os.path.join(workdir, "out.jsonl"))
+        restarted = run("restarted", batch("restart.jsonl"), env, proxy, output=os.path.join(workdir, "restart.jsonl"))
+
+    size = sum(os.path.getsize(os.path.join(workdir, name)) for name in os.listdir(workdir) if name.startswith("checkpoints"))
+    print(f"\n{resumed['results']} results after resuming, checkpoint database {size / 2**20:.0f} MiB")
+    for key, unit in (("llm_calls", "LLM calls"), ("prompt_tokens", "prompt tokens"), ("wall_s", "s wall time")):
+        saved = restarted[key] - resumed[key]
+        print(f"Resuming saved {saved:,.0f} {unit} ({saved / restarted[key]:.0%}) over restarting")
+    lost = crashed["llm_calls"] + resumed["llm_calls"] - restarted["llm_calls"]
+    print(f"LLM calls repeated because of the crash: {lost}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Event-loop stalls of blocking vs async weather tools in async-native agents.
+
+Runs the Microsoft Agent Framework and AgentScope agents against the offline
+stub proxy and a local weather service (:mod:`agent_utils.weather_service`)
+that takes ``--weather-latency-ms`` per lookup. Each prompt asks for several
+cities, so the model requests several ``get_weather`` calls in one reply.
+
+A heartbeat coroutine on the agent's event loop wakes up every
+``--tick-ms`` and records how late it was. With the blocking tool every
+lookup freezes the loop (nothing else, not even other lookups, can run);
+with the async tool the loop stays responsive and the lookups overlap::
+
+    python benchmarks/bench_event_loop.py --runs 10 --cities 8
+    python benchmarks/bench_event_loop.py --frameworks agentscope --weather-latency-ms 300
+
+Reported per framework and tool: the run latency, the total and longest stall
+of the loop and the peak number of lookups the weather service saw at once.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+from agent_utils.frameworks import get_adapter
+from agent_utils.stats import LatencyStats
+from agent_utils.stub_proxy import StubConfig, StubProxy
+from agent_utils.weather_service import WeatherService
+
+CITIES = ["London", "Paris", "Tokyo", "Oslo", "Rome", "Lima", "Cairo", "Delhi", "Sydney", "Toronto", "Berlin", "Madrid"]
+
+
+async def heartbeat(tick: float, lags: list[float], done: asyncio.Event) -> None:
+    """Sleep ``tick`` seconds in a loop and record how much later than that each wake-up came."""
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(max(time.perf_counter() - start - tick, 0.0))
+
+
+async def watched(adapter, prompt: str, tick: float) -> tuple[float, list[float]]:
+    lags: list[float] = []
+    done = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(tick, lags, done))
+    start = time.perf_counter()
+    await adapter.arun(prompt)
+    latency = time.perf_counter() - start
+    done.set()
+    await monitor
+    return latency, lags
+
+
+def measure(framework: str, async_tools: bool, prompt: str, args, proxy: StubProxy, service: WeatherService) -> dict:
+    adapter = get_adapter(framework)(model=args.model, api_base=proxy.url, api_key="sk-stub")
+    adapter.async_tools = async_tools
+    adapter.setup()
+    with contextlib.redirect_stdout(io.StringIO()):  # AgentScope prints every message
+        adapter.loop.run_until_complete(watched(adapter, prompt, args.tick_ms / 1000))  # warm-up
+        service.reset_stats()
+        latencies, lags = [], []
+        for _ in range(args.runs):
+            seconds, run_lags = adapter.loop.run_until_complete(watched(adapter, prompt, args.tick_ms / 1000))
+            latencies.append(seconds)
+            lags.extend(run_lags)
+    adapter.close()
+    return {
+        "latency": LatencyStats.from_samples(latencies),
+        "stall_s": sum(lags) / args.runs,
+        "max_stall_s": max(lags, default=0.0),
+        "peak": service.stats().get("peak_concurrency", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frameworks", default="microsoft_agent,agentscope", help="comma-separated async-native frameworks")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--cities", type=int, default=8, help="cities per prompt (tool calls per reply)")
+    parser.add_argument("--weather-latency-ms", type=float, default=100.0, help="latency of each weather lookup")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="stub LLM latency per request")
+    parser.add_argument("--tick-ms", type=float, default=5.0, help="heartbeat interval")
+    parser.add_argument("--model", default="sap/gpt-4o")
+    args = parser.parse_args()
+
+    cities = [CITIES[i % len(CITIES)] for i in range(args.cities)]
+    prompt = f"What's the weather in {', '.join(cities[:-1])} and {cities[-1]}?" if len(cities) > 1 else f"What's the weather in {cities[0]}?"
+    print(f"{args.runs} runs of {prompt!r}, {args.weather_latency_ms:.0f} ms per lookup\n")
+    print(f"{'framework':<16} {'tool':<6} {'p50 ms':>8} {'stall ms/run':>13} {'max stall ms':>13} {'peak lookups':>13}")
+    with StubProxy(config=StubConfig(latency=args.latency_ms / 1000)) as proxy, \
+            WeatherService(latency=args.weather_latency_ms / 1000) as service:
+        os.environ["WEATHER_SERVICE_URL"] = service.url
+        for framework in args.frameworks.split(","):
+            for async_tools in (False, True):
+                result = measure(framework, async_tools, prompt, args, proxy, service)
+                print(
+                    f"{framework:<16} {'async' if async_tools else 'sync':<6} {result['latency'].p50 * 1000:>8.0f}"
+                    f" {result['stall_s'] * 1000:>13.0f} {result['max_stall_s'] * 1000:>13.0f} {result['peak']:>13}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""LLM calls and latency per query: the agent loop vs the single-completion fast path.
+
+Runs the LlamaIndex ``ReActAgent`` and the smolagents ``CodeAgent`` against the
+offline stub proxy (``--latency-ms`` per model call), first as they are, then
+with ``TOOL_FAST_PATH=1`` (:mod:`agent_utils.fastpath`): the weather is looked
+up before the model is called and the answer takes one completion. Every
+``--fallback-every``-th prompt names no city, so it takes the fallback to the
+agent loop::
+
+    python benchmarks/bench_fastpath.py --queries 40
+    python benchmarks/bench_fastpath.py --frameworks llamaindex --latency-ms 800
+
+Reports, per framework and path, the LLM calls, prompt tokens and latency per
+query and how many queries the fast path answered.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+
+from agent_utils.cli import answer, build_adapter
+from agent_utils.stats import LatencyStats
+from agent_utils.stub_proxy import StubConfig, StubProxy
+
+
+def prompts(count: int, fallback_every: int) -> list[str]:
+    return [
+        "Tell me something nice about today's weather, please."
+        if fallback_every and i % fallback_every == fallback_every - 1
+        else f"What's the weather in Testville{i}?"
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frameworks", default="llamaindex,smolagents")
+    parser.add_argument("--queries", type=int, default=40)
+    parser.add_argument("--fallback-every", type=int, default=10, help="every n-th prompt names no city (0: none)")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="stub latency per model call")
+    parser.add_argument("--model", default="sap/gpt-4o")
+    args = parser.parse_args()
+
+    queries = prompts(args.queries, args.fallback_every)
+    with StubProxy(config=StubConfig(latency=args.latency_ms / 1000)) as proxy:
+        print(f"{len(queries)} queries, {args.latency_ms:.0f} ms per model call\n")
+        print(f"{'framework':<12}{'path':<8}{'LLM calls':>10}{'prompt tok':>12}  latency")
+        for framework in args.frameworks.split(","):
+            for path in ("loop", "fast"):
+                os.environ["TOOL_FAST_PATH"] = "1" if path == "fast" else ""
+                adapter = build_adapter(framework, args.model, proxy.url, "sk-stub")
+                with contextlib.redirect_stdout(io.StringIO()):  # smolagents prints every step
+                    results = [answer(adapter, i, prompt) for i, prompt in enumerate(queries)]
+                adapter.close()
+                usage = [result["usage"] for result in results]
+                calls = sum(u["llm_calls"] for u in usage) / len(usage)
+                tokens = sum(u["prompt_tokens"] for u in usage) / len(usage)
+                latency = LatencyStats.from_samples(result["latency_s"] for result in results)
+                errors = sum("error" in result for result in results)
+                print(f"{framework:<12}{path:<8}{calls:>10.2f}{tokens:>12.0f}  {latency} ({errors} errors)")
+                fast = getattr(adapter, "_fast", None)
+                if fast is not None:
+                    print(f"{'':<20}fast path: {fast.stats.answered} answered, {fast.stats.fallbacks} fell back to the loop")
+        os.environ.pop("TOOL_FAST_PATH")
+
+
+if __name__ == "__main__":
+    main()
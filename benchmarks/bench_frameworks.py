@@ -0,0 +1,178 @@
+"""Cross-framework agent overhead benchmark.
+
+Drives every example's weather agent through the same task against the offline
+stub proxy (``agent_utils.stub_proxy``), each framework in a fresh process, and
+reports per framework:
+
+* import time of the framework stack and agent setup time,
+* wall time per task, and framework-side time (wall time minus the stub's
+  simulated model latency),
+* LLM round-trips per task, as counted by the stub,
+* prompt/completion tokens and tool calls per task, as counted by
+  ``agent_utils.usage``,
+* peak RSS of the worker process.
+
+Results are printed as a table and can be written as JSON or CSV for
+regression tracking:
+
+    python benchmarks/bench_frameworks.py --runs 20 --output results.json
+    python benchmarks/bench_frameworks.py --frameworks langgraph,crewai --latency-ms 100 --csv results.csv
+"""
+
+import argparse
+import csv
+import importlib
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+from agent_utils.frameworks import ADAPTERS, get_adapter
+from agent_utils.stats import LatencyStats
+from agent_utils.stub_proxy import StubConfig, StubProxy
+from agent_utils.usage import UsageRecorder
+
+PROMPT = "What's the weather like in London?"
+COLUMNS = [
+    "framework",
+    "status",
+    "import_s",
+    "setup_s",
+    "wall_p50_s",
+    "wall_p95_s",
+    "framework_p50_s",
+    "llm_calls_per_task",
+    "prompt_tokens_per_task",
+    "completion_tokens_per_task",
+    "tool_calls_per_task",
+    "peak_rss_mb",
+]
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_child(name: str, url: str, model: str, runs: int) -> dict:
+    """Benchmark one framework in the current (fresh) process."""
+    adapter_cls = get_adapter(name)
+    result = {"framework": name}
+
+    start = time.perf_counter()
+    try:
+        for module in adapter_cls.modules:
+            importlib.import_module(module)
+    except ImportError as e:
+        return {**result, "status": f"not installed ({e.name})"}
+    result["import_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    adapter = adapter_cls(model=model, api_base=url, api_key="sk-stub")
+    adapter.setup()
+    result["setup_s"] = time.perf_counter() - start
+
+    from agent_utils.http_pool import shared_async_client, shared_client
+
+    recorder = UsageRecorder()
+    recorder.instrument_client(shared_client())
+    recorder.instrument_client(shared_async_client())
+    if adapter.library_mode:
+        recorder.install_litellm()
+
+    adapter.run(PROMPT)  # warm-up, excluded from the timings
+    wall_times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        with recorder.run(name, model):
+            adapter.run(PROMPT)
+        wall_times.append(time.perf_counter() - start)
+    adapter.close()
+
+    result.update(status="ok", wall_times=wall_times, peak_rss_mb=peak_rss_mb())
+    for field in ("prompt_tokens", "completion_tokens", "tool_calls"):
+        result[f"{field}_per_task"] = sum(getattr(r, field) for r in recorder.records) / runs
+    return result
+
+
+def benchmark(name: str, proxy: StubProxy, args) -> dict:
+    proxy.reset_stats()
+    cmd = [sys.executable, __file__, "--child", name, "--url", proxy.url, "--model", args.model, "--runs", str(args.runs)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=args.timeout)
+    if proc.returncode != 0:
+        error = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+        return {"framework": name, "status": f"failed: {error}"}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if result["status"] != "ok":
+        return result
+
+    tasks = args.runs + 1  # including the warm-up run
+    llm_calls = proxy.stats().get("completions", 0) / tasks
+    wall = LatencyStats.from_samples(result.pop("wall_times"))
+    framework = max(wall.p50 - llm_calls * proxy.config.latency, 0.0)
+    result.update(
+        wall_p50_s=wall.p50,
+        wall_p95_s=wall.p95,
+        framework_p50_s=framework,
+        llm_calls_per_task=llm_calls,
+    )
+    return result
+
+
+def print_table(results: list[dict]) -> None:
+    print(
+        f"{'framework':<16}{'import':>9}{'setup':>9}{'wall p50':>10}{'wall p95':>10}{'fw p50':>9}{'LLM calls':>11}"
+        f"{'tokens in/out':>15}{'tools':>7}{'RSS MB':>9}"
+    )
+    for r in results:
+        if r["status"] != "ok":
+            print(f"{r['framework']:<16}  {r['status']}")
+            continue
+        print(
+            f"{r['framework']:<16}{r['import_s']:>8.2f}s{r['setup_s']:>8.2f}s{r['wall_p50_s'] * 1000:>8.1f}ms"
+            f"{r['wall_p95_s'] * 1000:>8.1f}ms{r['framework_p50_s'] * 1000:>7.1f}ms"
+            f"{r['llm_calls_per_task']:>11.1f}"
+            f"{r['prompt_tokens_per_task']:>9.0f}/{r['completion_tokens_per_task']:<5.0f}{r['tool_calls_per_task']:>7.1f}"
+            f"{r['peak_rss_mb']:>9.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frameworks", default=",".join(ADAPTERS), help="comma-separated subset to run")
+    parser.add_argument("--runs", type=int, default=10, help="timed tasks per framework (after one warm-up)")
+    parser.add_argument("--model", default="sap/gpt-4o")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated model latency per LLM call")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed per framework")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--csv", help="write results as CSV")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.url, args.model, args.runs)))
+        return
+
+    results = []
+    with StubProxy(config=StubConfig(latency=args.latency_ms / 1000)) as proxy:
+        for name in args.frameworks.split(","):
+            results.append(benchmark(name.strip(), proxy, args))
+    print_table(results)
+
+    if args.output:
+        meta = {"python": platform.python_version(), "platform": platform.platform(), "runs": args.runs}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": {**meta, "latency_ms": args.latency_ms, "model": args.model}, "results": results}, f, indent=2)
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    main()
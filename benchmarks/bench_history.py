@@ -0,0 +1,85 @@
+"""Prompt growth in long conversations, with and without history compaction.
+
+Holds one conversation of ``--turns`` weather questions (a different city each
+turn) with the LangGraph and AG2 agents against the offline stub proxy. Every
+turn resends the whole history, so without compaction the prompt grows
+linearly per turn and the total linearly per turn squared. With compaction
+(:func:`agent_utils.history.default_compactor`) the prompt stays within
+``--budget`` tokens.
+
+The stub adds ``--prefill-ms-per-1k`` of latency per 1000 prompt tokens, like
+a real model's prefill, so latency growth shows too::
+
+    python benchmarks/bench_history.py --turns 30 --budget 1500
+    python benchmarks/bench_history.py --frameworks ag2 --prefill-ms-per-1k 100
+
+Tokens are the stub's estimate (about four characters per token).
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import time
+
+from agent_utils.frameworks import get_adapter
+from agent_utils.history import default_compactor
+from agent_utils.stub_proxy import StubConfig, StubProxy
+
+CITIES = ["London", "Paris", "Tokyo", "Oslo", "Rome", "Lima", "Cairo", "Delhi", "Sydney", "Toronto", "Berlin", "Madrid"]
+
+
+def converse(framework: str, compacted: bool, args, proxy: StubProxy) -> list[dict]:
+    """One conversation; per turn the prompt tokens of its LLM calls and its latency."""
+    compactor = default_compactor(args.budget) if compacted else None
+    adapter = get_adapter(framework)(model=args.model, api_base=proxy.url, api_key="sk-stub", compactor=compactor)
+    adapter.setup()
+    prompts = (f"What's the weather in {city}?" for city in itertools.islice(itertools.cycle(CITIES), args.turns))
+    turns = []
+    answers = adapter.chat(prompts)
+    while True:
+        before = proxy.stats()
+        start = time.perf_counter()
+        if next(answers, None) is None:
+            break
+        latency = time.perf_counter() - start
+        after = proxy.stats()
+        calls = after.get("completions", 0) - before.get("completions", 0)
+        tokens = after.get("prompt_tokens", 0) - before.get("prompt_tokens", 0)
+        turns.append({"latency_s": latency, "prompt_tokens": tokens, "tokens_per_call": tokens / max(calls, 1)})
+    adapter.close()
+    return turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frameworks", default="langgraph,ag2", help="comma-separated: langgraph, ag2")
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--budget", type=int, default=1500, help="token budget of the compacted history")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fixed stub latency per request")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=50.0, help="stub latency per 1000 prompt tokens")
+    parser.add_argument("--model", default="sap/gpt-4o")
+    args = parser.parse_args()
+
+    config = StubConfig(latency=args.latency_ms / 1000, prefill_per_1k=args.prefill_ms_per_1k / 1000)
+    shown = sorted({1, 2, 5, 10, 20, 50, 100, args.turns} & set(range(1, args.turns + 1)))
+    with StubProxy(config=config) as proxy:
+        for framework in args.frameworks.split(","):
+            with contextlib.redirect_stdout(io.StringIO()):  # AG2 prints the whole chat
+                runs = {mode: converse(framework, mode == "compacted", args, proxy) for mode in ("full", "compacted")}
+            print(f"\n{framework}: prompt tokens per LLM call and turn latency")
+            print(f"{'turn':>6} {'full tokens':>12} {'full ms':>9} {'compacted tokens':>17} {'compacted ms':>13}")
+            for turn in shown:
+                full, compacted = runs["full"][turn - 1], runs["compacted"][turn - 1]
+                print(
+                    f"{turn:>6} {full['tokens_per_call']:>12.0f} {full['latency_s'] * 1000:>9.0f}"
+                    f" {compacted['tokens_per_call']:>17.0f} {compacted['latency_s'] * 1000:>13.0f}"
+                )
+            for mode, turns in runs.items():
+                tokens = sum(turn["prompt_tokens"] for turn in turns)
+                seconds = sum(turn["latency_s"] for turn in turns)
+                print(f"  {mode:<9} total: {tokens} prompt tokens, {seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Connection reuse: a new HTTP client per request vs the shared pooled client.
+
+Sends chat-completion requests through the OpenAI SDK to the offline stub
+proxy and compares, for the sync and the async client:
+
+* ``new``: a fresh ``httpx`` client (and so a fresh connection) per request,
+* ``pooled``: the keep-alive clients from :mod:`agent_utils.http_pool`.
+
+For each mode it reports throughput, latency and the number of TCP
+connections the stub accepted:
+
+    python benchmarks/bench_http_pool.py --requests 500 --concurrency 16
+
+The stub serves plain HTTP, so the savings measured here are the TCP
+handshakes and client set-up only; against an HTTPS proxy every new
+connection also pays a TLS handshake, and the gap grows with the network
+round-trip time.
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent_utils.http_pool import PoolConfig, create_async_client, create_client
+from agent_utils.stats import LatencyStats
+from agent_utils.stub_proxy import StubConfig, StubProxy
+
+MESSAGES = [{"role": "user", "content": "Tell me a joke about the weather in London."}]
+
+
+def run_sync(pooled: bool, args, base_url: str) -> list[float]:
+    from openai import OpenAI
+
+    shared = OpenAI(base_url=base_url, api_key="sk-stub", http_client=create_client(args.config)) if pooled else None
+
+    def request(_):
+        start = time.perf_counter()
+        if shared is None:
+            with OpenAI(base_url=base_url, api_key="sk-stub", http_client=create_client(args.config)) as client:
+                client.chat.completions.create(model=args.model, messages=MESSAGES)
+        else:
+            shared.chat.completions.create(model=args.model, messages=MESSAGES)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        latencies = list(pool.map(request, range(args.requests)))
+    if shared is not None:
+        shared.close()
+    return latencies
+
+
+async def run_async(pooled: bool, args, base_url: str) -> list[float]:
+    from openai import AsyncOpenAI
+
+    shared = AsyncOpenAI(base_url=base_url, api_key="sk-stub", http_client=create_async_client(args.config)) if pooled else None
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def request():
+        async with slots:
+            start = time.perf_counter()
+            if shared is None:
+                async with AsyncOpenAI(
+                    base_url=base_url, api_key="sk-stub", http_client=create_async_client(args.config)
+                ) as client:
+                    await client.chat.completions.create(model=args.model, messages=MESSAGES)
+            else:
+                await shared.chat.completions.create(model=args.model, messages=MESSAGES)
+            return time.perf_counter() - start
+
+    latencies = await asyncio.gather(*(request() for _ in range(args.requests)))
+    if shared is not None:
+        await shared.close()
+    return list(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated model latency per request")
+    parser.add_argument("--model", default="sap/gpt-4o")
+    parser.add_argument("--modes", default="sync-new,sync-pooled,async-new,async-pooled",
+                        help="comma-separated subset to run")
+    args = parser.parse_args()
+    args.config = PoolConfig.from_env()
+
+    with StubProxy(config=StubConfig(latency=args.latency_ms / 1000)) as proxy:
+        for mode in args.modes.split(","):
+            kind, client = mode.split("-")
+            pooled = client == "pooled"
+            proxy.reset_stats()
+            start = time.perf_counter()
+            if kind == "sync":
+                latencies = run_sync(pooled, args, proxy.url)
+            else:
+                latencies = asyncio.run(run_async(pooled, args, proxy.url))
+            wall = time.perf_counter() - start
+            stats = proxy.stats()
+            print(f"{mode}: {len(latencies) / wall:.1f} requests/s, latency {LatencyStats.from_samples(latencies)}")
+            print(f"  TCP connections: {stats.get('connections', 0)} for {stats.get('requests', 0)} requests")
+
+
+if __name__ == "__main__":
+    main()
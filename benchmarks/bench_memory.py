@@ -0,0 +1,130 @@
+"""RSS and per-turn cost of AgentScope's InMemoryMemory vs the bounded, spilling memory.
+
+Replays ``--turns`` turns of a weather conversation against each memory, with
+the memory calls a ``ReActAgent`` reply makes: add the question, read the
+memory, add the tool call and its result, read it again, add the answer and
+drop the hint messages. Every ``--sample-every`` turns it also formats the
+prompt from the memory with ``DashScopeChatFormatter``, as the agent does for
+each model call. Each memory runs in a fresh process, so RSS is its own::
+
+    python benchmarks/bench_memory.py --turns 10000
+    python benchmarks/bench_memory.py --turns 2000 --max-tokens 2000 --sample-every 250
+
+Reports at each sample: peak RSS, the memory calls' time per turn since the
+last sample, and the messages, tokens and formatting time of the prompt.
+No model is involved; the stub's answers are used as message text.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import resource
+import subprocess
+import sys
+import time
+
+from agent_utils.weather import weather_report
+
+CITIES = ["London", "Paris", "Tokyo", "Oslo", "Rome", "Lima", "Cairo", "Delhi", "Sydney", "Toronto", "Berlin", "Madrid"]
+JOKE = "Why did the weather presenter bring a ladder? To reach the high pressure!"
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def turn_messages(turn: int):
+    """The messages of one ReAct turn: question, tool call, tool result, answer."""
+    from agentscope.message import Msg, TextBlock, ToolResultBlock, ToolUseBlock
+
+    city = CITIES[turn % len(CITIES)]
+    call_id = f"call_{turn}"
+    report = weather_report(city)
+    return (
+        Msg("user", f"What's the weather in {city}?", "user"),
+        Msg("weather agent", [ToolUseBlock(type="tool_use", id=call_id, name="get_weather", input={"city": city})], "assistant"),
+        Msg(
+            "system",
+            [ToolResultBlock(type="tool_result", id=call_id, name="get_weather", output=[TextBlock(type="text", text=report)])],
+            "system",
+        ),
+        Msg("weather agent", f"Good evening! {report} {JOKE}", "assistant"),
+    )
+
+
+async def replay(memory_name: str, turns: int, sample_every: int, max_tokens: int) -> None:
+    from agentscope.formatter import DashScopeChatFormatter
+    from agentscope.memory import InMemoryMemory
+    from agentscope.message import Msg
+
+    if memory_name == "bounded":
+        from agent_utils.agentscope_memory import BoundedMemory
+
+        memory = BoundedMemory(max_tokens=max_tokens)
+    else:
+        memory = InMemoryMemory()
+    formatter = DashScopeChatFormatter()
+    system = Msg("system", "You are a helpful weather assistant.", "system")
+
+    memory_time = 0.0
+    for turn in range(1, turns + 1):
+        question, tool_call, tool_result, answer = turn_messages(turn)
+        start = time.perf_counter()
+        await memory.add(question)
+        await memory.get_memory()
+        await memory.add([tool_call, tool_result])
+        prompt = await memory.get_memory()
+        await memory.add(answer)
+        await memory.delete_by_mark("hint")
+        memory_time += time.perf_counter() - start
+
+        if turn % sample_every == 0:
+            start = time.perf_counter()
+            formatted = await formatter.format([system, *prompt])
+            format_time = time.perf_counter() - start
+            sample = {
+                "turn": turn,
+                "rss_mb": peak_rss_mb(),
+                "memory_ms": memory_time / sample_every * 1000,
+                "prompt_messages": len(formatted),
+                "prompt_tokens": sum(math.ceil(len(json.dumps(m, default=str)) / 4) for m in formatted),
+                "format_ms": format_time * 1000,
+                "size": await memory.size(),
+            }
+            print(json.dumps(sample), flush=True)
+            memory_time = 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=10_000)
+    parser.add_argument("--sample-every", type=int, default=1000)
+    parser.add_argument("--max-tokens", type=int, default=4000, help="BoundedMemory budget")
+    parser.add_argument("--memories", default="inmemory,bounded")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(replay(args.child, args.turns, args.sample_every, args.max_tokens))
+        return
+
+    print(f"{args.turns} turns, 4 messages each; BoundedMemory budget {args.max_tokens} tokens\n")
+    print(f"{'memory':<10}{'turn':>7}{'RSS MB':>9}{'memory ms/turn':>16}{'prompt msgs':>13}{'prompt tokens':>15}{'format ms':>11}")
+    for name in args.memories.split(","):
+        command = [sys.executable, __file__, "--child", name, "--turns", str(args.turns),
+                   "--sample-every", str(args.sample_every), "--max-tokens", str(args.max_tokens)]
+        with subprocess.Popen(command, stdout=subprocess.PIPE, text=True) as child:
+            for line in child.stdout:
+                s = json.loads(line)
+                print(
+                    f"{name:<10}{s['turn']:>7}{s['rss_mb']:>9.0f}{s['memory_ms']:>16.3f}"
+                    f"{s['prompt_messages']:>13}{s['prompt_tokens']:>15}{s['format_ms']:>11.1f}"
+                )
+        print()
+
+
+if __name__ == "__main__":
+    main()
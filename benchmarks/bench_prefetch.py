@@ -0,0 +1,70 @@
+"""End-to-end latency with and without speculative ``get_weather`` prefetch.
+
+Runs the LangGraph and OpenAI Agents weather agents against the offline stub
+proxy (``--latency-ms`` per model call) and a local weather service
+(:mod:`agent_utils.weather_service`, ``--weather-latency-ms`` per lookup).
+Each run asks about a different city. Without prefetch a run is
+model call -> lookup -> model call; with ``TOOL_PREFETCH=1`` the lookup for
+the city in the prompt starts with the first model call and the tool call
+picks up its result::
+
+    python benchmarks/bench_prefetch.py --runs 20
+    python benchmarks/bench_prefetch.py --frameworks langgraph --weather-latency-ms 500
+
+Reports the run latency of both modes, the saving per run and the
+prefetcher's hits, misses and wasted lookups.
+"""
+
+import argparse
+import dataclasses
+import os
+
+from agent_utils.cli import answer, build_adapter
+from agent_utils.prefetch import PrefetchStats
+from agent_utils.stats import LatencyStats
+from agent_utils.stub_proxy import StubConfig, StubProxy
+from agent_utils.weather_service import WeatherService, weather_prefetcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frameworks", default="langgraph,openai_agents")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="stub latency per model call")
+    parser.add_argument("--weather-latency-ms", type=float, default=300.0, help="weather service latency per lookup")
+    parser.add_argument("--model", default="sap/gpt-4o")
+    args = parser.parse_args()
+
+    with StubProxy(config=StubConfig(latency=args.latency_ms / 1000)) as proxy, \
+            WeatherService(latency=args.weather_latency_ms / 1000) as service:
+        os.environ["WEATHER_SERVICE_URL"] = service.url
+        print(
+            f"{args.runs} runs per mode, {args.latency_ms:.0f} ms per model call, "
+            f"{args.weather_latency_ms:.0f} ms per weather lookup\n"
+        )
+        for framework in args.frameworks.split(","):
+            adapter = build_adapter(framework, args.model, proxy.url, "sk-stub")
+            answer(adapter, "warm-up", "What's the weather in Warmup?")
+            means = {}
+            for mode in ("off", "on"):
+                os.environ["TOOL_PREFETCH"] = "1" if mode == "on" else ""
+                weather_prefetcher.stats = PrefetchStats()
+                service.reset_stats()
+                results = [
+                    answer(adapter, i, f"What's the weather in {mode.title()}ville{i}?") for i in range(args.runs)
+                ]
+                errors = sum("error" in result for result in results)
+                latency = LatencyStats.from_samples(result["latency_s"] for result in results)
+                means[mode] = latency.mean
+                print(f"{framework}, prefetch {mode}: {latency} ({errors} errors)")
+                if mode == "on":
+                    stats = dataclasses.asdict(weather_prefetcher.stats)
+                    print(f"  prefetch: {stats}, weather service: {service.stats().get('lookups', 0)} lookups")
+            print(f"  saved {(means['off'] - means['on']) * 1000:.0f} ms per run ({1 - means['on'] / means['off']:.0%})\n")
+            adapter.close()
+        os.environ.pop("TOOL_PREFETCH")
+    weather_prefetcher.close()
+
+
+if __name__ == "__main__":
+    main()
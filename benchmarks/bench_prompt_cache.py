@@ -0,0 +1,142 @@
+"""Cached-token ratio and latency of three prompt layouts, with the stub's simulated prompt cache.
+
+Answers one weather question per city with a two-call tool loop (the model
+asks for ``get_weather``, then answers from its result) through LiteLLM,
+against the offline stub proxy with ``prompt_cache`` on and ``--prefill-ms-per-1k``
+of prefill time for every uncached 1000 prompt tokens. The system prompt
+carries ``--few-shot`` example reports, as production prompts do:
+
+* dynamic: the city is interpolated near the top of the system prompt, as the
+  CrewAI examples' ``goal`` used to do; no two cities share a prefix,
+* stable: :class:`agent_utils.prompt_cache.PromptLayout`, with the system
+  prompt, examples and tool schema first and the question last,
+* stable + markers: the same, with ``cache_control`` markers for the models
+  that need them (:func:`agent_utils.prompt_cache.add_cache_control`).
+
+::
+
+    python benchmarks/bench_prompt_cache.py --cities 50
+    python benchmarks/bench_prompt_cache.py --models sap/claude-4.5-sonnet --prefill-ms-per-1k 200
+
+Reports per model and layout the share of prompt tokens served from the cache
+and the latency per question. The stub caches like the providers do: OpenAI
+models every prefix of at least 1024 tokens, Claude models only up to marked
+blocks.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from agent_utils.prompt_cache import PromptLayout, add_cache_control, supports_cache_control
+from agent_utils.stats import LatencyStats
+from agent_utils.stub_proxy import StubConfig, StubProxy
+from agent_utils.usage import cached_tokens
+from agent_utils.weather import weather_report
+
+SYSTEM_PROMPT = (
+    "You are the weather presenter on TV. When the user asks about a city, call the get_weather tool "
+    "and answer with a couple of sentences of TV weather report, including a small joke. "
+    "Here are reports you wrote before, keep the same style:"
+)
+EXAMPLE_CITIES = ["London", "Paris", "Tokyo", "Oslo", "Rome", "Lima", "Cairo", "Delhi", "Sydney", "Toronto", "Berlin", "Madrid"]
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_weather",
+            "description": "Retrieves the current weather report for a specified city.",
+            "parameters": {
+                "type": "object",
+                "properties": {"city": {"type": "string", "description": "The name of the city."}},
+                "required": ["city"],
+            },
+        },
+    }
+]
+
+
+def few_shot(count: int) -> tuple[dict, ...]:
+    examples = []
+    for i in range(count):
+        city = EXAMPLE_CITIES[i % len(EXAMPLE_CITIES)]
+        examples += [
+            {"role": "user", "content": f"What's the weather in {city}?"},
+            {
+                "role": "assistant",
+                "content": f"Good evening! {weather_report(city)} Pack your sunglasses, and maybe a joke "
+                f"or two for the commute: why did the cloud break up with the fog? It needed space. "
+                f"That was the weather for {city}, back to the studio.",
+            },
+        ]
+    return tuple(examples)
+
+
+def first_request(layout: str, model: str, city: str, prompt_layout: PromptLayout) -> dict:
+    prompt = f"What's the weather in {city}?"
+    if layout == "dynamic":
+        system = f"Tonight's city is {city}. {SYSTEM_PROMPT}"
+        messages = [{"role": "system", "content": system}, *prompt_layout.examples, {"role": "user", "content": prompt}]
+    elif layout == "stable":
+        messages = prompt_layout.messages(prompt)
+    else:
+        return prompt_layout.request(model, prompt)
+    return {"model": model, "messages": messages, "tools": TOOLS}
+
+
+def answer(litellm, layout: str, model: str, city: str, prompt_layout: PromptLayout) -> tuple[float, int, int]:
+    """Latency, prompt tokens and cached tokens of one question (two model calls)."""
+    request = first_request(layout, model, city, prompt_layout)
+    start = time.perf_counter()
+    first = litellm.completion(**request)
+    call = first.choices[0].message.tool_calls[0]
+    result = weather_report(json.loads(call.function.arguments)["city"])
+    messages = [
+        *request["messages"],
+        {"role": "assistant", "content": None, "tool_calls": [call.model_dump()]},
+        {"role": "tool", "tool_call_id": call.id, "content": result},
+    ]
+    if layout == "stable + markers" and supports_cache_control(model):
+        # Move the conversation breakpoint to the tool result, as CacheControl does for every call
+        messages, _ = add_cache_control(messages)
+    second = litellm.completion(**{**request, "messages": messages})
+    latency = time.perf_counter() - start
+    usages = [first.usage, second.usage]
+    return latency, sum(u.prompt_tokens for u in usages), sum(cached_tokens(u) for u in usages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default="sap/gpt-5,sap/claude-4.5-sonnet")
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--few-shot", type=int, default=12, help="example reports in the system prompt")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="stub latency per model call")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=150.0, help="stub prefill time per 1000 uncached tokens")
+    args = parser.parse_args()
+
+    prompt_layout = PromptLayout(SYSTEM_PROMPT, examples=few_shot(args.few_shot), tools=tuple(TOOLS))
+    config = StubConfig(latency=args.latency_ms / 1000, prefill_per_1k=args.prefill_ms_per_1k / 1000, prompt_cache=True)
+    with StubProxy(config=config) as proxy:
+        os.environ.update(USE_LITELLM_PROXY="True", LITELLM_PROXY_API_BASE=proxy.url, LITELLM_PROXY_API_KEY="sk-stub")
+        import litellm
+
+        print(
+            f"{args.cities} cities, 2 model calls each, {args.latency_ms:.0f} ms per call "
+            f"+ {args.prefill_ms_per_1k:.0f} ms per 1000 uncached prompt tokens\n"
+        )
+        print(f"{'model':<24}{'layout':<18}{'prompt tok':>11}{'cached':>8}  latency")
+        for model in args.models.split(","):
+            for layout in ("dynamic", "stable", "stable + markers"):
+                results = [
+                    answer(litellm, layout, model, f"Testville{i}", prompt_layout) for i in range(args.cities)
+                ]
+                prompt_tokens = sum(r[1] for r in results)
+                cached = sum(r[2] for r in results)
+                latency = LatencyStats.from_samples(r[0] for r in results)
+                print(f"{model:<24}{layout:<18}{prompt_tokens / len(results):>11.0f}{cached / prompt_tokens:>8.0%}  {latency}")
+            print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Bulk LLM calls against a rate-limited deployment, with and without the client-side limiter.
+
+Starts the offline stub proxy with a real deployment's limits: at most
+``--max-concurrency`` requests in flight and ``--rpm`` requests per minute,
+beyond which it answers 429 with ``Retry-After: 1``. Then sends ``--requests``
+chat completions with ``--concurrency`` in flight through the async OpenAI
+SDK (which retries 429s itself, with backoff), like a batch job fanning an
+agent out over many prompts - first unthrottled, then through a
+:class:`agent_utils.ratelimit.RateLimiter` that knows the RPM budget but has
+to find the concurrency limit by itself::
+
+    python benchmarks/bench_ratelimit.py --requests 600 --concurrency 64
+    python benchmarks/bench_ratelimit.py --rpm 6000 --max-concurrency 4
+
+Reports throughput, failed requests, 429s, latency, the limiter's queueing
+delay and the concurrency limit it settled on.
+"""
+
+import argparse
+import asyncio
+import time
+
+from agent_utils.http_pool import create_async_client
+from agent_utils.ratelimit import RateLimiter
+from agent_utils.stats import LatencyStats
+from agent_utils.stub_proxy import StubConfig, StubProxy
+
+MESSAGES = [{"role": "user", "content": "Tell me a joke about the weather in London."}]
+
+
+async def run(args, base_url: str, limiter: RateLimiter | None) -> tuple[list[float], int, float]:
+    from openai import AsyncOpenAI
+
+    http_client = create_async_client()
+    if limiter is not None:
+        limiter.instrument_client(http_client)
+    client = AsyncOpenAI(base_url=base_url, api_key="sk-stub", http_client=http_client, max_retries=args.retries)
+    slots = asyncio.Semaphore(args.concurrency)
+    failures = 0
+
+    async def request():
+        nonlocal failures
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await client.chat.completions.create(model="sap/gpt-4o", messages=MESSAGES)
+            except Exception:  # noqa: BLE001 - counted, the benchmark goes on
+                failures += 1
+                return None
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(request() for _ in range(args.requests)))
+    wall = time.perf_counter() - start
+    await client.close()
+    return [latency for latency in results if latency is not None], failures, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=64, help="requests the batch job keeps in flight")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--max-concurrency", type=int, default=8, help="the deployment's limit on requests in flight")
+    parser.add_argument("--rpm", type=int, default=3000, help="the deployment's requests per minute")
+    parser.add_argument("--retries", type=int, default=2, help="OpenAI SDK retries per request")
+    args = parser.parse_args()
+
+    config = StubConfig(latency=args.latency_ms / 1000, max_concurrency=args.max_concurrency, rpm=args.rpm)
+    with StubProxy(config=config) as stub:
+        print(
+            f"{args.requests} requests, {args.concurrency} in flight; deployment: {args.latency_ms:.0f} ms, "
+            f"{args.max_concurrency} in flight, {args.rpm} requests/min\n"
+        )
+        for name in ["unthrottled", "limiter"]:
+            limiter = RateLimiter(rpm=args.rpm) if name == "limiter" else None
+            stub.reset_stats()
+            done, failures, wall = asyncio.run(run(args, stub.url, limiter))
+            stats = stub.stats()
+            print(
+                f"{name}: {len(done) / wall:.1f} requests/s, {failures} failed, "
+                f"{stats.get('rate_limited', 0)} 429s in {stats.get('requests', 0)} requests sent"
+            )
+            print(f"  latency {LatencyStats.from_samples(done)}")
+            if limiter is not None:
+                snapshot = limiter.snapshot()
+                print(
+                    f"  limiter: concurrency limit {snapshot['limit']} (peak {snapshot['peak_inflight']} in flight), "
+                    f"{snapshot['throttled']} of {snapshot['requests']} calls queued, "
+                    f"queue delay p50 {snapshot['queue_delay_p50_s'] * 1000:.0f} ms, "
+                    f"p95 {snapshot['queue_delay_p95_s'] * 1000:.0f} ms, "
+                    f"{snapshot['overloads']} overloads, {snapshot['decreases']} decreases"
+                )
+
+
+if __name__ == "__main__":
+    main()
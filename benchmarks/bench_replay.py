@@ -0,0 +1,83 @@
+"""Bulk evaluation speed: live model calls vs replayed recordings.
+
+Records ``--cases`` weather questions (a different city each) through one
+framework adapter against the offline stub proxy with ``--latency-ms`` per
+request, then stops the stub and replays the same cases from the store
+(:mod:`agent_utils.replay`), with no network at all::
+
+    python benchmarks/bench_replay.py --cases 500
+    python benchmarks/bench_replay.py --framework openai_agents --latency-ms 500
+
+Reports both passes' throughput, the size of the store and whether every
+replayed answer matches the recorded one.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from agent_utils.cli import answer, build_adapter
+from agent_utils.replay import Replay, ReplayStore
+from agent_utils.stats import LatencyStats
+from agent_utils.stub_proxy import StubConfig, StubProxy
+
+
+def run_all(adapter, prompts: list[str]) -> tuple[float, list[dict]]:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # AG2 and AgentScope print the chat
+        results = [answer(adapter, i, prompt) for i, prompt in enumerate(prompts)]
+    return time.perf_counter() - start, results
+
+
+def report(label: str, seconds: float, results: list[dict]) -> None:
+    errors = sum("error" in result for result in results)
+    latency = LatencyStats.from_samples(result["latency_s"] for result in results)
+    print(f"{label:<7} {len(results)} cases in {seconds:.1f}s ({len(results) / seconds:.0f} cases/s, {errors} errors)")
+    print(f"        {latency}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--framework", default="langgraph")
+    parser.add_argument("--cases", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="stub latency per request while recording")
+    parser.add_argument("--store", help="store path (default: a temporary file)")
+    parser.add_argument("--model", default="sap/gpt-4o")
+    args = parser.parse_args()
+
+    prompts = [f"What's the weather in Testville{i}?" for i in range(args.cases)]
+    path = args.store or os.path.join(tempfile.mkdtemp(), "replay.sqlite")
+    replay = Replay(ReplayStore(path), mode="record")
+
+    with StubProxy(config=StubConfig(latency=args.latency_ms / 1000)) as proxy:
+        adapter = build_adapter(args.framework, args.model, proxy.url, "sk-stub")
+        # Installed after build_adapter so it sees the framework; the
+        # CLI installs it first via LLM_REPLAY so usage counts replays too
+        replay.install()
+        from agent_utils.http_pool import shared_async_client, shared_client
+
+        replay.instrument_client(shared_client())
+        replay.instrument_client(shared_async_client())
+        recorded_s, recorded = run_all(adapter, prompts)
+
+    replay.mode = "replay"  # the stub is gone: a miss would raise ReplayMiss
+    replayed_s, replayed = run_all(adapter, prompts)
+    adapter.close()
+
+    print(f"{args.framework}, {args.latency_ms:.0f} ms per model request while recording\n")
+    report("record", recorded_s, recorded)
+    report("replay", replayed_s, replayed)
+    same = sum(a.get("answer") == b.get("answer") for a, b in zip(recorded, replayed))
+    entries = len(replay.store)
+    replay.store.close()
+    size = os.path.getsize(path)
+    print(f"\n{same}/{len(prompts)} replayed answers identical to the recording")
+    print(f"Store: {entries} interactions, {size / 1024:.0f} KiB ({size / max(entries, 1):.0f} bytes each)")
+    print(f"Replay: {replay.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Client-side routing over several deployments vs one pinned deployment.
+
+Starts three offline stub proxies standing in for three model deployments:
+
+* ``sap/gpt-4o`` - fast, but at its rate limit: ``--error-rate`` of its
+  requests get a 429 with ``Retry-After: 1``,
+* ``sap/gpt-4.1`` - a little slower, healthy,
+* ``sap/gpt-5`` - slow, healthy.
+
+Sends ``--requests`` chat completions with ``--concurrency`` in flight
+through the async OpenAI SDK (which retries 429s itself, with backoff), first
+pinned to the first deployment like the examples, then through a
+:class:`agent_utils.router.Router` with each strategy::
+
+    python benchmarks/bench_router.py --requests 400 --concurrency 16
+    python benchmarks/bench_router.py --strategies least-latency --error-rate 0.5
+
+Reports throughput, latency, failed requests, how the requests were spread,
+the router's fallbacks and its own overhead per request.
+"""
+
+import argparse
+import asyncio
+import time
+
+from agent_utils.http_pool import create_async_client
+from agent_utils.router import STRATEGIES, Deployment, Router
+from agent_utils.stats import LatencyStats
+from agent_utils.stub_proxy import StubConfig, StubProxy
+
+MESSAGES = [{"role": "user", "content": "Tell me a joke about the weather in London."}]
+
+
+async def run(args, base_url: str, router: Router | None) -> tuple[list[float], int, float]:
+    from openai import AsyncOpenAI
+
+    http_client = create_async_client()
+    if router is not None:
+        router.instrument_client(http_client)
+    client = AsyncOpenAI(base_url=base_url, api_key="sk-stub", http_client=http_client)
+    slots = asyncio.Semaphore(args.concurrency)
+    failures = 0
+
+    async def request():
+        nonlocal failures
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await client.chat.completions.create(model="sap/gpt-4o", messages=MESSAGES)
+            except Exception:  # noqa: BLE001 - counted, the benchmark goes on
+                failures += 1
+                return None
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(request() for _ in range(args.requests)))
+    wall = time.perf_counter() - start
+    await client.close()
+    return [latency for latency in results if latency is not None], failures, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--error-rate", type=float, default=0.25, help="share of 429s from the first deployment")
+    parser.add_argument("--latencies-ms", default="50,80,200", help="latency of the three deployments")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES), help="comma-separated routing strategies")
+    args = parser.parse_args()
+
+    latencies = [float(ms) / 1000 for ms in args.latencies_ms.split(",")]
+    configs = [
+        StubConfig(latency=latencies[0], error_rate=args.error_rate, error_status=429),
+        StubConfig(latency=latencies[1]),
+        StubConfig(latency=latencies[2]),
+    ]
+    models = ["sap/gpt-4o", "sap/gpt-4.1", "sap/gpt-5"]
+    stubs = [StubProxy(config=config).start() for config in configs]
+    try:
+        print(f"{args.requests} requests, {args.concurrency} in flight; deployments:")
+        for model, stub, config in zip(models, stubs, configs):
+            print(f"  {model:<12} {stub.url}  {config.latency * 1000:.0f} ms, {config.error_rate:.0%} 429s")
+        print()
+        for name in ["pinned", *args.strategies.split(",")]:
+            router = None
+            if name != "pinned":
+                deployments = [Deployment(model, stub.url) for model, stub in zip(models, stubs)]
+                router = Router(deployments, strategy=name, cooldown=1.0)
+            for stub in stubs:
+                stub.reset_stats()
+            done, failures, wall = asyncio.run(run(args, stubs[0].url, router))
+            print(f"{name}: {len(done) / wall:.1f} requests/s, {failures} failed")
+            print(f"  latency {LatencyStats.from_samples(done)}")
+            served = ", ".join(
+                f"{model} {stub.stats().get('completions', 0)} ({stub.stats().get('errors', 0)} 429s)"
+                for model, stub in zip(models, stubs)
+            )
+            print(f"  served: {served}")
+            if router is not None:
+                print(f"  router: {router.stats}")
+    finally:
+        for stub in stubs:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
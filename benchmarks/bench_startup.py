@@ -0,0 +1,129 @@
+"""Start-up cost of the example entry points, measured with ``python -X importtime``.
+
+Every example is run in a fresh interpreter in two steps:
+
+* ``load``: the script is executed as a module (``runpy.run_path``) without
+  running ``main()`` - what a CLI pays before it can show ``--help`` or a
+  prompt, and what a tool that only needs one framework pays for the others,
+* ``ready``: the agent is then built (``build_agent()`` and friends), which
+  pulls in the framework.
+
+For each example it reports the process wall time, both steps, and the
+heaviest top-level imports of the ``ready`` step according to ``-X importtime``:
+
+    python benchmarks/bench_startup.py --repeat 3
+    python benchmarks/bench_startup.py --examples crewai_lib,pydantic_ai --top 5
+
+The best of ``--repeat`` runs is reported, so the numbers are for a warm OS
+file cache; the first run after a reboot is slower.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+#: Example name -> (script, expression that builds the agent from the script's namespace)
+EXAMPLES = {
+    "langgraph": ("langgraph_example/langgraph_agent.py", "build_agent()"),
+    "crewai_lib": ("crewai_example/crewai_litellm_lib.py", "build_crew()"),
+    "crewai_proxy": ("crewai_example/crewai_litellm_proxy.py", "build_crew()"),
+    "pydantic_ai": ("pydantic_ai_example/pydantic_ai_litellm_proxy.py", "build_agent()"),
+    "google_adk": ("google_adk_example/google_adk.py", "build_agent()"),
+    "openai_agents": ("openai_adk_example/openai_adk.py", "build_agent('sap/gpt-4.1')"),
+    "strands": ("aws_strands_example/aws_strands.py", "build_agent()"),
+    "llamaindex": ("LlamaIndex_example/LlamaIndex_litellm.py", "build_agent()"),
+    "smolagents": ("smolagents_example/smolagents_litellm.py", "build_agent()"),
+    "microsoft": ("microsoft_agent_example/microsoft_agent_litellm_proxy.py", "build_agent()"),
+    "agentscope": ("agentscope_example/agentscope_litellm.py", "build_agent()"),
+    "ag2": ("ag2_example/ag2_litellm_proxy.py", "build_pattern()"),
+}
+
+MARKER = "--- ready ---"
+
+# Runs in the child interpreter; timings go to stdout, -X importtime writes to stderr
+CHILD = """
+import json, runpy, sys, time
+start = time.perf_counter()
+namespace = runpy.run_path({path!r})
+loaded = time.perf_counter()
+print({marker!r}, file=sys.stderr, flush=True)
+eval({ready!r}, namespace)
+print(json.dumps({{"load_s": loaded - start, "ready_s": time.perf_counter() - loaded}}))
+"""
+
+
+def parse_importtime(stderr: str) -> tuple[list[tuple[str, float]], list[tuple[str, float]]]:
+    """Top-level imports and their cumulative time in seconds, before and after the marker."""
+    phases: list[list[tuple[str, float]]] = [[], []]
+    phase = 0
+    for line in stderr.splitlines():
+        if line.startswith(MARKER):
+            phase = 1
+            continue
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit() or name[1:2] == " ":
+            continue  # header line or a nested import
+        phases[phase].append((name.strip(), int(cumulative) / 1e6))
+    return phases[0], phases[1]
+
+
+def measure(path: str, ready: str) -> dict:
+    code = CHILD.format(path=str(ROOT / path), marker=MARKER, ready=ready)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=ROOT / Path(path).parent
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+    load_imports, ready_imports = parse_importtime(proc.stderr)
+    return {
+        **json.loads(proc.stdout.strip().splitlines()[-1]),
+        "wall_s": wall,
+        "load_imports": load_imports,
+        "ready_imports": ready_imports,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--examples", default=",".join(EXAMPLES), help="comma-separated subset to run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per example, the fastest is reported")
+    parser.add_argument("--top", type=int, default=3, help="heaviest imports to list per example")
+    args = parser.parse_args()
+
+    # Building agents needs endpoints and keys but makes no requests. LiteLLM would
+    # otherwise download its model cost map on import, which is not start-up cost
+    # we want to measure (set it yourself in production, see PERFORMANCE.md).
+    os.environ.setdefault("PROXY_BASE_URL", "http://127.0.0.1:4000")
+    os.environ.setdefault("LITELLM_PROXY_API_KEY", "sk-stub")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+    os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))
+
+    print(f"{'example':<14} {'process':>9} {'load':>9} {'ready':>9}  heaviest imports when ready")
+    for name in args.examples.split(","):
+        path, ready = EXAMPLES[name]
+        runs = [measure(path, ready) for _ in range(args.repeat)]
+        failed = [run for run in runs if "error" in run]
+        if failed:
+            print(f"{name:<14} failed: {failed[0]['error']}")
+            continue
+        best = min(runs, key=lambda run: run["wall_s"])
+        heaviest = sorted(best["ready_imports"], key=lambda item: item[1], reverse=True)[: args.top]
+        print(
+            f"{name:<14} {best['wall_s'] * 1000:7.0f}ms {best['load_s'] * 1000:7.0f}ms {best['ready_s'] * 1000:7.0f}ms  "
+            + ", ".join(f"{module} {seconds * 1000:.0f}ms" for module, seconds in heaviest)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Micro-benchmark for the shared weather index.
+
+Builds an index of synthetic cities (100k by default) and measures lookups per
+second for exact, alias, fuzzy and unknown-city queries, next to the old
+per-call ``mock_weather_db`` dict literal.
+
+    python benchmarks/bench_weather_lookup.py --cities 100000
+"""
+
+import argparse
+import random
+import time
+
+from agent_utils.weather import DEFAULT_REPORTS, WeatherIndex, normalize_city
+
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiouy"
+SUFFIXES = ["", "", "", "burg", "ville", "grad", "pur", "ton", "stad", "polis"]
+
+
+def make_cities(n: int, rng: random.Random) -> dict[str, str]:
+    cities: dict[str, str] = {}
+    while len(cities) < n:
+        words = []
+        for _ in range(rng.choice((1, 1, 1, 2))):
+            word = "".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 4)))
+            words.append((word + rng.choice(SUFFIXES)).title())
+        name = " ".join(words)
+        cities.setdefault(normalize_city(name), name)
+    return cities
+
+
+def typo(name: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(name))
+    return name[:i] + name[i + 1 :]
+
+
+def legacy_lookup(reports: dict[str, str]):
+    # The pattern every example used before the shared index: the dict literal
+    # is rebuilt on each call, so its cost grows with the number of cities.
+    def lookup(city: str) -> str | None:
+        city_normalized = city.lower().replace(" ", "")
+        mock_weather_db = {name.lower().replace(" ", ""): report for name, report in reports.items()}
+        return mock_weather_db.get(city_normalized)
+
+    return lookup
+
+
+def measure(name: str, fn, queries: list[str]) -> None:
+    start = time.perf_counter()
+    hits = sum(fn(q) is not None for q in queries)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28}{len(queries) / elapsed:>14,.0f} lookups/s{hits / len(queries):>10.1%} hit")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cities = list(make_cities(args.cities, rng).values())
+    reports = {city: f"The weather in {city} is mild." for city in cities}
+    reports.update(DEFAULT_REPORTS)
+    aliases = {f"{city} City": city for city in rng.sample(cities, len(cities) // 10)}
+
+    start = time.perf_counter()
+    index = WeatherIndex(reports, aliases)
+    print(f"Index build: {len(index):,} cities, {len(aliases):,} aliases in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    index.get("warm up the fuzzy index with a miss")
+    print(f"Fuzzy index build: {time.perf_counter() - start:.2f}s\n")
+
+    n = args.lookups
+    exact = [rng.choice(cities).upper() for _ in range(n)]
+    alias_names = list(aliases)
+    alias = [rng.choice(alias_names).lower() for _ in range(n)]
+    fuzzy = [typo(rng.choice(cities), rng) for _ in range(max(n // 20, 1))]
+    unknown = [f"Nowhere {i}" for i in range(max(n // 20, 1))]
+
+    measure("legacy dict literal (3)", legacy_lookup(DEFAULT_REPORTS), ["London"] * n)
+    measure(f"legacy dict literal ({len(cities) // 1000}k)", legacy_lookup(reports), exact[:20])
+    measure("index exact", index.get, exact)
+    measure("index alias", index.get, alias)
+    measure("index fuzzy (cold)", index.get, fuzzy)
+    measure("index fuzzy (cached)", index.get, fuzzy)
+    measure("index unknown", index.get, unknown)
+
+
+if __name__ == "__main__":
+    main()
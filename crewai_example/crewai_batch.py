@@ -0,0 +1,189 @@
+"""
+Fan-out mode for the CrewAI weather presenter.
+
+crewai_litellm_lib.py and crewai_litellm_proxy.py build one crew for one city
+and block in crew.kickoff(). This script writes the reports for many cities at
+once: the crew of crewai_litellm_proxy.py (when PROXY_BASE_URL is set) or of
+crewai_litellm_lib.py is built once, with its {city} placeholder, and every
+city runs on its own copy of it (crew.copy(), as kickoff_for_each_async does)
+through the native async akickoff(), at most --concurrency at a time. Each report is
+appended to the output JSONL file as soon as its city finishes, and a
+throughput, latency and token summary is printed at the end:
+
+    python crewai_batch.py cities.txt --output reports.jsonl --concurrency 16
+
+The input has one city per line, or JSON objects {"id": ..., "city": "..."}.
+--baseline N first runs N of the cities one after another with the blocking
+kickoff() of the single-city scripts and reports the fan-out throughput
+against it:
+
+    python crewai_batch.py cities.txt --concurrency 32 --baseline 10
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Iterable
+
+from dotenv import load_dotenv
+
+from agent_utils.prompt_cache import install_from_env as install_prompt_cache_from_env
+from agent_utils.ratelimit import install_from_env as install_limiter_from_env
+from agent_utils.stats import LatencyStats
+from agent_utils.tracing import setup_from_env
+
+
+def build_crew():
+    """The crew of the single-city script for this mode; {city} is filled in by kickoff(inputs={"city": ...})."""
+    if os.getenv("PROXY_BASE_URL"):
+        import crewai_litellm_proxy as example
+    else:
+        import crewai_litellm_lib as example
+    crew = example.build_crew()
+    # 64 crews logging every step at once is unreadable; the results go to the output file
+    crew.verbose = False
+    crew.stream = False
+    return crew
+
+
+async def kickoff_as_completed(crew, inputs: Iterable[dict], concurrency: int) -> AsyncIterator[tuple[dict, Any, float]]:
+    """Like crew.kickoff_for_each_async(), with at most ``concurrency`` crews running.
+
+    kickoff_for_each_async() starts a copy of the crew for every input at once
+    and returns when the last one finishes. This yields (inputs, output or
+    exception, latency) for each copy as soon as it finishes, and only takes
+    the next input when a slot is free, so a long input list is never
+    materialised.
+    """
+    finished: asyncio.Queue = asyncio.Queue()
+    pending = iter(inputs)
+    tasks = set()  # the event loop only keeps weak references
+
+    async def run(item: dict) -> None:
+        start = time.perf_counter()
+        try:
+            output = await crew.copy().akickoff(inputs=item)
+        except Exception as e:
+            output = e
+        await finished.put((item, output, time.perf_counter() - start))
+
+    def start_next() -> int:
+        for item in itertools.islice(pending, 1):
+            task = asyncio.create_task(run(item))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            return 1
+        return 0
+
+    running = sum(start_next() for _ in range(concurrency))
+    while running:
+        result = await finished.get()
+        running += start_next() - 1
+        yield result
+
+
+def read_cities(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line) if line.startswith("{") else {"city": line}
+            yield {"id": record.get("id", line_no), "city": record["city"]}
+
+
+class FanOutStats:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record(self, item: dict, output: Any, latency: float) -> dict:
+        if isinstance(output, Exception):
+            self.errors += 1
+            return {**item, "error": repr(output)}
+        usage = output.token_usage
+        self.latencies.append(latency)
+        self.llm_calls += usage.successful_requests
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        return {
+            **item,
+            "answer": output.raw,
+            "latency_s": round(latency, 4),
+            "llm_calls": usage.successful_requests,
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+        }
+
+    def throughput(self, wall_time: float) -> float:
+        return len(self.latencies) / wall_time
+
+    def report(self, wall_time: float) -> str:
+        done = len(self.latencies)
+        return "\n".join(
+            [
+                f"Cities: {done + self.errors} ({self.errors} failed) in {wall_time:.1f}s",
+                f"Throughput: {self.throughput(wall_time):.2f} cities/s",
+                f"Latency: {LatencyStats.from_samples(self.latencies)}",
+                f"LLM calls: {self.llm_calls}, tokens: {self.prompt_tokens} in / {self.completion_tokens} out",
+            ]
+        )
+
+
+def run_sequential(crew, cities: list[dict]) -> float:
+    """The single-city scripts' blocking kickoff(), one city after another; returns cities/s."""
+    stats = FanOutStats()
+    start = time.perf_counter()
+    for item in cities:
+        kickoff_start = time.perf_counter()
+        try:
+            output = crew.copy().kickoff(inputs=item)
+        except Exception as e:
+            output = e
+        stats.record(item, output, time.perf_counter() - kickoff_start)
+    wall_time = time.perf_counter() - start
+    print("Sequential baseline:\n" + stats.report(wall_time) + "\n")
+    return stats.throughput(wall_time)
+
+
+async def run_fan_out(crew, cities: Iterable[dict], output_path: str, concurrency: int) -> FanOutStats:
+    stats = FanOutStats()
+    with open(output_path, "a", encoding="utf-8") as out:
+        async for item, output, latency in kickoff_as_completed(crew, cities, concurrency):
+            out.write(json.dumps(stats.record(item, output, latency), ensure_ascii=False) + "\n")
+            out.flush()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="file with one city (or JSON object) per line")
+    parser.add_argument("--output", default="reports.jsonl", help="JSONL file reports are appended to")
+    parser.add_argument("--concurrency", type=int, default=16, help="maximum number of crews running at once")
+    parser.add_argument("--baseline", type=int, default=0, help="cities to run sequentially first, for comparison")
+    args = parser.parse_args()
+
+    load_dotenv()
+    setup_from_env("crewai")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    crew = build_crew()
+    # RATE_LIMIT_RPM / RATE_LIMIT_TPM keep the fan-out under the model's limits (see PERFORMANCE.md)
+    install_limiter_from_env()
+    install_prompt_cache_from_env()  # PROMPT_CACHE=1: cache_control markers for Claude models
+
+    baseline = run_sequential(crew, list(itertools.islice(read_cities(args.input), args.baseline))) if args.baseline else None
+    start = time.perf_counter()
+    stats = asyncio.run(run_fan_out(crew, read_cities(args.input), args.output, args.concurrency))
+    wall_time = time.perf_counter() - start
+    print(f"Fan-out, {args.concurrency} crews at a time:\n" + stats.report(wall_time))
+    if baseline:
+        print(f"Speed-up over the sequential baseline: {stats.throughput(wall_time) / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
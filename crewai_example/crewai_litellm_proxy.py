@@ -1,69 +1,110 @@
 import os
 
-from crewai import Agent, Task, Crew
-from crewai import LLM
-from crewai.tools import tool
 from dotenv import load_dotenv
-import litellm
-
-litellm.use_litellm_proxy = True
-load_dotenv()
-
-api_base = os.getenv("PROXY_BASE_URL")
-api_key = os.getenv("LITELLM_PROXY_API_KEY")
-proxy_llm = LLM(
-    model="sap/gpt-4o", api_base=api_base, base_url=api_base, api_key=api_key
-)
-
-
-@tool("get_weather")
-def get_weather(city: str) -> str:
-    """Moke function"""
-    city_normalized = city.lower().replace(" ", "")
-
-    mock_weather_db = {
-        "newyork": "The weather in New York is sunny with a temperature of 25°C.",
-        "london": "It's cloudy in London with a temperature of 15°C.",
-        "tokyo": "Tokyo is experiencing light rain and a temperature of 18°C.",
-    }
-
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return f"The weather in {city} is sunny with a temperature of 20°C."
-
-
-city = input("Input city: ")
-
-# --- Define agents ---
-agent = Agent(
-    role="Weather presenter",
-    goal=f"Prepare a couple of sentences in TV speach about weather in the {city}, "
-         f"using information from the get_weather tool",
-    backstory="You are the weather presenter on TV.",
-    llm=proxy_llm,
-    tools=[get_weather],
-    allow_delegation=False,
-)
-
-# --- Define tasks ---
-agent_task = Task(
-    description=(
-        f"Write a couple of sentences for TV weather report in {city}, that will be include small jok"
-    ),
-    expected_output=(
-        "Good quality text of two sentences about weather and with small jok"
-    ),
-    agent=agent,
-)
-
-# --- Assemble crew ---
-crew = Crew(
-    agents=[agent],
-    tasks=[agent_task],
-    verbose=True,
-)
-
-# --- Run ---
-result = crew.kickoff()
-print("\n📘 Result:\n", result)
+from agent_utils.prompt_cache import install_from_env as install_prompt_cache_from_env
+from agent_utils.ratelimit import install_from_env as install_limiter_from_env
+from agent_utils.startup import preload
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather import weather_report
+
+# CrewAI and LiteLLM take seconds to import: they are loaded in the background
+# while the user types the city and only used inside build_crew()
+CREWAI_MODULES = ("litellm", "crewai", "crewai.tools", "crewai.types.streaming")
+
+
+def build_crew(model: str = "sap/gpt-4o", api_base: str | None = None, api_key: str | None = None):
+    from crewai import Agent, Task, Crew
+    from crewai import LLM
+    from crewai.tools import tool
+    from agent_utils.http_pool import use_with_litellm
+    import litellm
+
+    litellm.use_litellm_proxy = True
+    use_with_litellm()  # pooled keep-alive connections to the proxy
+
+    api_base = api_base or os.getenv("PROXY_BASE_URL")
+    api_key = api_key or os.getenv("LITELLM_PROXY_API_KEY")
+    proxy_llm = LLM(
+        model=model, api_base=api_base, base_url=api_base, api_key=api_key
+    )
+
+    @tool("get_weather")
+    @traced_tool
+    def get_weather(city: str) -> str:
+        """Moke function"""
+        return weather_report(city)
+
+    # --- Define agents ---
+    agent = Agent(
+        role="Weather presenter",
+        goal="Prepare a couple of sentences in TV speach about weather in the city, "
+             "using information from the get_weather tool",
+        backstory="You are the weather presenter on TV.",
+        llm=proxy_llm,
+        tools=[get_weather],
+        allow_delegation=False,
+    )
+
+    # --- Define tasks ---
+    # The city is filled in by kickoff(inputs=...) at the end of the task: the
+    # agent's system prompt stays byte-identical across cities, so providers
+    # can serve it from their prompt cache (see PERFORMANCE.md)
+    agent_task = Task(
+        description=(
+            "Write a couple of sentences for TV weather report, that will be include small jok\n"
+            "Weather in {city}."
+        ),
+        expected_output=(
+            "Good quality text of two sentences about weather and with small jok"
+        ),
+        agent=agent,
+    )
+
+    # --- Assemble crew ---
+    return Crew(
+        agents=[agent],
+        tasks=[agent_task],
+        verbose=not streaming_enabled(),
+        stream=streaming_enabled(),
+    )
+
+
+def stream_kickoff(crew, inputs: dict):
+    """Prints tokens and tool calls as they arrive, followed by TTFT and inter-token latency."""
+    from crewai.types.streaming import StreamChunkType
+
+    timer = StreamTimer()
+    streaming = crew.kickoff(inputs=inputs)
+    for chunk in streaming:
+        if chunk.chunk_type == StreamChunkType.TOOL_CALL:
+            # Tool calls stream in pieces; only the first piece carries the name
+            if chunk.tool_call and chunk.tool_call.tool_name:
+                timer.event(f"tool call: {chunk.tool_call.tool_name}")
+        else:
+            timer.token(chunk.content)
+    timer.finish()
+    return streaming.result
+
+
+def main():
+    load_dotenv()
+    setup_from_env("crewai")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    loading = preload(*CREWAI_MODULES)
+    city = input("Input city: ")
+    loading.join()
+    crew = build_crew()
+    # RATE_LIMIT_RPM / RATE_LIMIT_TPM keep crews kicked off in bulk under the
+    # model's limits instead of retrying into 429s (see PERFORMANCE.md)
+    install_limiter_from_env()
+    install_prompt_cache_from_env()  # PROMPT_CACHE=1: cache_control markers for Claude models
+
+    # --- Run ---
+    with agent_span("crewai", "sap/gpt-4o"):
+        inputs = {"city": city}
+        result = stream_kickoff(crew, inputs) if streaming_enabled() else crew.kickoff(inputs=inputs)
+    print("\n📘 Result:\n", result)
+
+
+if __name__ == "__main__":
+    main()
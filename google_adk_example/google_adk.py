@@ -1,79 +1,56 @@
 from dotenv import load_dotenv
+from agent_utils.adk_service import AgentService
+from agent_utils.startup import preload
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather import weather_lookup
 import asyncio
 import warnings
 import logging
 
-# Setup
-warnings.filterwarnings("ignore")
-logging.basicConfig(level=logging.ERROR)
-load_dotenv()
-
-# ADK imports
-from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
-from google.adk.sessions import InMemorySessionService
-from google.adk.runners import Runner
-from google.genai import types
+# ADK and LiteLLM take seconds to import: they are loaded in the background
+# while the user types the first city and only used inside the functions below
+ADK_MODULES = ("google.adk.agents", "google.adk.models.lite_llm", "google.adk.runners", "google.genai.types")
 
 
 # Tool definition
+@traced_tool
 def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city."""
-    city_normalized = city.lower().replace(" ", "")
-
-    mock_weather_db = {
-        "newyork": {
-            "status": "success",
-            "report": "The weather in New York is sunny with a temperature of 25°C.",
-        },
-        "london": {
-            "status": "success",
-            "report": "It's cloudy in London with a temperature of 15°C.",
-        },
-        "tokyo": {
-            "status": "success",
-            "report": "Tokyo is experiencing light rain and a temperature of 18°C.",
-        },
-    }
-
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return {
-            "status": "error",
-            "error_message": f"Sorry, I don't have weather information for '{city}'.",
-        }
-
-
-# Model selection
-model = LiteLlm(model="sap/gpt-4.1")
-
-# Weather agent
-weather_agent = Agent(
-    name="weather_agent",
-    model=model,
-    description=f"Prepare a couple of sentences TV speach about weather in the given city, "
-                f"using information from run the get_weather tool",
-    instruction="You are a helpful weather assistant. "
-                "When the user asks for the weather in a specific city, "
-                "use the 'get_weather' tool to find the information. "
-                "If the tool returns an error, inform the user politely. "
-                "If the tool is successful, write a couple of sentences for a "
-                "TV weather report in the given city including a small joke.",
-    tools=[get_weather],
-)
+    return weather_lookup(city)
+
+
+def build_agent(model: str = "sap/gpt-4.1"):
+    from google.adk.agents import Agent
+    from google.adk.models.lite_llm import LiteLlm
+
+
+    # Weather agent
+    return Agent(
+        name="weather_agent",
+        model=LiteLlm(model=model),
+        description=f"Prepare a couple of sentences TV speach about weather in the given city, "
+                    f"using information from run the get_weather tool",
+        instruction="You are a helpful weather assistant. "
+                    "When the user asks for the weather in a specific city, "
+                    "use the 'get_weather' tool to find the information. "
+                    "If the tool returns an error, inform the user politely. "
+                    "If the tool is successful, write a couple of sentences for a "
+                    "TV weather report in the given city including a small joke.",
+        tools=[get_weather],
+    )
 
 
 # Helper function
-async def call_agent_async(query: str, runner, user_id, session_id):
+async def call_agent_async(query: str, service: AgentService, user_id: str):
     """Sends a query to the agent and prints the final response."""
+    from google.genai import types
 
     content = types.Content(role="user", parts=[types.Part(text=query), types.Part()])
     final_response_text = "Agent did not produce a final response."
 
-    async for event in runner.run_async(
-        user_id=user_id, session_id=session_id, new_message=content
-    ):
+    # The service's event stream is consumed to the end so the session is released promptly
+    async for event in service.run_async(user_id, content):
         if event.is_final_response():
             if event.content and event.content.parts:
                 final_response_text = event.content.parts[0].text
@@ -81,35 +58,78 @@ async def call_agent_async(query: str, runner, user_id, session_id):
                 final_response_text = (
                     f"Agent escalated: {event.error_message or 'No specific message.'}"
                 )
-            break
 
     print(f"Agent Response: {final_response_text}")
 
 
-# Main conversation
-async def run_conversation():
-    session_service = InMemorySessionService()
+async def stream_agent_async(query: str, service: AgentService, user_id: str):
+    """Prints tokens and tool calls as they arrive, followed by TTFT and inter-token latency."""
+    from google.adk.agents.run_config import RunConfig, StreamingMode
+    from google.genai import types
+
+    content = types.Content(role="user", parts=[types.Part(text=query)])
+    timer = StreamTimer()
+
+    async for event in service.run_async(
+        user_id, content, run_config=RunConfig(streaming_mode=StreamingMode.SSE)
+    ):
+        # Partial events carry the deltas, the final event repeats the full response
+        if event.partial:
+            for part in event.content.parts if event.content else []:
+                timer.token(part.text or "")
+            continue
+        for call in event.get_function_calls():
+            timer.event(f"tool call: {call.name}")
+        for response in event.get_function_responses():
+            timer.event(f"tool result: {response.response}")
+
+    timer.finish()
 
+
+async def read_city() -> str:
+    # In a thread, so the service's event loop keeps running while the user types;
+    # a closed or exhausted stdin ends the conversation like an empty line
+    try:
+        return await asyncio.to_thread(input, "Input city (empty to quit): ")
+    except EOFError:
+        return ""
+
+
+# Main conversation
+async def run_conversation(loading=None):
     APP_NAME = "weather_tutorial_app"
     USER_ID = "user_1"
-    SESSION_ID = "session_001"
 
-    session = await session_service.create_session(
-        app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID
-    )
-
-    runner = Runner(
-        agent=weather_agent, app_name=APP_NAME, session_service=session_service
-    )
-    city = input("Input city: ")
-    await call_agent_async(
-        f"What is the weather like in {city}?",
-        runner=runner,
-        user_id=USER_ID,
-        session_id=SESSION_ID,
-    )
+    service = None
+    call = stream_agent_async if streaming_enabled() else call_agent_async
+    try:
+        while city := await read_city():
+            if service is None:
+                if loading is not None:
+                    loading.join()
+                # One long-lived runner; the user's session is kept across questions and
+                # compacted to the last 10 turns so the prompt does not grow without limit
+                service = AgentService(build_agent(), app_name=APP_NAME, max_history_turns=10)
+            with agent_span("google_adk", "sap/gpt-4.1"):
+                await call(f"What is the weather like in {city}?", service=service, user_id=USER_ID)
+    finally:
+        if service is not None:
+            await service.close()
+        elif loading is not None:
+            # Quitting before the first question: shutting down mid-import aborts the interpreter
+            loading.join()
+
+
+def main():
+    # Setup
+    warnings.filterwarnings("ignore")
+    logging.basicConfig(level=logging.ERROR)
+    load_dotenv()
+    # ADK's own OpenTelemetry spans (invocation, call_llm, execute_tool) join these traces
+    setup_from_env("google_adk")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    asyncio.run(run_conversation(loading=preload(*ADK_MODULES)))
 
 
 # Run
 if __name__ == "__main__":
-    asyncio.run(run_conversation())
+    main()
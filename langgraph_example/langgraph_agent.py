@@ -3,106 +3,176 @@ A Langchain agent that uses a weather tool.
 This example uses the Langgraph Functional API according to: https://docs.langchain.com/oss/python/langgraph/quickstart#use-the-functional-api
 """
 
-from langchain.tools import tool
-from langchain_litellm import ChatLiteLLM
-from langgraph.graph import add_messages
-from langchain_core.messages import (
-    SystemMessage,
-    HumanMessage,
-    ToolCall,
+import functools
+import os
+import threading
+import time
+
+from agent_utils.checkpoint import INTERRUPTED, checkpoint_path, sqlite_saver, thread_config, thread_status
+from agent_utils.history import HistoryCompactor, compact_langchain, from_env as history_from_env
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather_service import fetch_weather_report, speculate_weather
+
+# LangGraph and LangChain are imported when the agent is built, not when this
+# module is loaded
+
+SYSTEM_PROMPT = (
+    "You are a helpful weather assistant. "
+    "When the user asks you about a specific city, "
+    "use the 'get_weather' tool to find the information about the weather. "
+    "Answer with a TV weather report in two sentences, including a small joke."
 )
-from langchain_core.messages import BaseMessage
-from langgraph.func import entrypoint, task
 
-# Step 1: Define model and tools
+# Tool calls run concurrently, at most this many at a time (per process)
+MAX_TOOL_CONCURRENCY = int(os.getenv("MAX_TOOL_CONCURRENCY", "8"))
 
-model = ChatLiteLLM(model="sap/gpt-4o", temperature=0)
 
-# Define weather tool
-
-
-@tool
+@traced_tool
 def get_weather(city: str):
     """
     Returns weather information for a given city.
     :param city:
     :return: weather information
     """
-    city_normalized = city.lower().replace(" ", "")
-
-    mock_weather_db = {
-        "newyork": "The weather in New York is sunny with a temperature of 25°C.",
-        "london": "It's cloudy in London with a temperature of 15°C.",
-        "tokyo": "Tokyo is experiencing light rain and a temperature of 18°C.",
-    }
-
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return f"The weather in {city} is sunny with a temperature of 20°C."
-
+    return fetch_weather_report(city)
 
-# Augment the LLM with tools
 
-tools = [get_weather]
-tools_by_name = {tool.name: tool for tool in tools}
-model_with_tools = model.bind_tools(tools)
+@functools.lru_cache(maxsize=None)
+def build_agent(model: str = "sap/gpt-4o", compactor: HistoryCompactor | None = None, checkpoint: str | None = None):
+    """The model with its tools bound, the tools by name and the ``agent`` entrypoint, built once.
 
-# Step 2: Define model node
-
-
-@task
-def call_llm(messages: list[BaseMessage]):
-    """LLM decides whether to call a tool or not"""
-    return model_with_tools.invoke(
-        [
-            SystemMessage(
-                content="You are a helpful weather assistant. "
-                "When the user asks you about a specific city, "
-                "use the 'get_weather' tool to find the information about the weather. "
-                "Answer with a TV weather report in two sentences, including a small joke."
+    ``compactor`` trims the history sent with each LLM call (the graph itself
+    keeps all of it); with a ``checkpoint`` database every finished task is saved.
+    """
+    from langchain.tools import tool
+    from langchain_core.messages import BaseMessage, SystemMessage, ToolCall
+    from langchain_litellm import ChatLiteLLM
+    from langgraph.config import get_stream_writer
+    from langgraph.func import entrypoint, task
+    from langgraph.graph import add_messages
+
+    # Step 1: Define model and tools
+
+    # Augment the LLM with tools
+    tools = [tool(get_weather)]
+    tools_by_name = {tool.name: tool for tool in tools}
+    model_with_tools = ChatLiteLLM(model=model, temperature=0).bind_tools(tools)
+
+    # Step 2: Define model node
+
+    @task
+    def call_llm(messages: list[BaseMessage]):
+        """LLM decides whether to call a tool or not"""
+        return model_with_tools.invoke([SystemMessage(content=SYSTEM_PROMPT)] + compact_langchain(compactor, messages))
+
+    # Step 3: Define tool node
+
+    tool_slots = threading.BoundedSemaphore(MAX_TOOL_CONCURRENCY)
+
+    @task
+    def call_tool(tool_call: ToolCall):
+        """Performs the tool call"""
+        tool = tools_by_name[tool_call["name"]]
+        with tool_slots:
+            return tool.invoke(tool_call)
+
+    # Step 4: Define agent
+
+    # A run that crashed resumes from the last finished task instead of calling the LLM again
+    checkpointer = sqlite_saver(checkpoint) if checkpoint else None
+
+    @entrypoint(checkpointer=checkpointer)
+    def agent(messages: list[BaseMessage]):
+        # Per-turn timings are emitted on the "custom" stream mode
+        write_timing = get_stream_writer()
+        turn = 0
+
+        while True:
+            start = time.perf_counter()
+            model_response = call_llm(messages).result()
+            llm_time = time.perf_counter() - start
+
+            if not model_response.tool_calls:
+                write_timing({"turn": turn, "llm_s": llm_time, "tool_s": 0.0, "tool_calls": 0})
+                break
+
+            # Execute tools: all calls are submitted at once and run in parallel,
+            # the results are merged in the order the model requested them
+            start = time.perf_counter()
+            tool_result_futures = [
+                call_tool(tool_call) for tool_call in model_response.tool_calls
+            ]
+            tool_results = [fut.result() for fut in tool_result_futures]
+            tool_time = time.perf_counter() - start
+            write_timing(
+                {"turn": turn, "llm_s": llm_time, "tool_s": tool_time, "tool_calls": len(tool_results)}
             )
-        ]
-        + messages
-    )
-
-
-# Step 3: Define tool node
-
-
-@task
-def call_tool(tool_call: ToolCall):
-    """Performs the tool call"""
-    tool = tools_by_name[tool_call["name"]]
-    return tool.invoke(tool_call)
-
-
-# Step 4: Define agent
-
-
-@entrypoint()
-def agent(messages: list[BaseMessage]):
-    model_response = call_llm(messages).result()
-
-    while True:
-        if not model_response.tool_calls:
-            break
-
-        # Execute tools
-        tool_result_futures = [
-            call_tool(tool_call) for tool_call in model_response.tool_calls
-        ]
-        tool_results = [fut.result() for fut in tool_result_futures]
-        messages = add_messages(messages, [model_response, *tool_results])
-        model_response = call_llm(messages).result()
 
-    messages = add_messages(messages, model_response)
-    return messages
+            messages = add_messages(messages, [model_response, *tool_results])
+            turn += 1
+
+        messages = add_messages(messages, model_response)
+        return messages
+
+    return model_with_tools, tools_by_name, agent
+
+
+# Stream tokens as the model produces them (STREAM_TOKENS=1)
+def stream_tokens(agent, input_message: list | None, config: dict):
+    from langchain_core.messages import AIMessageChunk, ToolMessage
+
+    timer = StreamTimer()
+    # Model calls run inside tasks, so their tokens are only streamed with subgraphs=True
+    for _namespace, mode, chunk in agent.stream(
+        input_message, config, stream_mode=["messages", "custom"], subgraphs=True
+    ):
+        if mode == "custom":
+            timer.event(f"turn {chunk['turn']}: LLM {chunk['llm_s'] * 1000:.0f} ms, tools {chunk['tool_s'] * 1000:.0f} ms")
+            continue
+        message, _metadata = chunk
+        if isinstance(message, AIMessageChunk):
+            for tool_chunk in message.tool_call_chunks:
+                if tool_chunk.get("name"):
+                    timer.event(f"tool call: {tool_chunk['name']}")
+            timer.token(message.text)
+        elif isinstance(message, ToolMessage):
+            timer.event(f"tool result: {message.content}")
+    timer.finish()
+
+
+def main():
+    from langchain_core.messages import HumanMessage
+
+    setup_from_env("langgraph")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    # Long conversations are compacted before they are sent (HISTORY_MAX_TOKENS);
+    # with LANGGRAPH_CHECKPOINT_DB=checkpoints.sqlite every finished task is saved
+    _, _, agent = build_agent(compactor=history_from_env(), checkpoint=checkpoint_path())
+    city = input("Input city: ")
+    prompt = f"What's the weather in {city}?"
+    # TOOL_PREFETCH=1 looks the city up while the model decides to ask for it
+    speculate_weather(prompt)
+    input_message = [HumanMessage(content=prompt)]
+    # One thread per city: an interrupted run for it picks up where it stopped
+    config = thread_config(city)
+    if agent.checkpointer is not None and thread_status(agent.get_state(config)) == INTERRUPTED:
+        print(f"Resuming the interrupted run for {city}")
+        input_message = None
+    with agent_span("langgraph", "sap/gpt-4o"):
+        if streaming_enabled():
+            stream_tokens(agent, input_message, config)
+        else:
+            for mode, chunk in agent.stream(input_message, config, stream_mode=["updates", "custom"]):
+                if mode == "custom":
+                    print(
+                        f"Turn {chunk['turn']}: LLM {chunk['llm_s'] * 1000:.0f} ms, "
+                        f"{chunk['tool_calls']} tool call(s) {chunk['tool_s'] * 1000:.0f} ms"
+                    )
+                else:
+                    print(chunk)
+                print("\n")
 
 
 # Invoke
-city = input("Input city: ")
-input_message = [HumanMessage(content=f"What's the weather in {city}?")]
-for chunk in agent.stream(input_message, stream_mode="updates"):
-    print(chunk)
-    print("\n")
+if __name__ == "__main__":
+    main()
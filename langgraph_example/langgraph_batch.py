@@ -0,0 +1,266 @@
+"""
+Batch mode for the LangGraph weather agent.
+
+Reads prompts from a JSONL file and runs them through an async version of the
+`agent` entrypoint with bounded concurrency. Each line is either
+{"id": ..., "prompt": "..."} or {"id": ..., "city": "..."}. Results are appended
+to the output JSONL file as soon as each query finishes, and a throughput,
+latency and token summary is printed at the end:
+
+    python langgraph_batch.py prompts.jsonl --output results.jsonl --concurrency 32
+
+With --checkpoint (or LANGGRAPH_CHECKPOINT_DB) every query runs in a thread of
+its own in a SQLite checkpoint database. Rerunning the same command after a
+crash skips the queries that already have an answer in the output file, takes
+the answers of finished but unwritten ones from their checkpoints and resumes
+the interrupted ones from their last finished LLM or tool call:
+
+    python langgraph_batch.py prompts.jsonl --checkpoint checkpoints.sqlite
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import time
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolCall
+from langgraph.config import get_stream_writer
+from langgraph.func import entrypoint, task
+from langgraph.graph import add_messages
+
+from agent_utils.cache import install_from_env
+from agent_utils.checkpoint import DONE, INTERRUPTED, async_sqlite_saver, checkpoint_path, thread_config, thread_status
+from agent_utils.router import install_from_env as install_router_from_env
+from agent_utils.history import HistoryCompactor, compact_langchain, from_env as history_from_env
+from agent_utils.stats import LatencyStats
+from agent_utils.tracing import agent_span, setup_from_env
+from agent_utils.weather_service import speculate_weather
+from langgraph_agent import MAX_TOOL_CONCURRENCY, SYSTEM_PROMPT, build_agent
+
+# Async model and tool nodes
+
+
+def build_batch_agent(compactor: HistoryCompactor | None = None):
+    """An async version of the example's ``agent`` entrypoint, with its model and tools."""
+    model_with_tools, tools_by_name, _ = build_agent(compactor=compactor)
+
+    @task
+    async def acall_llm(messages: list[BaseMessage]):
+        """LLM decides whether to call a tool or not"""
+        compacted = compact_langchain(compactor, messages)
+        return await model_with_tools.ainvoke([SystemMessage(content=SYSTEM_PROMPT)] + compacted)
+
+    tool_slots = asyncio.Semaphore(MAX_TOOL_CONCURRENCY)
+
+    @task
+    async def acall_tool(tool_call: ToolCall):
+        """Performs the tool call"""
+        tool = tools_by_name[tool_call["name"]]
+        async with tool_slots:
+            return await tool.ainvoke(tool_call)
+
+    @entrypoint()
+    async def batch_agent(messages: list[BaseMessage]):
+        write_timing = get_stream_writer()
+        turn = 0
+
+        while True:
+            start = time.perf_counter()
+            model_response = await acall_llm(messages)
+            llm_time = time.perf_counter() - start
+            if not model_response.tool_calls:
+                write_timing({"turn": turn, "llm_s": llm_time, "tool_s": 0.0, "tool_calls": 0})
+                break
+
+            start = time.perf_counter()
+            tool_results = await asyncio.gather(
+                *(acall_tool(tool_call) for tool_call in model_response.tool_calls)
+            )
+            write_timing(
+                {"turn": turn, "llm_s": llm_time, "tool_s": time.perf_counter() - start, "tool_calls": len(tool_results)}
+            )
+            messages = add_messages(messages, [model_response, *tool_results])
+            turn += 1
+
+        return add_messages(messages, model_response)
+
+    return batch_agent
+
+
+# Batch runner
+
+
+def read_queries(path: str):
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            prompt = record.get("prompt") or f"What's the weather in {record['city']}?"
+            yield record.get("id", line_no), prompt
+
+
+def answered_ids(path: str) -> set:
+    """Ids that already have an answer in the output file (failed queries are run again)."""
+    ids = set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:  # blank, or cut off by the crash
+                    continue
+                if "answer" in record:
+                    ids.add(record["id"])
+    except FileNotFoundError:
+        pass
+    return ids
+
+
+def token_usage(messages: list[BaseMessage]) -> tuple[int, int]:
+    input_tokens = output_tokens = 0
+    for message in messages:
+        usage = getattr(message, "usage_metadata", None) if isinstance(message, AIMessage) else None
+        if usage:
+            input_tokens += usage.get("input_tokens", 0)
+            output_tokens += usage.get("output_tokens", 0)
+    return input_tokens, output_tokens
+
+
+class BatchStats:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.llm_time = 0.0
+        self.tool_time = 0.0
+        self.skipped = 0  # finished in an earlier run (checkpointed)
+        self.resumed = 0
+
+    def report(self, wall_time: float) -> str:
+        done = len(self.latencies)
+        resume = [f"Checkpoints: {self.skipped} queries already done, {self.resumed} resumed"] if self.skipped or self.resumed else []
+        return "\n".join(
+            resume
+            + [
+                f"Queries: {done + self.errors} ({self.errors} failed) in {wall_time:.1f}s",
+                f"Throughput: {done / wall_time:.2f} queries/s",
+                f"Latency: {LatencyStats.from_samples(self.latencies)}",
+                f"Tokens: {self.input_tokens} prompt, {self.output_tokens} completion "
+                f"({(self.input_tokens + self.output_tokens) / max(done, 1):.0f} per query)",
+                f"Time in LLM calls: {self.llm_time:.1f}s, in tool calls: {self.tool_time:.1f}s (summed over queries)",
+            ]
+        )
+
+
+async def run_query(graph, query_id, prompt: str, stats: BatchStats) -> dict:
+    """Run one query in its own thread, or read its answer from the checkpoint if it finished before."""
+    config = thread_config(query_id)
+    input_messages = [HumanMessage(content=prompt)]
+    if graph.checkpointer is not None:
+        state = await graph.aget_state(config)
+        status = thread_status(state)
+        if status == DONE:
+            # Finished before the crash but maybe not written out: the answer is in the checkpoint
+            stats.skipped += 1
+            return {"id": query_id, "prompt": prompt, "answer": state.values[-1].content, "checkpointed": True}
+        if status == INTERRUPTED:
+            # Re-entering the thread replays the finished tasks from the checkpoint
+            stats.resumed += 1
+            input_messages = None
+
+    start = time.perf_counter()
+    speculate_weather(prompt)  # TOOL_PREFETCH=1: the lookup overlaps the first LLM call
+    turns = []
+    try:
+        with agent_span("langgraph", "sap/gpt-4o", **{"query.id": str(query_id)}):
+            async for mode, chunk in graph.astream(input_messages, config, stream_mode=["custom", "values"]):
+                if mode == "custom":
+                    turns.append(chunk)
+                else:
+                    messages = chunk
+    except Exception as e:
+        stats.errors += 1
+        return {"id": query_id, "prompt": prompt, "error": repr(e)}
+
+    latency = time.perf_counter() - start
+    input_tokens, output_tokens = token_usage(messages)
+    llm_time = sum(turn["llm_s"] for turn in turns)
+    tool_time = sum(turn["tool_s"] for turn in turns)
+    stats.latencies.append(latency)
+    stats.input_tokens += input_tokens
+    stats.output_tokens += output_tokens
+    stats.llm_time += llm_time
+    stats.tool_time += tool_time
+    return {
+        "id": query_id,
+        "prompt": prompt,
+        "answer": messages[-1].content,
+        "latency_s": round(latency, 4),
+        "llm_s": round(llm_time, 4),
+        "tool_s": round(tool_time, 4),
+        "turns": turns,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+    }
+
+
+async def run_batch(input_path: str, output_path: str, concurrency: int, checkpoint: str | None = None) -> BatchStats:
+    stats = BatchStats()
+    # A bounded queue keeps memory flat no matter how many prompts the file holds.
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker(graph, out):
+        while (item := await queue.get()) is not None:
+            result = await run_query(graph, *item, stats)
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+
+    async with contextlib.AsyncExitStack() as stack:
+        # Long conversations are compacted before they are sent (HISTORY_MAX_TOKENS)
+        graph = batch_agent = build_batch_agent(history_from_env())
+        if checkpoint:
+            saver = await stack.enter_async_context(async_sqlite_saver(checkpoint))
+            graph = batch_agent.copy(update={"checkpointer": saver})
+        out = stack.enter_context(open(output_path, "a", encoding="utf-8"))
+        workers = [asyncio.create_task(worker(graph, out)) for _ in range(concurrency)]
+        written = answered_ids(output_path) if checkpoint else set()
+        for item in read_queries(input_path):
+            if item[0] in written:
+                stats.skipped += 1
+                continue
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file with one prompt per line")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=16, help="maximum number of queries in flight")
+    parser.add_argument(
+        "--checkpoint", default=checkpoint_path(), help="SQLite checkpoint database to resume from (default: $LANGGRAPH_CHECKPOINT_DB)"
+    )
+    args = parser.parse_args()
+
+    setup_from_env("langgraph")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    router = install_router_from_env()  # MODEL_DEPLOYMENTS, see PERFORMANCE.md
+    cache = install_from_env()
+    start = time.perf_counter()
+    stats = asyncio.run(run_batch(args.input, args.output, args.concurrency, args.checkpoint))
+    print(stats.report(time.perf_counter() - start))
+    if cache is not None:
+        print(f"Cache: {cache.stats}")
+    if router is not None:
+        print(f"Router: {router.stats}")
+        for deployment in router.snapshot():
+            print(f"  {deployment}")
+
+
+if __name__ == "__main__":
+    main()
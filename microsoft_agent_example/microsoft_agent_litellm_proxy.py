@@ -1,55 +1,84 @@
 # pip install agent-framework
 from dotenv import load_dotenv
+from agent_utils.cache import install_from_env as install_cache_from_env
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather_service import afetch_weather_report
 import asyncio
 import os
-from agent_framework import ChatAgent
-from agent_framework.openai import OpenAIChatClient
 from typing import Annotated
 from pydantic import Field
-import litellm
 
-# set env variable
-litellm.use_litellm_proxy = True
-load_dotenv()
+# The Agent Framework is imported when the agent is built, not when this module
+# is loaded. It talks to the proxy through the OpenAI client, so LiteLLM is not imported.
 
-api_base = os.getenv("PROXY_BASE_URL")
-api_key = os.getenv("LITELLM_PROXY_API_KEY")
 
-# Tool definition
-def get_weather(
+# Tool definition. It is async, so lookups against a remote weather service
+# (WEATHER_SERVICE_URL, see PERFORMANCE.md) do not block the event loop and the
+# calls of one reply run concurrently
+@traced_tool
+async def get_weather(
     city: Annotated[str, Field(description="The location to get weather for")]
 ) -> str:
-    city_normalized = city.lower().replace(" ", "")
+    return await afetch_weather_report(city)
 
-    mock_weather_db = {
-        "newyork": "The weather in New York is sunny with a temperature of 25°C.",
-        "london": "It's cloudy in London with a temperature of 15°C.",
-        "tokyo": "Tokyo is experiencing light rain and a temperature of 18°C.",
-    }
+# Create agent using OpenAIClient
+def build_agent(
+    model: str = "sap/gpt-4o",
+    api_base: str | None = None,
+    api_key: str | None = None,
+    tool=get_weather,  # benchmarks swap in a blocking version to compare
+):
+    from agent_framework import ChatAgent
+    from agent_framework.openai import OpenAIChatClient
+    from agent_utils.http_pool import async_openai_client
 
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return f"The weather in {city} is sunny with a temperature of 20°C."
+    api_base = api_base or os.getenv("PROXY_BASE_URL")
+    api_key = api_key or os.getenv("LITELLM_PROXY_API_KEY")
 
-# Create agent using OpenAIClient
-agent = ChatAgent(
-    chat_client=OpenAIChatClient(model_id="sap/gpt-4o",
-                                 api_key=api_key,
-                                 base_url=api_base,),
-    instructions="""
-        You are a helpful weather assistant.
-        When the user asks for the weather in a specific city, use the 'get_weather' tool to find the information.
-        If the tool returns an error, inform the user politely.
-        If the tool is successful, write a couple of sentences for a TV weather report in the given city
-        including a small joke.
-        """,
-    name="litellm_agent",
-    tools=[get_weather],
-)
-
-async def tools_example():
+    return ChatAgent(
+        chat_client=OpenAIChatClient(model_id=model,
+                                     # pooled keep-alive connections to the proxy
+                                     async_client=async_openai_client(api_base, api_key),),
+        instructions="""
+            You are a helpful weather assistant.
+            When the user asks for the weather in a specific city, use the 'get_weather' tool to find the information.
+            If the tool returns an error, inform the user politely.
+            If the tool is successful, write a couple of sentences for a TV weather report in the given city
+            including a small joke.
+            """,
+        name="litellm_agent",
+        tools=[tool],
+    )
+
+async def tools_example(agent):
     result = await agent.run("What's the weather like in Tokyo?")
     print(result.text)
 
-asyncio.run(tools_example())
+async def streaming_example(agent):
+    """Prints tokens and tool calls as they arrive, followed by TTFT and inter-token latency."""
+    from agent_framework import FunctionCallContent, FunctionResultContent
+
+    timer = StreamTimer()
+    async for update in agent.run_stream("What's the weather like in Tokyo?"):
+        for content in update.contents:
+            # Function calls stream in pieces; only the first piece carries the name
+            if isinstance(content, FunctionCallContent) and content.name:
+                timer.event(f"tool call: {content.name}")
+            elif isinstance(content, FunctionResultContent):
+                timer.event(f"tool result: {content.result}")
+        timer.token(update.text)
+    timer.finish()
+
+
+def main():
+    load_dotenv()
+    setup_from_env("microsoft_agent")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    install_cache_from_env()  # COMPLETION_CACHE=memory: repeated requests skip the proxy, see PERFORMANCE.md
+    agent = build_agent()
+    with agent_span("microsoft_agent", "sap/gpt-4o"):
+        asyncio.run(streaming_example(agent) if streaming_enabled() else tools_example(agent))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,100 @@
 # pip install "openai-agents[litellm]"
 
+import asyncio
+import functools
+
 from dotenv import load_dotenv
-from agents import Agent, Runner, function_tool, set_tracing_disabled
-from agents.extensions.models.litellm_model import LitellmModel
+from agent_utils.cache import install_from_env
+from agent_utils.prompt_cache import install_from_env as install_prompt_cache_from_env
+from agent_utils.router import install_from_env as install_router_from_env
+from agent_utils.startup import preload
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather_service import fetch_weather_report, speculate_weather
 
-load_dotenv()
-set_tracing_disabled(True) # Disable OPEN_API_KEY error
+# The Agents SDK and LiteLLM are loaded in the background while the user types
+# the city and only used inside the functions below
+AGENTS_MODULES = ("agents", "agents.extensions.models.litellm_model", "openai.types.responses")
 
 
-@function_tool
-def get_weather(city: str):
-    city_normalized = city.lower().replace(" ", "")
+# Static, so every run sends the same instructions and tool schema first and
+# providers can serve that prefix from their prompt cache; the city is only in
+# the user message
+INSTRUCTIONS = (
+    "You are a helpful weather assistant. "
+    "When the user asks you about a specific city, "
+    "use the 'get_weather' tool to find the information about the weather. "
+    "Answer with a TV weather report in two sentences, including a small joke."
+)
 
-    mock_weather_db = {
-        "newyork": "The weather in New York is sunny with a temperature of 25°C.",
-        "london": "It's cloudy in London with a temperature of 15°C.",
-        "tokyo": "Tokyo is experiencing light rain and a temperature of 18°C.",
-    }
 
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return f"The weather in {city} is sunny with a temperature of 20°C."
+@traced_tool
+def get_weather(city: str):
+    return fetch_weather_report(city)
+
 
+@functools.lru_cache(maxsize=None)
+def build_agent(model: str):
+    """The agent for ``model``, built once and reused by every run."""
+    from agents import Agent, function_tool, set_tracing_disabled
+    from agents.extensions.models.litellm_model import LitellmModel
 
-def weather_agent(model: str, city: str = "Tokyo"):
-    agent = Agent(
+    # The SDK's own tracing uploads to the OpenAI platform (and needs OPENAI_API_KEY);
+    # spans are recorded with OpenTelemetry instead, see TRACE_SPANS in PERFORMANCE.md
+    set_tracing_disabled(True)
+    return Agent(
         name="Assistant",
-        instructions="You are a helpful weather assistant. "
-                "When the user asks you about a specific city, "
-                "use the 'get_weather' tool to find the information about the weather. "
-                "Answer with a TV weather report in two sentences, including a small joke.",
+        instructions=INSTRUCTIONS,
         model=LitellmModel(model=model),
-        tools=[get_weather],
+        tools=[function_tool(get_weather)],
     )
 
-    result = Runner.run_sync(agent, f"What's the weather in {city}?")
+
+async def stream_events(agent, prompt: str):
+    """Prints tokens and tool calls as they arrive, followed by TTFT and inter-token latency."""
+    from agents import Runner
+    from openai.types.responses import ResponseTextDeltaEvent
+
+    timer = StreamTimer()
+    result = Runner.run_streamed(agent, prompt)
+    async for event in result.stream_events():
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            timer.token(event.data.delta)
+        elif event.type == "run_item_stream_event":
+            if event.item.type == "tool_call_item":
+                timer.event(f"tool call: {event.item.raw_item.name}")
+            elif event.item.type == "tool_call_output_item":
+                timer.event(f"tool result: {event.item.output}")
+    timer.finish()
+
+
+def weather_agent(model: str, city: str = "Tokyo", stream: bool = False):
+    from agents import Runner
+
+    agent = build_agent(model)
+    prompt = f"What's the weather in {city}?"
+    with agent_span("openai_agents", model):
+        # TOOL_PREFETCH=1 looks the city up while the model decides to ask for it
+        speculate_weather(prompt)
+        if stream:
+            asyncio.run(stream_events(agent, prompt))
+            return
+
+        result = Runner.run_sync(agent, prompt)
     print(result.final_output)
 
 
-if __name__ == "__main__":
+def main():
+    load_dotenv()
+    loading = preload(*AGENTS_MODULES)
     city = input("Input city: ")
-    weather_agent(model="sap/gpt-4.1", city=city)
+    loading.join()
+    install_router_from_env() # Opt-in routing over several deployments, see PERFORMANCE.md
+    install_from_env() # Opt-in response cache, see PERFORMANCE.md
+    install_prompt_cache_from_env() # PROMPT_CACHE=1: cache_control markers for Claude models
+    setup_from_env("openai_agents") # Opt-in OpenTelemetry spans, see PERFORMANCE.md
+    weather_agent(model="sap/gpt-4.1", city=city, stream=streaming_enabled())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,82 @@
 # https://ai.pydantic.dev/agents/
 
-from pydantic_ai import Agent, RunContext
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.litellm import LiteLLMProvider
 from dotenv import load_dotenv
+from agent_utils.cache import install_from_env as install_cache_from_env
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather import weather_report
+import asyncio
 import os
-import litellm
-
-litellm.use_litellm_proxy = True
-
-load_dotenv()
-api_base = os.getenv("PROXY_BASE_URL")
-api_key = os.getenv("LITELLM_PROXY_API_KEY")
-model = OpenAIChatModel(
-    "sap/gpt-5",
-    provider=LiteLLMProvider(
-        api_base=api_base,
-        api_key=api_key,
-    ),
-)
-agent = Agent(
-    model=model,
-    system_prompt="You are a helpful weather assistant. "
-    "When the user asks for a specific city, "
-    "use the 'get_weather' tool to find the information about the weather. "
-    "Answer with a TV weather report in two sentences including a small joke.",
-)
-
-
-@agent.tool
-def get_weather(city: RunContext[str]) -> str:
-    """Mock function"""
-    city_normalized = city.prompt.lower().replace(" ", "")
-
-    mock_weather_db = {
-        "newyork": "The weather in New York is sunny with a temperature of 25°C.",
-        "london": "It's cloudy in London with a temperature of 15°C.",
-        "tokyo": "Tokyo is experiencing light rain and a temperature of 18°C.",
-    }
-
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return f"The weather in {city} is sunny with a temperature of 20°C."
-
-
-result = agent.run_sync("London")
-print(result.output)
+
+# The framework is imported when the agent is built, not when this module is
+# loaded, so importing the script (or asking it for --help) stays cheap
+
+
+def build_agent(model: str = "sap/gpt-5", api_base: str | None = None, api_key: str | None = None):
+    from pydantic_ai import Agent, RunContext
+    from pydantic_ai.models.openai import OpenAIChatModel
+    from pydantic_ai.providers.litellm import LiteLLMProvider
+    from agent_utils.http_pool import shared_async_client
+
+    api_base = api_base or os.getenv("PROXY_BASE_URL")
+    api_key = api_key or os.getenv("LITELLM_PROXY_API_KEY")
+    chat_model = OpenAIChatModel(
+        model,
+        provider=LiteLLMProvider(
+            api_base=api_base,
+            api_key=api_key,
+            http_client=shared_async_client(),  # pooled keep-alive connections to the proxy
+        ),
+    )
+    agent = Agent(
+        model=chat_model,
+        system_prompt="You are a helpful weather assistant. "
+        "When the user asks for a specific city, "
+        "use the 'get_weather' tool to find the information about the weather. "
+        "Answer with a TV weather report in two sentences including a small joke.",
+    )
+
+    @agent.tool
+    @traced_tool
+    def get_weather(city: RunContext[str]) -> str:
+        """Mock function"""
+        return weather_report(city.prompt)
+
+    return agent
+
+
+async def stream_response(agent, prompt: str):
+    """Prints tokens and tool calls as they arrive, followed by TTFT and inter-token latency."""
+    from pydantic_ai.messages import FunctionToolCallEvent, FunctionToolResultEvent
+
+    timer = StreamTimer()
+
+    async def show_tool_events(_ctx, events):
+        async for event in events:
+            if isinstance(event, FunctionToolCallEvent):
+                timer.event(f"tool call: {event.part.tool_name}")
+            elif isinstance(event, FunctionToolResultEvent):
+                timer.event(f"tool result: {event.part.content}")
+
+    async with agent.run_stream(prompt, event_stream_handler=show_tool_events) as result:
+        # debounce_by=None yields every delta as soon as it arrives
+        async for delta in result.stream_text(delta=True, debounce_by=None):
+            timer.token(delta)
+    timer.finish()
+
+
+def main():
+    load_dotenv()
+    setup_from_env("pydantic_ai")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    install_cache_from_env()  # COMPLETION_CACHE=memory: repeated requests skip the proxy, see PERFORMANCE.md
+    agent = build_agent()
+    with agent_span("pydantic_ai", "sap/gpt-5"):
+        if streaming_enabled():
+            asyncio.run(stream_response(agent, "London"))
+        else:
+            result = agent.run_sync("London")
+            print(result.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,68 @@
 # pip install "smolagents[toolkit]"
 from dotenv import load_dotenv
-from smolagents import LiteLLMModel
-from smolagents import CodeAgent, tool
-# set env variable
-load_dotenv()
+from agent_utils.fastpath import FastPath, fast_path_enabled
+from agent_utils.streaming import StreamTimer, streaming_enabled
+from agent_utils.tracing import agent_span, setup_from_env, traced_tool
+from agent_utils.weather import weather_report
+
+# smolagents is imported when the agent is built, not when this module is loaded
+
+TASK = "What is the weather like in London?"
+
 
 # Tool definition
-@tool
+@traced_tool
 def get_weather(city: str) -> str:
     """Retrieves the current weather report for a specified city.
     Args:
         city (str): The name of the city to retrieve weather information for.
             Examples: "New York", "London", "Tokyo".
     """
-    city_normalized = city.lower().replace(" ", "")
+    return weather_report(city)
+
+
+def build_agent(model: str = "sap/gpt-5"):
+    from smolagents import AgentLogger, CodeAgent, LiteLLMModel, LogLevel, tool
+    from rich.console import Console
+
+    # agent setup
+    return CodeAgent(
+        tools=[tool(get_weather)],
+        model=LiteLLMModel(model_id=model),
+        # In streaming mode the events are printed by stream(), so the agent's console is silenced
+        stream_outputs=streaming_enabled(),
+        logger=AgentLogger(LogLevel.OFF, Console(quiet=True)) if streaming_enabled() else None,
+    )
+
+
+def stream(agent, task: str):
+    """Prints tokens and tool results as they arrive, followed by TTFT and inter-token latency."""
+    from smolagents import ActionStep, ChatMessageStreamDelta, FinalAnswerStep
 
-    mock_weather_db = {
-        "newyork": "The weather in New York is sunny with a temperature of 25°C.",
-        "london": "It's cloudy in London with a temperature of 15°C.",
-        "tokyo": "Tokyo is experiencing light rain and a temperature of 18°C.",
-    }
+    timer = StreamTimer()
+    for event in agent.run(task, stream=True):
+        if isinstance(event, ChatMessageStreamDelta):
+            timer.token(event.content or "")
+        elif isinstance(event, ActionStep) and event.observations:
+            timer.event(f"observation: {event.observations.strip()}")
+        elif isinstance(event, FinalAnswerStep):
+            timer.event(f"final answer: {event.output}")
+    timer.finish()
 
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return f"The weather in {city} is sunny with a temperature of 20°C."
 
-# model setup
-model = LiteLLMModel(model_id="sap/gpt-5")
+def main():
+    load_dotenv()
+    setup_from_env("smolagents")  # TRACE_SPANS=spans.jsonl, see PERFORMANCE.md
+    agent = build_agent()
+    with agent_span("smolagents", "sap/gpt-5"):
+        if streaming_enabled():
+            stream(agent, TASK)
+        else:
+            # One completion with the weather looked up first (TOOL_FAST_PATH=1, see PERFORMANCE.md);
+            # the code agent only runs if the city can't be read from the task
+            response = FastPath("sap/gpt-5", get_weather).answer(TASK) if fast_path_enabled() else None
+            print(response if response is not None else agent.run(TASK))
 
-# agent setup
-agent = CodeAgent(tools=[get_weather], model=model)
 
-response = agent.run("What is the weather like in London?")
-print(response)
+if __name__ == "__main__":
+    main()
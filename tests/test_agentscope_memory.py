@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("agentscope")
+
+from agentscope.message import Msg  # noqa: E402
+
+from agent_utils.agentscope_memory import BoundedMemory  # noqa: E402
+
+
+def exchange(i: int) -> list[Msg]:
+    return [Msg("user", f"What's the weather in City{i}? " * 3, "user"), Msg("assistant", f"Sunny in City{i}. " * 5, "assistant")]
+
+
+def fill(memory: BoundedMemory, turns: int) -> list[Msg]:
+    messages = []
+    for i in range(turns):
+        messages += exchange(i)
+        asyncio.run(memory.add(messages[-2:]))
+    return messages
+
+
+def test_old_turns_spill_and_read_back(tmp_path):
+    memory = BoundedMemory(max_tokens=120, path=str(tmp_path / "memory.log"))
+    messages = fill(memory, 8)
+    assert memory.window_tokens <= 120
+    assert memory.window[0].role == "user"  # whole turns spill
+    assert asyncio.run(memory.size()) == len(messages)
+    spilled = memory.spilled()
+    assert [msg.id for msg in spilled] == [msg.id for msg in messages[: len(spilled)]]
+    everything = asyncio.run(memory.get_memory(include_spilled=True))
+    assert [msg.id for msg in everything] == [msg.id for msg in messages]
+    assert [msg.content for msg in everything] == [msg.content for msg in messages]
+    memory.close()
+
+
+def test_the_current_turn_stays_over_budget():
+    memory = BoundedMemory(max_tokens=1)
+    fill(memory, 3)
+    assert [entry.role for entry in memory.window] == ["user", "assistant"]
+    assert len(memory.log) == 4
+    memory.close()
+
+
+def test_delete_and_mark_spilled_messages():
+    memory = BoundedMemory(max_tokens=120)
+    messages = fill(memory, 8)
+    first, second = messages[0], messages[1]
+    assert asyncio.run(memory.update_messages_mark("hint", msg_ids=[first.id])) == 1
+    assert [msg.id for msg in memory.spilled("hint")] == [first.id]
+    assert asyncio.run(memory.delete([second.id])) == 1
+    assert asyncio.run(memory.size()) == len(messages) - 1
+    assert asyncio.run(memory.delete_by_mark("hint")) == 1
+    assert first.id not in [msg.id for msg in memory.spilled()]
+    memory.close()
+
+
+def test_state_reloads_with_the_spill_log(tmp_path):
+    path = str(tmp_path / "memory.log")
+    memory = BoundedMemory(max_tokens=120, path=path)
+    messages = fill(memory, 8)
+    asyncio.run(memory.update_messages_mark("hint", msg_ids=[messages[0].id]))
+    state = json.loads(json.dumps(memory.state_dict()))
+    memory.close()
+
+    restored = BoundedMemory(max_tokens=120, path=path)  # the log file is kept, not truncated
+    restored.load_state_dict(state)
+    everything = asyncio.run(restored.get_memory(include_spilled=True))
+    assert [msg.id for msg in everything] == [msg.id for msg in messages]
+    assert [msg.id for msg in restored.spilled("hint")] == [messages[0].id]
+
+    # New turns are appended after the old records
+    fill(restored, 4)
+    assert restored.spilled()[0].id == messages[0].id
+    restored.close()
+
+
+def test_state_needs_its_log():
+    memory = BoundedMemory(max_tokens=120)
+    fill(memory, 8)
+    state = memory.state_dict()
+    memory.close()
+    with pytest.raises(ValueError):
+        BoundedMemory(max_tokens=120).load_state_dict(state)
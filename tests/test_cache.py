@@ -0,0 +1,79 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+from agent_utils import cache
+from agent_utils.cache import CompletionCache, Entry, MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A ``time.time()`` for the cache that advances one second per call, unless set."""
+    now = SimpleNamespace(value=1000.0, ticks=itertools.count())
+
+    def time():
+        return now.value + next(now.ticks)
+
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=time, perf_counter=time))
+    return now
+
+
+def entry(payload: bytes = b"{}", expires_at: float = float("inf")) -> Entry:
+    return Entry(payload, expires_at, 0.1)
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", entry(b"a"))
+    backend.set("b", entry(b"b"))
+    assert backend.get("a").payload == b"a"  # "b" is now the least recently used
+    backend.set("c", entry(b"c"))
+    assert len(backend) == 2
+    assert backend.get("b") is None
+    assert backend.get("a").payload == b"a"
+
+
+def test_sqlite_backend_evicts_least_recently_used(tmp_path, clock):
+    backend = SQLiteBackend(tmp_path / "cache.sqlite", max_entries=3, evict_every=1)
+    for key in "abc":
+        backend.set(key, entry())
+    backend.get("a")
+    backend.set("d", entry())
+    assert len(backend) == 3
+    assert backend.get("b") is None
+    assert all(backend.get(key) is not None for key in "acd")
+
+
+def test_sqlite_backend_drops_expired_entries_before_live_ones(tmp_path, clock):
+    backend = SQLiteBackend(tmp_path / "cache.sqlite", max_entries=3, evict_every=4)
+    backend.set("old", entry(expires_at=0.0))
+    for key in "abc":
+        backend.set(key, entry())
+    # The fourth insert evicts: the expired entry makes room, no live entry goes
+    assert len(backend) == 3
+    assert backend.get("old") is None
+    assert all(backend.get(key) is not None for key in "abc")
+
+
+def test_sqlite_backend_evicts_in_batches(tmp_path, clock):
+    backend = SQLiteBackend(tmp_path / "cache.sqlite", max_entries=2, evict_every=3)
+    for key in "abc":
+        backend.set(key, entry())
+    assert len(backend) == 2
+    backend.set("d", entry())
+    assert len(backend) == 3  # over the limit until the next batch
+    backend.set("e", entry())
+    backend.set("f", entry())
+    assert len(backend) == 2
+
+
+def test_completion_cache_expires_after_ttl(clock):
+    completions = CompletionCache(MemoryBackend(), ttl=10.0)
+    completions.store("key", b"payload", latency=0.5)
+    assert completions.lookup("key") == b"payload"
+    clock.value += 60
+    assert completions.lookup("key") is None
+    assert len(completions.backend) == 0
+    assert (completions.stats.hits, completions.stats.misses) == (1, 1)
+    assert completions.stats.saved_seconds == 0.5
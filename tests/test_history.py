@@ -0,0 +1,103 @@
+from agent_utils.history import (
+    SUMMARY_PREFIX,
+    DropToolOutputs,
+    SlidingWindow,
+    Summarize,
+    default_compactor,
+    estimate_tokens,
+)
+
+SYSTEM = {"role": "system", "content": "You are a helpful weather assistant."}
+
+
+def turn(city: str, report: str = "Sunny and 20 degrees. " * 5) -> list[dict]:
+    """One weather turn: question, tool call, tool result, answer."""
+    call_id = f"call_{city}"
+    return [
+        {"role": "user", "content": f"What's the weather in {city}?"},
+        {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{"id": call_id, "type": "function", "function": {"name": "get_weather", "arguments": city}}],
+        },
+        {"role": "tool", "tool_call_id": call_id, "content": f"{city}: {report}"},
+        {"role": "assistant", "content": f"In {city} it is sunny. Bring sunglasses!"},
+    ]
+
+
+def conversation(*cities: str) -> list[dict]:
+    return [SYSTEM, *(message for city in cities for message in turn(city))]
+
+
+def assert_whole_turns(messages: list[dict]) -> None:
+    """Every tool result follows the assistant message that asked for it."""
+    requested = set()
+    for message in messages:
+        for call in message.get("tool_calls") or []:
+            requested.add(call["id"])
+        if message["role"] == "tool":
+            assert message["tool_call_id"] in requested
+
+
+def test_sliding_window_cuts_before_a_user_message():
+    messages = conversation("London", "Paris", "Tokyo", "Oslo")
+    budget = estimate_tokens(conversation("Tokyo", "Oslo")) + 10
+    compacted = SlidingWindow(max_tokens=budget)(messages, estimate_tokens)
+    assert compacted[0] == SYSTEM
+    assert compacted[1] == {"role": "user", "content": "What's the weather in Tokyo?"}
+    assert compacted[1:] == messages[-8:]
+    assert_whole_turns(compacted)
+
+
+def test_sliding_window_keeps_the_current_turn_over_budget():
+    messages = conversation("London", "Paris")
+    compacted = SlidingWindow(max_tokens=1)(messages, estimate_tokens)
+    assert compacted == [SYSTEM, *messages[-4:]]
+
+
+def test_sliding_window_by_message_count():
+    messages = conversation("London", "Paris", "Tokyo")
+    compacted = SlidingWindow(max_messages=9)(messages, estimate_tokens)
+    assert compacted == [SYSTEM, *messages[-8:]]
+
+
+def test_drop_tool_outputs_only_shortens_answered_results():
+    messages = conversation("London")[:-1]  # the tool result is not answered yet
+    assert DropToolOutputs(keep_chars=10)(messages, estimate_tokens) == messages
+    messages = conversation("London", "Paris")
+    compacted = DropToolOutputs(keep_chars=10)(messages, estimate_tokens)
+    assert compacted[3]["content"].startswith("London: Su...")
+    assert "dropped" in compacted[7]["content"]
+    assert len(compacted) == len(messages)
+
+
+def test_summarize_replaces_whole_old_turns():
+    messages = conversation("London", "Paris", "Tokyo", "Oslo")
+    recent = estimate_tokens(turn("Oslo")) + 5
+    stage = Summarize(max_tokens=estimate_tokens(messages) // 2, keep_recent_tokens=recent)
+    compacted = stage(messages, estimate_tokens)
+    assert compacted[0] == SYSTEM
+    assert compacted[1]["content"].startswith(SUMMARY_PREFIX)
+    assert "User asked: What's the weather in Tokyo?" in compacted[1]["content"]
+    assert compacted[2:] == turn("Oslo")
+    assert_whole_turns(compacted)
+
+
+def test_summarize_leaves_short_histories_alone():
+    messages = conversation("London")
+    assert Summarize(max_tokens=10_000, keep_recent_tokens=100)(messages, estimate_tokens) == messages
+
+
+def test_default_compactor_stays_within_budget():
+    compactor = default_compactor(max_tokens=600)
+    messages = [SYSTEM]
+    for i in range(30):
+        messages += turn(f"City{i}")
+        compacted = compactor(messages)
+        assert compacted[0] == SYSTEM
+        # The current turn is kept (its answered tool output may be shortened)
+        assert [compacted[-4], compacted[-1]] == [messages[-4], messages[-1]]
+        assert_whole_turns(compacted)
+    assert estimate_tokens(compacted) <= 600
+    assert compactor.stats.calls == 30
+    assert compactor.stats.saved > 0.5
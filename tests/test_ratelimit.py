@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+from agent_utils.ratelimit import RateLimiter, TokenBucket
+
+
+def test_limit_grows_while_calls_fill_it():
+    limiter = RateLimiter(concurrency=2)
+    limits = []
+    for _ in range(10):
+        # A window of calls at the limit, all successful
+        tickets = [limiter.acquire(100) for _ in range(int(limiter.limit))]
+        for ticket in tickets:
+            limiter.release(ticket)
+        limits.append(limiter.limit)
+    assert limits[0] == pytest.approx(2.5)  # additive: 1 / limit per call that found the limit full
+    assert limits == sorted(limits) and limits[-1] > 4
+    assert limiter.inflight == 0
+
+
+def test_limit_does_not_grow_while_it_is_not_reached():
+    limiter = RateLimiter(concurrency=4)
+    for _ in range(10):
+        limiter.release(limiter.acquire(100))
+    assert limiter.limit == 4
+
+
+def test_overload_halves_the_limit_once_per_interval():
+    limiter = RateLimiter(concurrency=16, decrease_interval=60)
+    tickets = [limiter.acquire(100) for _ in range(3)]
+    limiter.release(tickets[0], status=429)
+    assert limiter.limit == 8
+    limiter.release(tickets[1], status=503)  # the same overload, seen by a call already in flight
+    assert limiter.limit == 8
+    limiter.release(tickets[2])
+    assert limiter.stats.overloads == 2
+    assert limiter.stats.decreases == 1
+
+
+def test_limit_stays_within_bounds():
+    limiter = RateLimiter(concurrency=2, min_concurrency=1, max_concurrency=2, decrease_interval=0)
+    for _ in range(3):
+        limiter.release(limiter.acquire(100), status=429)
+    assert limiter.limit == 1
+    for _ in range(10):
+        limiter.release(limiter.acquire(100))
+    assert limiter.limit == 2
+
+
+def test_retry_after_drains_the_request_budget():
+    limiter = RateLimiter(rpm=600, burst=1.0, concurrency=4)
+    limiter.release(limiter.acquire(100), status=429, retry=2.0)
+    # The next call waits out the Retry-After instead of starting at once
+    assert limiter._reserve(100) == pytest.approx(2.0, abs=0.2)
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(per_minute=60, burst=1.0)  # one per second
+    now = time.monotonic()
+    assert bucket.reserve(1, now) == 0
+    assert bucket.reserve(1, now) == pytest.approx(1.0)
+    assert bucket.reserve(1, now) == pytest.approx(2.0)
+    assert bucket.reserve(1, now + 3) == pytest.approx(0.0)
+
+
+def test_waiters_are_handed_slots_in_order():
+    limiter = RateLimiter(concurrency=1, max_concurrency=1)
+    order = []
+
+    async def call(name: str, hold: float):
+        ticket = await limiter.aacquire(100)
+        order.append(name)
+        await asyncio.sleep(hold)
+        limiter.release(ticket)
+
+    async def main():
+        await asyncio.gather(call("first", 0.01), call("second", 0), call("third", 0))
+
+    asyncio.run(main())
+    assert order == ["first", "second", "third"]
+    assert limiter.stats.peak_inflight == 1
+
+
+def test_cancelled_wait_leaves_the_limit_alone():
+    limiter = RateLimiter(concurrency=1, max_concurrency=8)
+
+    async def main():
+        ticket = await limiter.aacquire(100)
+        waiting = asyncio.create_task(limiter.aacquire(100))
+        await asyncio.sleep(0)
+        limiter.release(ticket)  # hands the slot to the waiter, which is then cancelled
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+    asyncio.run(main())
+    assert limiter.inflight == 0
+    assert limiter.snapshot()["queued"] == 0
+    limit = limiter.limit
+    limiter.release(limiter.acquire(100), abandoned=True)
+    assert limiter.limit == limit
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from agent_utils.router import AsyncRoutingTransport, Deployment, Router, RoutingTransport
+
+
+class StatusError(Exception):
+    """Stands in for a LiteLLM error: the router only reads ``status_code`` and the headers."""
+
+    def __init__(self, status_code: int, retry_after: str | None = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = {"retry-after": retry_after} if retry_after else {}
+
+
+def fake_completion(failures: dict[str, Exception]):
+    """A ``completion`` that fails for the models in ``failures`` and records every model it is called with."""
+    calls = []
+
+    def completion(**kwargs):
+        calls.append(kwargs["model"])
+        if kwargs["model"] in failures:
+            raise failures[kwargs["model"]]
+        return {"model": kwargs["model"]}
+
+    return completion, calls
+
+
+def test_falls_back_to_the_next_deployment_and_cools_down_on_429():
+    primary, secondary = Deployment("primary"), Deployment("secondary")
+    router = Router([primary, secondary], strategy="round-robin", cooldown=60)
+    completion, calls = fake_completion({"primary": StatusError(429)})
+    routed = router.wrap_completion(completion)
+
+    assert routed(model="ignored", messages=[])["model"] == "secondary"
+    assert calls == ["primary", "secondary"]
+    assert router.stats.fallbacks == 1
+    assert primary.cooling(primary.cooldown_until - 1)
+
+    # While it cools down, requests skip the primary
+    calls.clear()
+    routed(model="ignored", messages=[])
+    routed(model="ignored", messages=[])
+    assert calls == ["secondary", "secondary"]
+    assert primary.inflight == secondary.inflight == 0
+
+
+def test_retry_after_sets_the_cooldown():
+    primary = Deployment("primary")
+    router = Router([primary, Deployment("secondary")], strategy="round-robin", cooldown=60)
+    completion, _ = fake_completion({"primary": StatusError(429, retry_after="2")})
+    router.wrap_completion(completion)(model="ignored", messages=[])
+    assert router.snapshot()[0]["cooling"]
+    assert 0 < primary.cooldown_until - time.monotonic() <= 2  # not the 60 s default
+
+
+def test_consecutive_errors_cool_a_deployment_down():
+    flaky = Deployment("flaky")
+    router = Router([flaky], allowed_fails=2, cooldown=60)
+    router.failed(router.pick(), 500)
+    assert not flaky.cooling(0)
+    router.failed(router.pick(), 500)
+    assert flaky.cooldown_until > 0
+    router.succeeded(router.pick(), 0.1)
+    assert flaky.consecutive_failures == 0
+
+
+def test_a_bad_request_is_not_retried():
+    router = Router([Deployment("a"), Deployment("b")], strategy="round-robin")
+    completion, calls = fake_completion({"a": StatusError(400)})
+    with pytest.raises(StatusError):
+        router.wrap_completion(completion)(model="ignored", messages=[])
+    assert calls == ["a"]
+    assert router.deployments[0].inflight == 0
+    assert router.deployments[0].failures == 0
+
+
+def test_gives_up_when_every_deployment_failed():
+    router = Router([Deployment("a"), Deployment("b")])
+    completion, calls = fake_completion({"a": StatusError(503), "b": StatusError(503)})
+    with pytest.raises(StatusError):
+        router.wrap_completion(completion)(model="ignored", messages=[])
+    assert sorted(calls) == ["a", "b"]
+    assert router.stats.exhausted == 1
+
+
+def test_cancelled_call_frees_the_slot_without_a_verdict():
+    deployment = Deployment("slow")
+    router = Router([deployment])
+
+    async def acompletion(**kwargs):
+        await asyncio.sleep(10)
+
+    async def cancel():
+        task = asyncio.create_task(router.wrap_acompletion(acompletion)(model="ignored", messages=[]))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    assert deployment.inflight == 0
+    assert deployment.failures == 0
+    assert deployment.latency is None
+
+
+def chat_handler(statuses: dict[str, int], seen: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        seen.append((request.url.host, body["model"]))
+        status = statuses.get(request.url.host, 200)
+        return httpx.Response(status, json={"model": body["model"]}, headers={"retry-after": "1"} if status == 429 else {})
+
+    return handler
+
+
+def test_transport_reroutes_url_and_model():
+    seen = []
+    router = Router(
+        [Deployment("model-a", "http://a.test"), Deployment("model-b", "http://b.test")], strategy="round-robin"
+    )
+    transport = RoutingTransport(router, httpx.MockTransport(chat_handler({"a.test": 429}, seen)))
+    with httpx.Client(transport=transport) as client:
+        response = client.post("http://proxy.test/v1/chat/completions", json={"model": "any", "messages": []})
+    assert response.status_code == 200
+    assert seen == [("a.test", "model-a"), ("b.test", "model-b")]
+    assert router.deployments[0].cooldown_until > 0
+
+
+def test_async_transport_falls_back():
+    seen = []
+    router = Router([Deployment("model-a", "http://a.test"), Deployment("model-b", "http://b.test")], strategy="round-robin")
+    transport = AsyncRoutingTransport(router, httpx.MockTransport(chat_handler({"a.test": 502}, seen)))
+
+    async def post():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.post("http://proxy.test/v1/chat/completions", json={"model": "any", "messages": []})
+
+    assert asyncio.run(post()).json() == {"model": "model-b"}
+    assert router.stats.fallbacks == 1